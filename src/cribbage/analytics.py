@@ -18,8 +18,17 @@ A module containing advanced methods for the game of cribbage
 # ------------
 # System Modules - Included with Python
 
-from multiprocessing import Pool
-from functools import partial
+import os
+import atexit
+
+from math import comb, sqrt
+from operator import mul
+from functools import lru_cache
+from collections import Counter
+from itertools import combinations_with_replacement, product
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
 
 # ------------
 # 3rd Party - From pip
@@ -28,15 +37,59 @@ from functools import partial
 # Custom Modules
 
 from cribbage.cards import (
+    RANKS,
+    SUITS,
+    SUIT_SYMBOLS,
+    Card,
+    CardSet,
+    FULL_DECK,
+    RANK_MULTISETS,
     hand_combinations,
+    rank_multiset_index,
+    rank_score_table,
+    rank_count_table,
+    set_rank_tables,
     score_hand,
-    make_deck,
+    score_vector,
+    cut_rank_scores,
+    cut_suit_scores,
+    keep_rank_scores,
     display_hand,
 )
 
+from cribbage.memo import (
+    MISSING,
+    get_cache,
+    cache_sizes,
+    enable_caches,
+)
+
 # -------------
 
 
+# The hand table used by expected_average, see set_hand_table
+_hand_table = None
+
+
+def set_hand_table(table):
+    """
+    Set the hand table (see `tables.load_hand_table`) that
+    `expected_average` uses to look up the hand scores. Set it to None
+    to compute the scores.
+
+    # Parameters
+
+    table:HandTable
+        - An object with an `expected_average(hand, discard)` method or
+          None.
+
+    """
+
+    global _hand_table
+
+    _hand_table = table
+
+
 def expected_average(hand, discard=None, **kwargs):
     """
 
@@ -55,6 +108,14 @@ def expected_average(hand, discard=None, **kwargs):
     the number of cards remaining in the deck. This yields the expected
     average value of the hand.
 
+    The cut cards are grouped by rank, the fifteens, pairs and runs are
+    the same for every cut card of a rank so there are at most 13 hands
+    to score. The flush and nobs points are added per suit, weighted by
+    the number of cards of that suit left in the deck. If the hand table
+    is active (see `set_hand_table`) the scores are looked up instead.
+    The averages are cached if the `expected_average` cache is enabled
+    (see `memo.enable_caches`).
+
     If you want to look at what your discard options could be when dealt
     the 6 card starting hand, you can specify your hand and your
     discard cards.
@@ -80,69 +141,481 @@ def expected_average(hand, discard=None, **kwargs):
           to the caller for writing to STDOUT (or logging or etc...)
         - DEFAULT - None
 
-    # Return
+    distribution:bool
+        - Return the distribution of the hand value over the cut cards
+          (see `ScoreDistribution`) instead of the average. It is
+          counted from the score of the hand with every cut card left
+          (see `cards.score_vector`).
+        - DEFAULT - False
 
-    The average hand value.
+    # Return
 
-    If verbose mode is activate a tuple will be returned, the average
-    hand value and the list of hands and cut cards along with the hand
-    value.
+    The average hand value, a float. With `distribution` the
+    ScoreDistribution of the hand value, its mean is the average.
 
     """
 
     assert len(hand) == 4
 
     callback = kwargs.get("callback", None)
+    distribution = kwargs.get("distribution", False)
 
-    # Construct the deck removing the cards from the hand
-    deck = [c for c in make_deck() if c not in hand]
+    # The verbose breakdown and the distribution are always calculated
+    cache = None if callback or distribution else get_cache("expected_average")
 
-    # Remove discards from the deck
-    if discard:
-        deck = [c for c in deck if c not in discard]
+    if cache is not None:
+        key = expected_average_key(hand, discard)
+        value = cache.lookup(key)
 
-    # total = sum([score_hand(hand, cut) for cut in deck])
+        if value is not MISSING:
+            return value
 
-    # this to implement a callback so we can have verbose mode :(
-    total = 0
-    for i, cut in enumerate(deck):
+    if _hand_table is not None and not callback and not distribution:
+        value = _hand_table.expected_average(hand, discard)
 
-        value = score_hand(hand, cut)
-        total += value
+        if cache is not None:
+            cache.store(key, value)
 
-        if callback:
+        return value
 
+    # The fifteens, pairs and runs only depend on the rank of the cut
+    # card and the flush and nobs only on the suit. Count the cards left
+    # in the deck by rank and by suit so each rank (and suit) is scored
+    # once and weighted by the number of cut cards that share it.
+    rank_count = [4] * len(RANKS)
+    suit_count = [13] * len(SUITS)
 
-            callback(
-                f"{i:>2}: {display_hand(sorted(hand) + [cut], cool=True, as_string=True)} = {value:>2}"
-            )
+    for card in list(hand) + list(discard or []):
+        rank_count[card.rank_ordinal] -= 1
+        suit_count[card.suit_ordinal] -= 1
+
+    rank_scores = cut_rank_scores(hand)
+    suit_scores = cut_suit_scores(hand)
+
+    if callback:
+
+        display = display_hand(sorted(hand), cool=True, as_string=True)
+
+        for rank, count, value in zip(RANKS, rank_count, rank_scores):
+            if count:
+                callback(f"{rank:>2} x {count}: {display}, {rank} = {value:>2}")
+
+        for suit, count, value in zip(SUITS, suit_count, suit_scores):
+            if count and value:
+                callback(f"{SUIT_SYMBOLS[suit]:>2} x {count:>2}: flush and nobs = +{value}")
+
+    if distribution:
+        # the score with every cut card left, see `score_vector`
+        scores = score_vector(hand, exclude=discard)
+
+        return ScoreDistribution(Counter(scores.compressed().tolist()))
+
+    total = sum(c * v for c, v in zip(rank_count, rank_scores))
+    total += sum(c * v for c, v in zip(suit_count, suit_scores))
+
+    value = total / sum(rank_count)
+
+    if cache is not None:
+        cache.store(key, value)
+
+    return value
+
+
+def expected_averages(hand):
+    """
+    Given a 6 card hand, return the expected average of each 4 card hand
+    that can be kept from it, see `expected_average`.
+
+    The 15 hands are evaluated together in one pass over the cut ranks.
+    They share the cards left in the deck, the 46 cards not in the 6
+    card hand, and the points for the fifteens, pairs and runs come from
+    the subsets of the 6 cards they share (see `keep_rank_scores`).
+
+    # Parameters
+
+    hand:list(Card)
+        - The 6 cards
+
+    # Return
+
+    A list of 15 expected averages, one for each hand in the order of
+    `discard_splits`. They are the same as
+    `expected_average(ch, discard)`.
+
+    """
+
+    assert len(hand) == 6
+
+    rank_count = [4] * len(RANKS)
+    suit_count = [13] * len(SUITS)
+
+    for card in hand:
+        rank_count[card.rank_ordinal] -= 1
+        suit_count[card.suit_ordinal] -= 1
+
+    cuts = sum(rank_count)
+    jack = RANKS.index("J")
+
+    averages = []
+    for ch, rank_scores in zip(
+        hand_combinations(hand, combination_length=4), keep_rank_scores(hand)
+    ):
+        total = sum(map(mul, rank_count, rank_scores))
+
+        # the flush and nobs, see `cut_suit_scores`
+        suits = [0] * len(SUITS)
+        for card in ch:
+            suits[card.suit_ordinal] += 1
+
+            if card.rank_ordinal == jack:
+                total += suit_count[card.suit_ordinal]
+
+        for suit, matches in enumerate(suits):
+            if matches == 4:
+                total += 4 * cuts + suit_count[suit]
+
+            elif matches == 3:
+                total += 4 * suit_count[suit]
+
+        averages.append(total / cuts)
+
+    return averages
+
+
+def expected_average_key(hand, discard=None):
+    """
+    Return a key for the expected average of the hand. Two hands with
+    the same key have the same expected average (see `expected_average`).
+
+    The points that depend on the ranks only depend on the ranks of the
+    hand and of the cards removed from the deck. The points that depend
+    on the suits (flush and nobs) only depend on, for each suit, the
+    number of cards of the hand in the suit when it is 3 or 4, if the
+    hand holds the jack of the suit and the number of cards of the suit
+    left in the deck. Relabeling the suits doesn't change them, so they
+    are sorted.
+
+    # Parameters
+
+    hand:list(Card)
+        - The list of 4 cards of the hand.
+
+    discard:list(Card)
+        - The list of cards that we know are not in the deck and are not
+          a part of the hand.
+        - DEFAULT - None
+
+    # Return
+
+    A hashable key.
+
+    """
+
+    jack = RANKS.index("J")
+
+    cards = [0] * len(SUITS)
+    jacks = [0] * len(SUITS)
+    left = [13] * len(SUITS)
+
+    for card in hand:
+        cards[card.suit_ordinal] += 1
+        jacks[card.suit_ordinal] += card.rank_ordinal == jack
+        left[card.suit_ordinal] -= 1
+
+    for card in discard or ():
+        left[card.suit_ordinal] -= 1
+
+    suits = sorted(
+        (c if c >= 3 else 0, j, n) for c, j, n in zip(cards, jacks, left)
+    )
+
+    return (
+        tuple(sorted(c.rank_ordinal for c in hand)),
+        tuple(sorted(c.rank_ordinal for c in discard or ())),
+        tuple(suits),
+    )
+
+
+# ------------
+# Distributions
+
+
+class ScoreDistribution:
+    """
+    The exact distribution of the score of a hand or a crib over the
+    cards left in the deck.
+
+    # Parameters
+
+    histogram:dict
+        - The number of ways to score each number of points
+
+    """
+
+    def __init__(self, histogram):
+
+        self.histogram = {s: w for s, w in sorted(histogram.items()) if w}
+
+        self.count = sum(self.histogram.values())
+        self.total = sum(s * w for s, w in self.histogram.items())
+
+    def __repr__(self):
+        return f"ScoreDistribution({self.histogram})"
+
+    @property
+    def mean(self):
+        """
+        The expected average, the same value as `expected_average` or
+        `expected_average_crib`.
+        """
+
+        return self.total / self.count
+
+    @property
+    def variance(self):
+        squares = sum(s * s * w for s, w in self.histogram.items())
+
+        return (squares * self.count - self.total**2) / self.count**2
+
+    @property
+    def std(self):
+        return sqrt(self.variance)
+
+    def probability(self, score):
+        """
+        Return the probability of scoring exactly `score` points.
+        """
+
+        return self.histogram.get(score, 0) / self.count
+
+    def at_least(self, score):
+        """
+        Return the probability of scoring `score` points or more.
+        """
+
+        return sum(w for s, w in self.histogram.items() if s >= score) / self.count
+
+    def percentile(self, q):
+        """
+        Return the smallest score that at least q percent of the outcomes
+        are less than or equal to.
+        """
+
+        ways = 0
+        for s, w in self.histogram.items():
+            ways += w
+
+            if ways * 100 >= q * self.count:
+                return s
+
+        return s
+
+
+# ------------
+# Process Pool
+
+# The number of crib pairs sent to a worker process in one task
+CRIB_CHUNK_SIZE = 128
+
+_executor = None
+_executor_workers = None
+_executor_caches = None
 
-    return total/len(deck)
+# The shared memory segment holding the rank tables for the workers
+_shared_tables = None
 
 
-def _calc_crib_average(pair, discard=None, base_cards=None):
+def _share_rank_tables():
     """
-    Form a crib hand from the two base_cards and the cards in the pair.
-    Provide discard cards to get a better estimate of the average.
+    Copy the rank score and rank count tables into one shared memory
+    segment: RANK_MULTISETS bytes of scores followed by RANK_MULTISETS
+    unsigned 16 bit counts.
+    """
+
+    scores = rank_score_table()
+    counts = rank_count_table().tobytes()
+
+    shm = SharedMemory(create=True, size=len(scores) + len(counts))
+    shm.buf[: len(scores)] = scores
+    shm.buf[len(scores) : len(scores) + len(counts)] = counts
+
+    return shm
+
+
+def _attach_rank_tables(name, caches=None):
+    """
+    The worker process initializer. Use the rank tables in the shared
+    memory segment, read-only and without a copy, instead of building
+    them in every worker. Enable the caches (see `memo.cache_sizes`),
+    each worker has its own.
+    """
+
+    global _shared_tables
+
+    if caches:
+        enable_caches(caches)
+
+    _shared_tables = SharedMemory(name=name)
+
+    n = RANK_MULTISETS
+    buffer = _shared_tables.buf.toreadonly()
+
+    set_rank_tables(buffer[:n], buffer[n : 3 * n].cast("H"))
+
+
+def get_executor(workers=None):
+    """
+    Return the process pool shared by the analytics methods. The pool is
+    created on the first call and reused by the calls that follow so the
+    worker processes are only started once. Asking for a different
+    number of workers replaces the pool.
+
+    The workers read the rank tables from one shared memory segment
+    created with the pool. They are started with the same caches as this
+    process (see `memo.enable_caches`), enabling other caches replaces
+    the pool.
+
+    # Parameters
+
+    workers:int
+        - The number of worker processes. None uses every core.
+        - DEFAULT - None
+
+    # Return
+
+    A concurrent.futures.ProcessPoolExecutor
+
+    """
+
+    global _executor
+    global _executor_workers
+    global _executor_caches
+    global _shared_tables
+
+    workers = workers or os.cpu_count() or 1
+    caches = cache_sizes()
+
+    if _executor is None or _executor_workers != workers or _executor_caches != caches:
+        shutdown_executor()
 
-    Returns the result
+        _shared_tables = _share_rank_tables()
+
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_attach_rank_tables,
+            initargs=(_shared_tables.name, caches),
+        )
+        _executor_workers = workers
+        _executor_caches = caches
+
+    return _executor
+
+
+def shutdown_executor():
+    """
+    Shutdown the shared process pool, if it has been started, and
+    release the shared memory segment.
+    """
+
+    global _executor
+    global _executor_workers
+    global _executor_caches
+    global _shared_tables
+
+    if _executor is not None:
+        _executor.shutdown()
+
+    if _shared_tables is not None:
+        _shared_tables.close()
+        _shared_tables.unlink()
+
+    _executor = None
+    _executor_workers = None
+    _executor_caches = None
+    _shared_tables = None
+
+
+atexit.register(shutdown_executor)
+
+
+def _calc_crib_averages(task):
+    """
+    Form a crib from the two base cards and each pair of cards in the
+    task and return the total of the expected averages of the cribs and
+    the number of cribs. The hand cards are known, they can't be the
+    cut card.
+
+    The task is a bytes object of card indices: the 2 base cards, the 4
+    hand cards and then 3 bytes per pair, the 2 cards and the number of
+    equivalent pairs it stands for (see `_crib_tasks`). It is cheap to
+    send to the worker processes.
 
     This is for multiprocessing in the expected_average_crib method.
 
     """
 
-    assert len(base_cards) == 2
-    assert len(pair) == 2
+    base = [Card.from_index(i) for i in task[:2]]
+    hand = [Card.from_index(i) for i in task[2:6]]
+
+    total = 0
+    count = 0
+
+    for i in range(6, len(task), 3):
+        a, b, weight = task[i : i + 3]
+
+        total += weight * expected_average(
+            base + [Card.from_index(a), Card.from_index(b)], hand
+        )
+        count += weight
+
+    return total, count
+
+
+def _crib_tasks(hand, discard):
+    """
+    Split the crib pairs left in the deck for the hand and discard into
+    tasks for `_calc_crib_averages`.
+
+    Pairs that form cribs with the same expected average (see
+    `expected_average_key`) are only sent once with the number of pairs
+    they stand for.
+    """
+
+    deck = FULL_DECK - CardSet(hand) - CardSet(discard)
 
-    crib = base_cards + list(pair)
+    header = bytes(c.index for c in list(discard) + list(hand))
 
-    # use the hand as the discard i.e. we know about those values
-    hand_average = expected_average(crib, discard)
+    pairs = {}
+    for a, b in hand_combinations(list(deck), combination_length=2):
+        key = expected_average_key(list(discard) + [a, b], hand)
 
-    return hand_average
+        if key in pairs:
+            pairs[key][2] += 1
 
+        else:
+            pairs[key] = [a.index, b.index, 1]
 
-def expected_average_crib(hand, discard):
+    pairs = bytes(i for pair in pairs.values() for i in pair)
+
+    size = 3 * CRIB_CHUNK_SIZE
+
+    return [header + pairs[i : i + size] for i in range(0, len(pairs), size)]
+
+
+def _map_crib_tasks(tasks, workers=None):
+    """
+    Run the crib tasks, in the shared process pool, and return the
+    (total, count) of each task in order. With 1 worker the tasks are
+    run in this process.
+    """
+
+    if workers == 1:
+        return [_calc_crib_averages(t) for t in tasks]
+
+    return list(get_executor(workers).map(_calc_crib_averages, tasks))
+
+
+def expected_average_crib_enumerated(hand, discard, workers=None):
     """
     Given the 4 card hand and the 2 card discard, calculate the expected
     crib average value by iterating through rest of the cards in the
@@ -167,6 +640,9 @@ def expected_average_crib(hand, discard):
     6. divide the total by the number of crib hands to determine the
     crib average
 
+    This scores all 990 cribs with 44 cut cards. It is used to check
+    `expected_average_crib`, which computes the same value directly.
+
     # Parameters
 
     hand:list(Card)
@@ -176,6 +652,11 @@ def expected_average_crib(hand, discard):
     discard:list(Card)
         - A list of 2 cards we are discarding to the crib
 
+    workers:int
+        - The number of worker processes to use (see `get_executor`).
+          1 runs in this process.
+        - DEFAULT - None - use every core
+
     # Return
 
     The expected average value of the crib formed by the discarded cards.
@@ -185,18 +666,536 @@ def expected_average_crib(hand, discard):
     assert len(hand) == 4
     assert len(discard) == 2
 
-    deck = [c for c in make_deck() if c not in hand + discard]
-
     # The discarded cards will form the crib We assign the hand to the
     # discard so that the method knows what other cards to remove from
     # the deck to get an accurate average.
-    fn = partial(_calc_crib_average, discard=hand, base_cards=discard)
+    results = _map_crib_tasks(_crib_tasks(hand, discard), workers)
+
+    return sum(t for t, _ in results) / sum(c for _, c in results)
+
+
+# ------------
+# Crib Points
+
+# The crib table used by expected_average_crib, see set_crib_table
+_crib_table = None
+
+
+def set_crib_table(table):
+    """
+    Set the crib table (see `tables.load_crib_table`) that
+    `expected_average_crib` uses to look up the crib averages. Set it to
+    None to compute the averages.
+
+    # Parameters
+
+    table:CribTable
+        - An object with an `expected_average_crib(hand, discard)`
+          method or None.
+
+    """
+
+    global _crib_table
+
+    _crib_table = table
+
+
+# The discard table used by discard_consider_all_combos, see
+# set_discard_table
+_discard_table = None
+
+
+def set_discard_table(table):
+    """
+    Set the discard table (see `tables.load_discard_table`) that
+    `discard_consider_all_combos` uses to look up the results. Set it to
+    None to compute the results.
+
+    # Parameters
+
+    table:DiscardTable
+        - An object with a `lookup(hand)` method or None.
+
+    """
+
+    global _discard_table
+
+    _discard_table = table
+
+
+# The pegging table used by discard_results, see set_pegging_table
+_pegging_table = None
+
+
+def set_pegging_table(table):
+    """
+    Set the pegging table (see `tables.load_pegging_table`) that
+    `discard_consider_all_combos` uses to add the expected pegging to
+    the results. Set it to None to leave it out.
+
+    # Parameters
+
+    table:PeggingTable
+        - An object with an `expected_pegging(hand)` method or None.
+
+    """
+
+    global _pegging_table
+
+    _pegging_table = table
+
+
+def _crib_deck(hand, discard):
+    """
+    Return the number of cards of each rank and of each suit left in the
+    deck once the hand and the discard are removed.
+    """
+
+    rank_count = [4] * len(RANKS)
+    suit_count = [13] * len(SUITS)
+
+    for card in list(hand) + list(discard):
+        rank_count[card.rank_ordinal] -= 1
+        suit_count[card.suit_ordinal] -= 1
 
-    # Use max cores
-    with Pool(processes=None) as p:
-        crib_averages = p.map(fn, hand_combinations(deck, combination_length=2))
+    return rank_count, suit_count
 
-    return sum(crib_averages) / len(crib_averages)
+
+def crib_count(hand, discard):
+    """
+    Return the number of ways to complete the crib formed by the
+    discard: the pairs of cards left in the deck times the number of cut
+    cards left.
+
+    # Parameters
+
+    hand:list(Card)
+        - The cards kept in hand, they are not in the deck.
+
+    discard:list(Card)
+        - The 2 cards discarded to the crib
+
+    # Return
+
+    The number of cribs and cut cards.
+
+    """
+
+    n = 52 - len(hand) - len(discard)
+
+    return comb(n, 2) * (n - 2)
+
+
+def crib_rank_points(hand, discard):
+    """
+    Return the fifteens, pairs and runs points of every crib formed by
+    the discard and 2 cards left in the deck with every cut card left in
+    the deck, added together.
+
+    The points only depend on the 5 ranks, and not on which unknown card
+    is the cut. Each multiset of 3 ranks is scored once (see
+    `rank_score_table`) and weighted by the number of 3 card sets with
+    those ranks, C(cards left of the rank, count) for each rank, times 3
+    for the choice of the cut card.
+
+    # Parameters
+
+    hand:list(Card)
+        - The cards kept in hand, they are not in the deck.
+
+    discard:list(Card)
+        - The 2 cards discarded to the crib
+
+    # Return
+
+    The total points (int).
+
+    """
+
+    rank_count, _ = _crib_deck(hand, discard)
+
+    table = rank_score_table()
+    discard_ranks = [c.rank_ordinal for c in discard]
+
+    total = 0
+    for ranks in combinations_with_replacement(range(len(RANKS)), 3):
+
+        weight = 1
+        for r in set(ranks):
+            weight *= comb(rank_count[r], ranks.count(r))
+
+        if weight:
+            index = rank_multiset_index(sorted(discard_ranks + list(ranks)))
+            total += weight * table[index]
+
+    return total * 3
+
+
+@lru_cache(maxsize=None)
+def _crib_flush_points(suit_count, discard_suits, five_card_flush):
+    """
+    Return the flush points of every crib formed by the discard suits
+    and 2 cards left in the deck with every cut card left in the deck.
+    The points only depend on the number of cards of each suit left in
+    the deck and the suits of the discard so they are cached.
+    """
+
+    # the 2 crib cards are ordered here, every crib is counted twice
+    flushes = 0
+    for a, b, cut in product(range(len(SUITS)), repeat=3):
+
+        count = (
+            suit_count[a]
+            * (suit_count[b] - (b == a))
+            * (suit_count[cut] - (cut == a) - (cut == b))
+        )
+
+        if count <= 0:
+            continue
+
+        suits = [*discard_suits, a, b]
+        matches = suits.count(cut)
+
+        if matches == 4:
+            flush = 5
+
+        elif (matches == 3 or len(set(suits)) == 1) and not five_card_flush:
+            flush = 4
+
+        else:
+            flush = 0
+
+        flushes += count * flush
+
+    return flushes // 2
+
+
+def crib_suit_points(hand, discard, include_nibs=False, five_card_flush=False):
+    """
+    Return the flush, nobs and nibs points of every crib formed by the
+    discard and 2 cards left in the deck with every cut card left in the
+    deck, added together.
+
+    The flush only depends on the suits. Each combination of suits for
+    the 2 crib cards and the cut is weighted by the number of cards left
+    of those suits. The nobs and nibs are counted from the jacks in the
+    discard and the jacks left in the deck.
+
+    # Parameters
+
+    hand:list(Card)
+        - The cards kept in hand, they are not in the deck.
+
+    discard:list(Card)
+        - The 2 cards discarded to the crib
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    # Return
+
+    The total points (int).
+
+    """
+
+    jack = RANKS.index("J")
+
+    rank_count, suit_count = _crib_deck(hand, discard)
+    n = sum(rank_count)
+
+    # flush
+    total = _crib_flush_points(
+        tuple(suit_count),
+        tuple(sorted(c.suit_ordinal for c in discard)),
+        five_card_flush,
+    )
+
+    # nobs - a jack in the crib and a cut card of the same suit
+    known = CardSet(hand) | CardSet(discard)
+
+    for suit in range(len(SUITS)):
+
+        card = Card.from_index(jack * len(SUITS) + suit)
+
+        if card in discard:
+            # any cut of the suit, any pair from the other cards
+            total += suit_count[suit] * comb(n - 1, 2)
+
+        elif card not in known:
+            # the jack is one of the pair, the cut is another card of
+            # the suit and the other card of the pair is anything else
+            total += (suit_count[suit] - 1) * (n - 2)
+
+    # nibs - the cut card is a jack
+    if include_nibs:
+        total += 2 * rank_count[jack] * comb(n - 1, 2)
+
+    return total
+
+
+@lru_cache(maxsize=None)
+def _crib_suit_bonus(discard_suits, discard_jacks, pair, cut, same, five_card_flush):
+    """
+    Return the ((points, ways), ...) of the flush and nobs points of the
+    cribs formed by the discard and 2 cards of the pair ranks with a cut
+    card of the cut rank.
+
+    The points only depend on the suits of the discard, the suits of the
+    jacks in the discard and, for each of the 3 unknown cards, the suits
+    left of its rank, if it is a jack and which of the ranks are the
+    same. They are cached by those so the ranks share the results.
+
+    pair and cut are (suits left mask, is jack) tuples, pair holds 2.
+    same is (pair ranks equal, cut equals first, cut equals second).
+    """
+
+    (a_suits, a_jack), (b_suits, b_jack) = pair
+    c_suits, c_jack = cut
+    pair_same, first_same, second_same = same
+
+    bonus = Counter()
+
+    for sa, sb in product(range(len(SUITS)), repeat=2):
+
+        # the pair is unordered when the ranks are the same
+        if not (a_suits >> sa & 1 and b_suits >> sb & 1) or (pair_same and sa >= sb):
+            continue
+
+        suits = [*discard_suits, sa, sb]
+        jacks = [*discard_jacks] + [sa] * a_jack + [sb] * b_jack
+
+        for sc in range(len(SUITS)):
+
+            if not c_suits >> sc & 1:
+                continue
+
+            if (first_same and sc == sa) or (second_same and sc == sb):
+                continue
+
+            matches = suits.count(sc)
+
+            if matches == 4:
+                points = 5
+
+            elif (matches == 3 or len(set(suits)) == 1) and not five_card_flush:
+                points = 4
+
+            else:
+                points = 0
+
+            # nobs - a jack in the crib of the cut suit
+            points += jacks.count(sc)
+
+            bonus[points] += 1
+
+    return tuple(bonus.items())
+
+
+def crib_distribution(hand, discard, include_nibs=False, five_card_flush=False):
+    """
+    Return the exact distribution (see `ScoreDistribution`) of the points
+    of every crib formed by the discard and 2 cards left in the deck with
+    every cut card left in the deck.
+
+    Like `crib_rank_points`, the fifteens, pairs and runs points are
+    looked up once for each combination of ranks of the 2 crib cards and
+    the cut. The flush and nobs points of the suits those ranks can have
+    are added to them (see `_crib_suit_bonus`). The mean is the same
+    value as `expected_average_crib`.
+
+    # Parameters
+
+    hand:list(Card)
+        - The cards kept in hand, they are not in the deck.
+
+    discard:list(Card)
+        - The 2 cards discarded to the crib
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    # Return
+
+    A ScoreDistribution
+
+    """
+
+    jack = RANKS.index("J")
+
+    known = CardSet(hand) | CardSet(discard)
+
+    # the suits left in the deck of each rank
+    left = [0] * len(RANKS)
+    for card in FULL_DECK - known:
+        left[card.rank_ordinal] |= 1 << card.suit_ordinal
+
+    ranks = [(left[r], r == jack) for r in range(len(RANKS))]
+
+    discard_ranks = [c.rank_ordinal for c in discard]
+    discard_suits = tuple(sorted(c.suit_ordinal for c in discard))
+    discard_jacks = tuple(sorted(c.suit_ordinal for c in discard if c.rank_ordinal == jack))
+
+    table = rank_score_table()
+
+    histogram = Counter()
+
+    for a, b in combinations_with_replacement(range(len(RANKS)), 2):
+        for c in range(len(RANKS)):
+
+            bonus = _crib_suit_bonus(
+                discard_suits,
+                discard_jacks,
+                (ranks[a], ranks[b]),
+                ranks[c],
+                (a == b, c == a, c == b),
+                five_card_flush,
+            )
+
+            if not bonus:
+                continue
+
+            points = table[rank_multiset_index(sorted(discard_ranks + [a, b, c]))]
+
+            if include_nibs and c == jack:
+                points += 2
+
+            for extra, ways in bonus:
+                histogram[points + extra] += ways
+
+    return ScoreDistribution(histogram)
+
+
+def crib_key(hand, discard):
+    """
+    Return a key for the expected crib average of the discard. Two
+    splits with the same key have the same expected crib average (see
+    `expected_average_crib`).
+
+    The rank points only depend on the ranks of the discard and the
+    hand (see `crib_rank_points`). The suit points only depend on, for
+    each suit, the number of cards discarded in the suit, if the jack of
+    the suit is discarded or left in the deck and the number of cards of
+    the suit left in the deck (see `crib_suit_points`). Relabeling the
+    suits doesn't change them, so they are sorted.
+
+    # Parameters
+
+    hand:list(Card)
+        - The cards kept in hand, they are not in the deck.
+
+    discard:list(Card)
+        - The 2 cards discarded to the crib
+
+    # Return
+
+    A hashable key.
+
+    """
+
+    jack = RANKS.index("J")
+
+    cards = [0] * len(SUITS)
+    jacks = [0] * len(SUITS)
+    left_jacks = [1] * len(SUITS)
+    left = [13] * len(SUITS)
+
+    for card in discard:
+        cards[card.suit_ordinal] += 1
+        jacks[card.suit_ordinal] += card.rank_ordinal == jack
+
+    for card in list(hand) + list(discard):
+        left[card.suit_ordinal] -= 1
+        left_jacks[card.suit_ordinal] -= card.rank_ordinal == jack
+
+    return (
+        tuple(sorted(c.rank_ordinal for c in discard)),
+        tuple(sorted(c.rank_ordinal for c in hand)),
+        tuple(sorted(zip(cards, jacks, left_jacks, left))),
+    )
+
+
+def expected_average_crib(
+    hand, discard, include_nibs=False, five_card_flush=False, distribution=False
+):
+    """
+    Given the 4 card hand and the 2 card discard, calculate the expected
+    crib average value. This is the average of every crib formed by the
+    discard and 2 cards left in the deck scored with every cut card left
+    in the deck, the same value as `expected_average_crib_enumerated`.
+
+    Instead of scoring each crib, the 3 unknown cards (2 crib cards and
+    the cut) are counted, see `crib_rank_points` and `crib_suit_points`.
+
+    If the crib table is active (see `set_crib_table`) it is used for
+    the default scoring rules. The averages are cached if the
+    `expected_average_crib` cache is enabled (see `memo.enable_caches`).
+
+    # Parameters
+
+    hand:list(Card)
+        - The list of 4 cards of the hand we want to keep
+
+    discard:list(Card)
+        - A list of 2 cards we are discarding to the crib
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    distribution:bool
+        - Return the distribution of the crib points (see
+          `crib_distribution`) instead of the average.
+        - DEFAULT - False
+
+    # Return
+
+    The expected average value of the crib formed by the discarded cards.
+
+    """
+
+    assert len(hand) == 4
+    assert len(discard) == 2
+
+    if distribution:
+        return crib_distribution(hand, discard, include_nibs, five_card_flush)
+
+    cache = get_cache("expected_average_crib")
+
+    if cache is not None:
+        key = (crib_key(hand, discard), include_nibs, five_card_flush)
+        value = cache.lookup(key)
+
+        if value is not MISSING:
+            return value
+
+    if _crib_table is not None and not include_nibs and not five_card_flush:
+        value = _crib_table.expected_average_crib(hand, discard)
+
+    else:
+        total = crib_rank_points(hand, discard) + crib_suit_points(
+            hand, discard, include_nibs=include_nibs, five_card_flush=five_card_flush
+        )
+
+        value = total / crib_count(hand, discard)
+
+    if cache is not None:
+        cache.store(key, value)
+
+    return value
 
 
 def discard_consider_all_combos(hand, **kwargs):
@@ -223,6 +1222,25 @@ def discard_consider_all_combos(hand, **kwargs):
           to the caller for writing to STDOUT (or logging or etc...)
         - DEFAULT - None
 
+    exact:bool
+        - Score every crib and cut card to find the expected crib
+          average (see `expected_average_crib_enumerated`) instead of
+          `expected_average_crib`. The discard table (see
+          `set_discard_table`) is used, if it is active, unless this is
+          set.
+        - DEFAULT - False
+
+    workers:int
+        - The number of worker processes to use with `exact` (see
+          `get_executor`). 1 runs in this process.
+        - DEFAULT - None - use every core
+
+    distribution:bool
+        - Add the distributions of the hand and crib points (see
+          `ScoreDistribution`) to the results. The crib distribution is
+          exact so `exact` isn't needed.
+        - DEFAULT - False
+
     # Return
 
     A generator yielding one dictionary of results at a time.
@@ -234,32 +1252,134 @@ def discard_consider_all_combos(hand, **kwargs):
       the potential cut card.
     - `expected_average_crib` - The expected average of the crib given
       the 2 discarded cards.
+    - `distribution` - The distribution of the hand value, if requested.
+    - `crib_distribution` - The distribution of the crib value, if
+      requested.
+    - `expected_pegging_pone` - The expected pegging points of the hand
+      less the points of the dealer, when it is played as the pone. Only
+      if a pegging table is set (see `set_pegging_table`).
+    - `expected_pegging_dealer` - The same when the hand is played as the
+      dealer.
+    - `combined_delta_pone` - delta_pone plus expected_pegging_pone
+    - `combined_delta_dealer` - delta_dealer plus expected_pegging_dealer
 
     """
 
     assert len(hand) == 6
 
     callback = kwargs.get("callback", None)
+    exact = kwargs.get("exact", False)
+    workers = kwargs.get("workers", None)
+    distribution = kwargs.get("distribution", False)
 
-    combos = []
-    for i, candidate_hand in enumerate(
-        hand_combinations(hand, combination_length=4), start=1
-    ):
-
-        ch = list(candidate_hand)
-        discard = list(set(hand) - set(candidate_hand))
+    splits = discard_splits(hand)
 
-        if callback:
+    if callback:
+        for i, (ch, discard) in enumerate(splits, start=1):
             callback(
-                f"{i:>2} H = {display_hand(sorted(candidate_hand), cool=True)} D = {display_hand(sorted(discard), cool=True)}"
+                f"{i:>2} H = {display_hand(sorted(ch), cool=True)} D = {display_hand(sorted(discard), cool=True)}"
             )
 
+    if distribution:
+        hands = [expected_average(ch, d, distribution=True) for ch, d in splits]
+        cribs = {}
+
+        for ch, d in splits:
+            key = crib_key(ch, d)
+
+            if key not in cribs:
+                cribs[key] = crib_distribution(ch, d)
+
+        cribs = [cribs[crib_key(ch, d)] for ch, d in splits]
+
+        results = discard_results(
+            splits, [h.mean for h in hands], [c.mean for c in cribs]
+        )
+
+        for result, h, c in zip(results, hands, cribs):
+            result["distribution"] = h
+            result["crib_distribution"] = c
+
+        return results
+
+    if _discard_table is not None and not exact:
+        return _discard_table.lookup(hand)
+
+    # Splits that are the same once the suits are relabeled have the
+    # same crib averages, only compute each one once
+    crib_keys = [crib_key(ch, discard) for ch, discard in splits]
+
+    cribs = {}
+    for key, (ch, discard) in zip(crib_keys, splits):
+        cribs.setdefault(key, (ch, discard))
+
+    if exact:
+        # Submit the crib pairs of every split as one batch of tasks so
+        # the workers stay busy across the splits
+        tasks = {key: _crib_tasks(ch, discard) for key, (ch, discard) in cribs.items()}
+        results = iter(
+            _map_crib_tasks([t for split in tasks.values() for t in split], workers)
+        )
+
+        for key, split in tasks.items():
+            totals = [next(results) for _ in split]
+            cribs[key] = sum(t for t, _ in totals) / sum(c for _, c in totals)
+
+    else:
+        for key, (ch, discard) in cribs.items():
+            cribs[key] = expected_average_crib(ch, discard)
+
+    if get_cache("expected_average") is None:
+        hand_averages = expected_averages(hand)
+
+    else:
+        # use the cached averages
+        hand_averages = [expected_average(ch, discard) for ch, discard in splits]
+
+    return discard_results(splits, hand_averages, [cribs[k] for k in crib_keys])
+
+
+def discard_splits(hand):
+    """
+    Given a 6 card hand, return the 15 ways to split it into a 4 card
+    hand and a 2 card discard.
+
+    # Parameters
+
+    hand:list(Card)
+        - The 6 cards
+
+    # Return
+
+    A list of (hand, discard) tuples, the hands in the order of
+    `hand_combinations(hand, 4)`.
+
+    """
+
+    return [
+        (list(candidate_hand), list(CardSet(hand) - CardSet(candidate_hand)))
+        for candidate_hand in hand_combinations(hand, combination_length=4)
+    ]
+
+
+def discard_results(splits, hand_averages, crib_averages):
+    """
+    Return the results of `discard_consider_all_combos` for the splits
+    (see `discard_splits`) with the given hand and crib expected
+    averages.
+    """
+
+    combos = []
+    for (ch, discard), hand_average, crib_average in zip(
+        splits, hand_averages, crib_averages
+    ):
+
         values = {
             "hand": ch,
             "value": score_hand(ch, None),
             "discard": discard,
-            "expected_average": expected_average(ch, discard),
-            "expected_average_crib": expected_average_crib(ch, discard),
+            "expected_average": hand_average,
+            "expected_average_crib": crib_average,
         }
 
         # subtract the expected crib average from the expected hand average of the pone
@@ -272,6 +1392,15 @@ def discard_consider_all_combos(hand, **kwargs):
             values["expected_average"] + values["expected_average_crib"]
         )
 
+        if _pegging_table is not None:
+            pone, dealer = _pegging_table.expected_pegging(ch)
+
+            values["expected_pegging_pone"] = pone
+            values["expected_pegging_dealer"] = dealer
+
+            values["combined_delta_pone"] = values["delta_pone"] + pone
+            values["combined_delta_dealer"] = values["delta_dealer"] + dealer
+
         combos.append(values)
 
     return combos
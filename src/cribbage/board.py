@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+A module for the probability of winning the game from a position on
+the board.
+
+A game is a race to 121 points. The points of a deal are pegged in
+this order, the first player to reach 121 wins:
+
+1. the cut - the dealer pegs 2 for his heels (a jack is cut)
+2. the play - the pegging points of the pone and then the dealer
+3. the show - the pone counts their hand, then the dealer counts their
+   hand and the crib
+
+During the play the players peg in turns, the model gives the pone all
+of their pegging points before the dealer.
+
+# Deal Model
+
+The points of each step are drawn from independent distributions (see
+`DealModel`):
+
+- heels - the 2 points of the dealer for his heels
+- pone_pegging - the pegging points of the pone
+- dealer_pegging - the pegging points of the dealer
+- pone_hand - the show of the pone
+- dealer_hand - the show of the dealer
+- crib - the show of the crib
+
+The show distributions are sampled from random deals where both players
+discard by `analytics.discard_consider_all_combos`, the pone maximizing
+`delta_pone` and the dealer `delta_dealer`, and every cut card left is
+counted (see `deal_model`). The kept hands are played out with
+`pegging.greedy_policy`, both players lay the card that pegs the most
+points, for the pegging distributions. The pegging of the two players
+is treated as independent.
+
+# Win Table
+
+The win table, W[a, b], is the probability that the dealer wins from a
+dealer score of a and a pone score of b at the start of a deal. After
+the deal the dealer becomes the pone, so the value of the position
+after the deal is 1 - W[b', a']. The table is found by value iteration
+(see `win_table`), every sweep applies the 4 steps of the deal to the
+whole table as shifted sums of the 121 x 121 array.
+
+# Board Table
+
+The board table is the win table (121 rows) followed by the 5
+distributions of the model (one row each, padded with zeros). A copy
+ships with the package.
+
+"""
+
+# ------------
+# System Modules - Included with Python
+
+from pathlib import Path
+from typing import NamedTuple
+from operator import itemgetter
+
+# ------------
+# 3rd Party - From pip
+
+import numpy as np
+
+# ------------
+# Custom Modules
+
+from .cards import (
+    RANKS,
+    SUITS,
+    FULL_DECK,
+    score_vector,
+)
+
+from .pegging import (
+    greedy_policy,
+    play_hands,
+)
+
+from .analytics import (
+    crib_key,
+    crib_distribution,
+    expected_average,
+    discard_consider_all_combos,
+    get_executor,
+)
+
+from .tables import (
+    TableError,
+    default_table_path,
+    write_table,
+    load_table,
+)
+
+# -------------
+
+# The points needed to win
+GAME_POINTS = 121
+
+BOARD_TABLE_NAME = "board"
+
+# Increment this whenever the scoring rules or the deal model change.
+BOARD_TABLE_VERSION = 3
+
+# The distributions of the deal model, in the order of the table rows
+MODEL_FIELDS = (
+    "heels",
+    "pone_pegging",
+    "dealer_pegging",
+    "pone_hand",
+    "dealer_hand",
+    "crib",
+)
+
+BOARD_TABLE_ROWS = GAME_POINTS + len(MODEL_FIELDS)
+BOARD_TABLE_COLUMNS = GAME_POINTS
+
+# The board table that ships with the package
+BOARD_TABLE_PATH = Path(__file__).parent / "data" / f"{BOARD_TABLE_NAME}.tbl"
+
+# The number of deals sampled for the deal model
+DEFAULT_SAMPLES = 2_000
+
+# The number of deals sampled in one task
+_SAMPLE_CHUNK_SIZE = 50
+
+
+class DealModel(NamedTuple):
+    """
+    The probability of each number of points in the steps of a deal
+    (see the module documentation). Each field is an array, the value at
+    index k is the probability of k points.
+    """
+
+    heels: np.ndarray
+    pone_pegging: np.ndarray
+    dealer_pegging: np.ndarray
+    pone_hand: np.ndarray
+    dealer_hand: np.ndarray
+    crib: np.ndarray
+
+
+def probabilities(distribution):
+    """
+    Return an array of the probability of each number of points of the
+    `analytics.ScoreDistribution`.
+    """
+
+    p = np.zeros(max(distribution.histogram) + 1)
+
+    for score, ways in distribution.histogram.items():
+        p[score] = ways / distribution.count
+
+    return p
+
+
+def _sample_deals(task):
+    """
+    Deal the hands of the task, discard them, play the kept hands and
+    count the show of both hands and the crib with every cut card left.
+    Return the counts of the pone hand, dealer hand, crib, heels, pone
+    pegging and dealer pegging points.
+
+    Both players lay their cards with `pegging.greedy_policy`. The play
+    doesn't depend on the cut card, it is played once per deal.
+
+    The task is (seed, count). This is for multiprocessing in the
+    `deal_model` method.
+    """
+
+    seed, count = task
+
+    rng = np.random.default_rng(seed)
+    deck = list(FULL_DECK)
+
+    # no step of a deal scores anywhere near the width of the table
+    counts = np.zeros((6, BOARD_TABLE_COLUMNS), dtype=np.int64)
+    jack = RANKS.index("J")
+
+    for _ in range(count):
+        cards = [deck[i] for i in rng.choice(len(deck), 12, replace=False)]
+
+        pone = max(discard_consider_all_combos(cards[:6]), key=itemgetter("delta_pone"))
+        dealer = max(
+            discard_consider_all_combos(cards[6:]), key=itemgetter("delta_dealer")
+        )
+
+        crib = pone["discard"] + dealer["discard"]
+
+        # the hands and the crib with every cut card left, see
+        # `score_vector`
+        for row, hand in enumerate((pone["hand"], dealer["hand"], crib)):
+            scores = score_vector(
+                hand,
+                exclude=[c for c in cards if c not in hand],
+                five_card_flush=row == 2,
+            )
+            counts[row] += np.bincount(scores.compressed(), minlength=BOARD_TABLE_COLUMNS)
+
+        # his heels, a jack is cut
+        jacks = len(SUITS) - sum(c.rank_ordinal == jack for c in cards)
+        counts[3, 2] += jacks
+        counts[3, 0] += len(deck) - len(cards) - jacks
+
+        pone_points, dealer_points = play_hands(pone["hand"], dealer["hand"], greedy_policy)
+        counts[4, pone_points] += 1
+        counts[5, dealer_points] += 1
+
+    return counts
+
+
+def deal_model(samples=DEFAULT_SAMPLES, seed=0, workers=None, callback=None):
+    """
+    Sample the show distributions of the deal model from random deals
+    (see the module documentation).
+
+    # Parameters
+
+    samples:int
+        - The number of deals
+        - DEFAULT - DEFAULT_SAMPLES
+
+    seed:int
+        - The seed of the random deals, the same seed gives the same
+          model.
+        - DEFAULT - 0
+
+    workers:int
+        - The number of worker processes (see `analytics.get_executor`).
+          1 runs in this process.
+        - DEFAULT - None - use every core
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Return
+
+    The DealModel
+
+    """
+
+    seeds = np.random.SeedSequence(seed).spawn(
+        -(-samples // _SAMPLE_CHUNK_SIZE)
+    )
+
+    tasks = [
+        (s, min(_SAMPLE_CHUNK_SIZE, samples - i * _SAMPLE_CHUNK_SIZE))
+        for i, s in enumerate(seeds)
+    ]
+
+    if workers == 1:
+        results = map(_sample_deals, tasks)
+
+    else:
+        results = get_executor(workers).map(_sample_deals, tasks)
+
+    counts = 0
+    for i, result in enumerate(results, start=1):
+        counts = counts + result
+
+        if callback:
+            callback(f"Sampled {min(i * _SAMPLE_CHUNK_SIZE, samples):,} deals")
+
+    pone_hand, dealer_hand, crib, heels, pone_pegging, dealer_pegging = (
+        np.trim_zeros(c, "b") / c.sum() for c in counts
+    )
+
+    return DealModel(
+        heels=heels,
+        pone_pegging=pone_pegging,
+        dealer_pegging=dealer_pegging,
+        pone_hand=pone_hand,
+        dealer_hand=dealer_hand,
+        crib=crib,
+    )
+
+
+def _add_points(values, p, axis, win):
+    """
+    Give one of the players points drawn from p and return the expected
+    values.
+
+    # Parameters
+
+    values:numpy.ndarray
+        - The values of the positions after the points are pegged,
+          indexed by [dealer score, pone score].
+
+    p:numpy.ndarray
+        - The probability of each number of points
+
+    axis:int
+        - The player pegging the points, 0 for the dealer and 1 for the
+          pone
+
+    win:float
+        - The value of the positions where the player reaches
+          GAME_POINTS
+
+    """
+
+    n = values.shape[axis]
+
+    padding = [(0, 0), (0, 0)]
+    padding[axis] = (0, len(p) - 1)
+
+    padded = np.pad(values, padding, constant_values=win)
+
+    result = np.zeros_like(values)
+
+    for k, w in enumerate(p):
+        if w:
+            result += w * (padded[k : k + n] if axis == 0 else padded[:, k : k + n])
+
+    return result
+
+
+def _deal(after, heels, pone_pegging, dealer_pegging, pone_show, dealer_show):
+    """
+    Return the probability that the dealer wins from each position at
+    the start of a deal.
+
+    # Parameters
+
+    after:numpy.ndarray
+        - The probability that the dealer wins from each position after
+          the deal, indexed by [dealer score, pone score]. It can be a
+          slice of the board, the lower right corner is always the end
+          of the game.
+
+    heels, pone_pegging, dealer_pegging, pone_show, dealer_show:numpy.ndarray
+        - The probability of each number of points of the steps, the
+          dealer's show is the hand and the crib.
+
+    The steps are applied from the last to the first, his heels are
+    pegged before the play.
+
+    """
+
+    values = _add_points(after, dealer_show, 0, 1.0)
+    values = _add_points(values, pone_show, 1, 0.0)
+    values = _add_points(values, dealer_pegging, 0, 1.0)
+    values = _add_points(values, pone_pegging, 1, 0.0)
+
+    return _add_points(values, heels, 0, 1.0)
+
+
+def win_table(model, tolerance=1e-12, max_sweeps=10_000, callback=None):
+    """
+    Find the win table of the deal model by value iteration (see the
+    module documentation).
+
+    # Parameters
+
+    model:DealModel
+        - The distributions of the points of a deal
+
+    tolerance:float
+        - Stop when no probability changes by more than this
+        - DEFAULT - 1e-12
+
+    max_sweeps:int
+        - The maximum number of sweeps
+        - DEFAULT - 10,000
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Return
+
+    The GAME_POINTS x GAME_POINTS array of the probability that the
+    dealer wins, indexed by [dealer score, pone score].
+
+    """
+
+    dealer_show = np.convolve(model.dealer_hand, model.crib)
+
+    table = np.full((GAME_POINTS, GAME_POINTS), 0.5)
+
+    for sweep in range(1, max_sweeps + 1):
+        updated = _deal(
+            1.0 - table.T,
+            model.heels,
+            model.pone_pegging,
+            model.dealer_pegging,
+            model.pone_hand,
+            dealer_show,
+        )
+
+        change = np.abs(updated - table).max()
+        table = updated
+
+        if change <= tolerance:
+            break
+
+    if callback:
+        callback(f"The win table converged in {sweep:,} sweeps")
+
+    return table
+
+
+def _check_score(score):
+
+    if not 0 <= score < GAME_POINTS:
+        raise ValueError(f"A score must be from 0 to {GAME_POINTS - 1}, not {score}!")
+
+
+class BoardTable:
+    """
+    The win table and the deal model. See `build_board_table`.
+
+    # Parameters
+
+    data:numpy.ndarray
+        - The table data, BOARD_TABLE_ROWS rows by BOARD_TABLE_COLUMNS
+          columns.
+
+    """
+
+    def __init__(self, data):
+
+        if data.shape != (BOARD_TABLE_ROWS, BOARD_TABLE_COLUMNS):
+            raise TableError(f"The board table has the wrong shape {data.shape}!")
+
+        self.data = data
+        self.win = np.asarray(data[:GAME_POINTS])
+
+        self.model = DealModel(
+            *(np.trim_zeros(np.array(row), "b") for row in data[GAME_POINTS:])
+        )
+
+    def win_probability(self, me, opponent, dealer):
+        """
+        Return the probability of winning with `me` points against
+        `opponent` points at the start of a deal.
+
+        # Parameters
+
+        me:int
+            - My score
+
+        opponent:int
+            - The score of my opponent
+
+        dealer:bool
+            - True if I deal
+
+        """
+
+        _check_score(me)
+        _check_score(opponent)
+
+        if dealer:
+            return float(self.win[me, opponent])
+
+        return float(1.0 - self.win[opponent, me])
+
+    def split_win_probability(self, hand, crib, me, opponent, dealer):
+        """
+        Return the probability of winning at the start of a deal when the
+        show of my hand and of the crib are drawn from the distributions.
+        The rest of the deal is drawn from the model.
+
+        # Parameters
+
+        hand:ScoreDistribution
+            - The distribution of the points of my hand
+
+        crib:ScoreDistribution
+            - The distribution of the points of the crib
+
+        me, opponent, dealer
+            - See `win_probability`
+
+        """
+
+        _check_score(me)
+        _check_score(opponent)
+
+        hand = probabilities(hand)
+        crib = probabilities(crib)
+
+        a, b = (me, opponent) if dealer else (opponent, me)
+
+        # only the positions at or past this one can be reached
+        after = 1.0 - self.win.T[a:, b:]
+
+        if dealer:
+            pone_show = self.model.pone_hand
+            dealer_show = np.convolve(hand, crib)
+
+        else:
+            pone_show = hand
+            dealer_show = np.convolve(self.model.dealer_hand, crib)
+
+        p = _deal(
+            after,
+            self.model.heels,
+            self.model.pone_pegging,
+            self.model.dealer_pegging,
+            pone_show,
+            dealer_show,
+        )[0, 0]
+
+        return float(p if dealer else 1.0 - p)
+
+
+def board_table_rows(model=None, callback=None, **kwargs):
+    """
+    Compute the board table data: the win table followed by the model
+    distributions.
+
+    # Parameters
+
+    model:DealModel
+        - The deal model
+        - DEFAULT - None - sample it with `deal_model` and the kwargs
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Return
+
+    A float64 array with BOARD_TABLE_ROWS rows.
+
+    """
+
+    if model is None:
+        model = deal_model(callback=callback, **kwargs)
+
+    data = np.zeros((BOARD_TABLE_ROWS, BOARD_TABLE_COLUMNS))
+
+    data[:GAME_POINTS] = win_table(model, callback=callback)
+
+    for row, p in zip(data[GAME_POINTS:], model):
+        row[: len(p)] = p
+
+    return data
+
+
+def build_board_table(path=None, callback=None, **kwargs):
+    """
+    Build the board table and write it to path.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table
+        - DEFAULT - None - use `default_table_path`
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Parameters (kwargs)
+
+    See `deal_model`
+
+    # Return
+
+    The path to the table
+
+    """
+
+    path = Path(path) if path else default_table_path(BOARD_TABLE_NAME)
+
+    write_table(
+        path,
+        BOARD_TABLE_NAME,
+        BOARD_TABLE_VERSION,
+        board_table_rows(callback=callback, **kwargs),
+    )
+
+    return path
+
+
+_board_table = None
+
+
+def set_board_table(table):
+    """
+    Use the board table in `win_probability` and
+    `add_win_probabilities`. Set it to None to load the default
+    table on the next call.
+    """
+
+    global _board_table
+    _board_table = table
+
+
+def load_board_table(path=None, activate=True, verify=True):
+    """
+    Load the board table from disk.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+        - DEFAULT - None - use the table at `default_table_path`, if it
+          has been built, otherwise the table that ships with the
+          package.
+
+    activate:bool
+        - Use the table in `win_probability`.
+        - DEFAULT - True
+
+    verify:bool
+        - Verify the checksum of the table.
+        - DEFAULT - True
+
+    # Return
+
+    The BoardTable
+
+    # Raises
+
+    TableError if the table is missing, corrupt or stale.
+
+    """
+
+    if path is None:
+        path = default_table_path(BOARD_TABLE_NAME)
+
+        if not path.exists():
+            path = BOARD_TABLE_PATH
+
+    table = BoardTable(
+        load_table(
+            path,
+            BOARD_TABLE_NAME,
+            BOARD_TABLE_VERSION,
+            shape=(BOARD_TABLE_ROWS, BOARD_TABLE_COLUMNS),
+            verify=verify,
+        )
+    )
+
+    if activate:
+        set_board_table(table)
+
+    return table
+
+
+def _active_table():
+
+    if _board_table is None:
+        load_board_table()
+
+    return _board_table
+
+
+def win_probability(me, opponent, dealer):
+    """
+    Return the probability of winning with `me` points against
+    `opponent` points at the start of a deal (see
+    `BoardTable.win_probability`).
+    """
+
+    return _active_table().win_probability(me, opponent, dealer)
+
+
+def add_win_probabilities(results, me, opponent):
+    """
+    Add the probability of winning the game after each discard to the
+    results of `analytics.discard_consider_all_combos`.
+
+    The win probabilities use the exact distributions of the hand and
+    crib points of each split (the crib is counted with the five card
+    flush rule), the rest of the deal is drawn from the deal model. The
+    hand and crib are treated as independent.
+
+    # Parameters
+
+    results:list(dict)
+        - The discard results
+
+    me:int
+        - My score
+
+    opponent:int
+        - The score of my opponent
+
+    # Return
+
+    The results with 2 more keys:
+
+    - `win_pone` - the probability of winning the game as the pone
+    - `win_dealer` - the probability of winning the game as the dealer
+
+    """
+
+    table = _active_table()
+
+    cribs = {}
+
+    for result in results:
+        ch, d = result["hand"], result["discard"]
+
+        h = expected_average(ch, d, distribution=True)
+
+        key = crib_key(ch, d)
+        if key not in cribs:
+            cribs[key] = crib_distribution(ch, d, five_card_flush=True)
+
+        c = cribs[key]
+
+        result["win_pone"] = table.split_win_probability(h, c, me, opponent, False)
+        result["win_dealer"] = table.split_win_probability(h, c, me, opponent, True)
+
+    return results
+
+
+def discard_win_probabilities(hand, me, opponent):
+    """
+    Given a 6 card hand and the score, return the results of
+    `analytics.discard_consider_all_combos` with the probability of
+    winning the game after each discard (see `add_win_probabilities`).
+    """
+
+    assert len(hand) == 6
+
+    return add_win_probabilities(discard_consider_all_combos(hand), me, opponent)
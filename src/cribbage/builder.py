@@ -0,0 +1,679 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+A module for building the exhaustive tables (see `tables`) in shards so
+the work can be resumed and shared.
+
+The units of work of a table (5 card sets, discards, 6 card hand
+classes, 4 card hands, 4 rank multisets or the board) are split into
+fixed size shards. A build uses a work folder holding:
+
+- manifest.json - the job (table, version, units, shard size). A build
+  that finds a manifest for a different job stops instead of mixing
+  shards.
+- shard-NNNNN.tbl - a finished shard. Shards are written with
+  `tables.write_table` so they are atomic and carry a checksum, a shard
+  file on disk is the checkpoint.
+- shard-NNNNN.lock - a shard that is being worked on. The lock is
+  created exclusively so it acts as a queue, any number of worker
+  processes (on this or another host sharing the folder) can pull
+  shards. The lock records the host and process id so the lock of a
+  crashed worker can be taken over.
+
+Once every shard is finished they are verified and merged into the
+table.
+
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import os
+import json
+import time
+import socket
+
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+# ------------
+# 3rd Party - From pip
+
+import numpy as np
+
+# ------------
+# Custom Modules
+
+from .tables import (
+    TableError,
+    SCORE_TABLE_NAME,
+    SCORE_TABLE_VERSION,
+    SCORE_COLUMNS,
+    FIVE_CARD_SETS,
+    CRIB_TABLE_NAME,
+    CRIB_TABLE_VERSION,
+    CRIB_TABLE_ROWS,
+    CRIB_COLUMNS,
+    DISCARD_TABLE_NAME,
+    DISCARD_TABLE_VERSION,
+    DISCARD_KEYS_NAME,
+    DISCARD_CLASSES,
+    DISCARD_SPLITS,
+    HAND_TABLE_NAME,
+    HAND_TABLE_VERSION,
+    HAND_TABLE_ROWS,
+    HAND_TABLE_COLUMNS,
+    PEGGING_TABLE_NAME,
+    PEGGING_TABLE_VERSION,
+    PEGGING_TABLE_ROWS,
+    PEGGING_COLUMNS,
+    default_table_path,
+    discard_keys_path,
+    discard_table_keys,
+    discard_table_rows,
+    crib_table_rows,
+    hand_table_rows,
+    pegging_table_rows,
+    score_table_rows,
+    write_table,
+    load_table,
+)
+
+from .board import (
+    BOARD_TABLE_NAME,
+    BOARD_TABLE_VERSION,
+    BOARD_TABLE_ROWS,
+    BOARD_TABLE_COLUMNS,
+    board_table_rows,
+)
+
+# -------------
+
+
+MANIFEST_NAME = "manifest.json"
+
+
+@lru_cache(maxsize=None)
+def _discard_keys():
+    """
+    The discard table class keys, generated once per process.
+    """
+
+    return discard_table_keys()
+
+
+def _write_discard_keys(path):
+    write_table(
+        discard_keys_path(path), DISCARD_KEYS_NAME, DISCARD_TABLE_VERSION, _discard_keys()
+    )
+
+
+class TableJob:
+    """
+    Describes how to build a table in shards.
+
+    # Parameters
+
+    name:str
+        - The name of the table
+
+    version:int
+        - The version of the table
+
+    units:int
+        - The number of units of work
+
+    rows:int
+        - The number of table rows for each unit
+
+    columns:int
+        - The number of table columns
+
+    dtype:str
+        - The numpy dtype of the table
+
+    compute:func
+        - compute(start, stop) returns the rows for the units from start
+          to stop
+
+    shard_size:int
+        - The default number of units in a shard
+
+    finish:func
+        - finish(path) is called after the table is written to path.
+        - DEFAULT - None
+
+    """
+
+    def __init__(
+        self, name, version, units, rows, columns, dtype, compute, shard_size, finish=None
+    ):
+
+        self.name = name
+        self.version = version
+        self.units = units
+        self.rows = rows
+        self.columns = columns
+        self.dtype = np.dtype(dtype)
+        self.compute = compute
+        self.shard_size = shard_size
+        self.finish = finish
+
+
+JOBS = {
+    SCORE_TABLE_NAME: TableJob(
+        SCORE_TABLE_NAME,
+        SCORE_TABLE_VERSION,
+        FIVE_CARD_SETS,
+        5,
+        len(SCORE_COLUMNS),
+        "u1",
+        score_table_rows,
+        64_974,
+    ),
+    CRIB_TABLE_NAME: TableJob(
+        CRIB_TABLE_NAME,
+        CRIB_TABLE_VERSION,
+        CRIB_TABLE_ROWS,
+        1,
+        len(CRIB_COLUMNS),
+        "i4",
+        crib_table_rows,
+        221,
+    ),
+    DISCARD_TABLE_NAME: TableJob(
+        DISCARD_TABLE_NAME,
+        DISCARD_TABLE_VERSION,
+        DISCARD_CLASSES,
+        1,
+        DISCARD_SPLITS * 2,
+        "i4",
+        lambda start, stop: discard_table_rows(_discard_keys()[start:stop]),
+        10_000,
+        finish=_write_discard_keys,
+    ),
+    HAND_TABLE_NAME: TableJob(
+        HAND_TABLE_NAME,
+        HAND_TABLE_VERSION,
+        HAND_TABLE_ROWS,
+        1,
+        HAND_TABLE_COLUMNS,
+        "u1",
+        hand_table_rows,
+        HAND_TABLE_ROWS,
+    ),
+    PEGGING_TABLE_NAME: TableJob(
+        PEGGING_TABLE_NAME,
+        PEGGING_TABLE_VERSION,
+        PEGGING_TABLE_ROWS,
+        1,
+        len(PEGGING_COLUMNS),
+        "f4",
+        pegging_table_rows,
+        91,
+    ),
+    # The win table is solved as a whole, it is one unit of work. The
+    # deals of the model are sampled in the analytics process pool.
+    BOARD_TABLE_NAME: TableJob(
+        BOARD_TABLE_NAME,
+        BOARD_TABLE_VERSION,
+        1,
+        BOARD_TABLE_ROWS,
+        BOARD_TABLE_COLUMNS,
+        "f8",
+        lambda start, stop: board_table_rows(),
+        1,
+    ),
+}
+
+
+def default_work_path(path):
+    """
+    Return the default work folder for the table at path.
+    """
+
+    path = Path(path)
+
+    return path.with_name(f"{path.name}.shards")
+
+
+def shard_path(work, shard):
+    return Path(work) / f"shard-{shard:05d}.tbl"
+
+
+def _lock_path(work, shard):
+    return Path(work) / f"shard-{shard:05d}.lock"
+
+
+def create_manifest(work, name, shard_size=None):
+    """
+    Create the work folder and its manifest for the table, or check the
+    manifest of an existing work folder matches so the build can be
+    resumed.
+
+    # Parameters
+
+    work:Path
+        - The work folder
+
+    name:str
+        - The name of the table (see `JOBS`)
+
+    shard_size:int
+        - The number of units in a shard. An existing build keeps its
+          shard size.
+        - DEFAULT - None - the default size for the table
+
+    # Return
+
+    The manifest (dict)
+
+    # Raises
+
+    TableError if the work folder belongs to a different job.
+
+    """
+
+    job = JOBS[name]
+
+    work = Path(work)
+    path = work / MANIFEST_NAME
+
+    if path.exists():
+        manifest = read_manifest(work)
+
+        expected = {"name": job.name, "version": job.version, "units": job.units}
+
+        for key, value in expected.items():
+            if manifest[key] != value:
+                raise TableError(
+                    f"The work folder ({work}) is for {key}={manifest[key]}, expected {value}!"
+                )
+
+        if shard_size and manifest["shard_size"] != shard_size:
+            raise TableError(
+                f"The work folder ({work}) uses shards of {manifest['shard_size']} units!"
+            )
+
+        return manifest
+
+    shard_size = shard_size or job.shard_size
+
+    manifest = {
+        "name": job.name,
+        "version": job.version,
+        "units": job.units,
+        "shard_size": shard_size,
+        "shards": -(-job.units // shard_size),
+    }
+
+    work.mkdir(parents=True, exist_ok=True)
+
+    # write and move into place so a partial manifest is never visible
+    tmp = path.with_name(f".{MANIFEST_NAME}.{os.getpid()}")
+    tmp.write_text(json.dumps(manifest, indent=4))
+    os.replace(tmp, path)
+
+    return manifest
+
+
+def read_manifest(work):
+    """
+    Return the manifest of the work folder.
+    """
+
+    return json.loads((Path(work) / MANIFEST_NAME).read_text())
+
+
+def shard_units(manifest, shard):
+    """
+    Return the range of units (start, stop) of the shard.
+    """
+
+    start = shard * manifest["shard_size"]
+
+    return start, min(start + manifest["shard_size"], manifest["units"])
+
+
+def shard_done(work, manifest, shard):
+    """
+    Is the shard finished? The shard file is verified, a corrupt shard
+    is removed so it is built again.
+    """
+
+    path = shard_path(work, shard)
+
+    if not path.exists():
+        return False
+
+    job = JOBS[manifest["name"]]
+    start, stop = shard_units(manifest, shard)
+
+    try:
+        load_table(path, job.name, job.version, shape=((stop - start) * job.rows, job.columns))
+
+    except TableError:
+        path.unlink()
+        return False
+
+    return True
+
+
+def _claim(work, shard, lock_timeout=None):
+    """
+    Try to claim the shard by creating its lock file. Return True if
+    the shard was claimed.
+
+    A lock left behind by a process on this host that is no longer
+    running, or one older than lock_timeout seconds, is taken over.
+    """
+
+    lock = _lock_path(work, shard)
+
+    owner = {"host": socket.gethostname(), "pid": os.getpid(), "time": time.time()}
+
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+
+        except FileExistsError:
+            if not _stale(lock, lock_timeout):
+                return False
+
+            # Two workers can both find the lock stale and build the
+            # shard. That only wastes time, the shards are deterministic
+            # and written atomically.
+            lock.unlink(missing_ok=True)
+            continue
+
+        with os.fdopen(fd, "w") as fo:
+            fo.write(json.dumps(owner))
+
+        return True
+
+    return False
+
+
+def _stale(lock, lock_timeout=None):
+    """
+    Is the lock stale, left by a process that has stopped?
+    """
+
+    try:
+        owner = json.loads(lock.read_text())
+
+    except FileNotFoundError:
+        return False
+
+    except ValueError:
+        # the lock is being written, it is only stale if it is old
+        owner = {"time": lock.stat().st_mtime}
+
+    if lock_timeout is not None and time.time() - owner["time"] > lock_timeout:
+        return True
+
+    if owner.get("host") == socket.gethostname():
+        try:
+            os.kill(owner["pid"], 0)
+
+        except ProcessLookupError:
+            return True
+
+        except PermissionError:
+            return False
+
+    return False
+
+
+def run_shards(work, callback=None, lock_timeout=None, limit=None):
+    """
+    Pull unfinished shards from the work folder, build them and write
+    them. Returns when every shard is finished or claimed by another
+    worker.
+
+    # Parameters
+
+    work:Path
+        - The work folder (see `create_manifest`)
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    lock_timeout:float
+        - Take over the shards locked for longer than this many seconds.
+        - DEFAULT - None - only take over the shards of processes on
+          this host that are no longer running.
+
+    limit:int
+        - Stop after building this many shards.
+        - DEFAULT - None
+
+    # Return
+
+    The number of shards built.
+
+    """
+
+    work = Path(work)
+    manifest = read_manifest(work)
+    job = JOBS[manifest["name"]]
+
+    built = 0
+
+    for shard in range(manifest["shards"]):
+
+        if limit is not None and built >= limit:
+            break
+
+        if shard_done(work, manifest, shard) or not _claim(work, shard, lock_timeout):
+            continue
+
+        try:
+            # finished by another worker while we were claiming it
+            if shard_done(work, manifest, shard):
+                continue
+
+            start_time = time.time()
+
+            start, stop = shard_units(manifest, shard)
+            data = np.asarray(job.compute(start, stop), dtype=job.dtype)
+
+            write_table(shard_path(work, shard), job.name, job.version, data)
+
+            built += 1
+
+            if callback:
+                callback(
+                    f"Shard {shard + 1:,} of {manifest['shards']:,} ({time.time() - start_time:.1f}s)"
+                )
+
+        finally:
+            _lock_path(work, shard).unlink(missing_ok=True)
+
+    return built
+
+
+def _run_shards(work, lock_timeout=None):
+    """
+    run_shards for a worker process.
+    """
+
+    return run_shards(work, lock_timeout=lock_timeout)
+
+
+def missing_shards(work):
+    """
+    Return the list of shards that are not finished.
+    """
+
+    manifest = read_manifest(work)
+
+    return [s for s in range(manifest["shards"]) if not shard_done(work, manifest, s)]
+
+
+def merge_shards(work, path, remove=True):
+    """
+    Merge the shards in the work folder into the table at path. Every
+    shard is verified against its checksum first.
+
+    # Parameters
+
+    work:Path
+        - The work folder
+
+    path:Path
+        - The location to write the table
+
+    remove:bool
+        - Remove the work folder once the table is written.
+        - DEFAULT - True
+
+    # Return
+
+    The path to the table
+
+    # Raises
+
+    TableError if a shard is missing or corrupt.
+
+    """
+
+    work = Path(work)
+    manifest = read_manifest(work)
+    job = JOBS[manifest["name"]]
+
+    data = np.zeros((job.units * job.rows, job.columns), dtype=job.dtype)
+
+    for shard in range(manifest["shards"]):
+        start, stop = shard_units(manifest, shard)
+
+        data[start * job.rows : stop * job.rows] = load_table(
+            shard_path(work, shard),
+            job.name,
+            job.version,
+            shape=((stop - start) * job.rows, job.columns),
+        )
+
+    write_table(path, job.name, job.version, data)
+
+    if job.finish:
+        job.finish(path)
+
+    if remove:
+        for shard in range(manifest["shards"]):
+            shard_path(work, shard).unlink()
+
+        (work / MANIFEST_NAME).unlink()
+
+        try:
+            work.rmdir()
+
+        except OSError:
+            # something else is in the folder, leave it
+            pass
+
+    return path
+
+
+def build(name, path=None, work=None, **kwargs):
+    """
+    Build the table in shards: create (or resume) the work folder, build
+    the shards that are left and merge them into the table.
+
+    # Parameters
+
+    name:str
+        - The name of the table (see `JOBS`)
+
+    path:Path
+        - The location to write the table
+        - DEFAULT - None - use `default_table_path`
+
+    work:Path
+        - The work folder
+        - DEFAULT - None - use `default_work_path`
+
+    # Parameters (kwargs)
+
+    shard_size:int
+        - The number of units in a shard
+        - DEFAULT - None - the default for the table
+
+    workers:int
+        - The number of worker processes to use. 1 runs in this process.
+        - DEFAULT - 1
+
+    merge:bool
+        - Merge the shards into the table when they are all finished.
+          Set it to False to only help with the shards.
+        - DEFAULT - True
+
+    lock_timeout:float
+        - See `run_shards`
+        - DEFAULT - None
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Return
+
+    The path to the table, or None if it wasn't merged.
+
+    """
+
+    callback = kwargs.get("callback", None)
+    workers = kwargs.get("workers", 1)
+    lock_timeout = kwargs.get("lock_timeout", None)
+
+    path = Path(path) if path else default_table_path(name)
+    work = Path(work) if work else default_work_path(path)
+
+    manifest = create_manifest(work, name, kwargs.get("shard_size", None))
+
+    if callback:
+        callback(f"Building {manifest['shards']:,} shards in {work}")
+
+    if workers == 1:
+        run_shards(work, callback=callback, lock_timeout=lock_timeout)
+
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(_run_shards, work, lock_timeout) for _ in range(workers)
+            ]
+
+            built = sum(f.result() for f in futures)
+
+        if callback:
+            callback(f"Built {built:,} shards")
+
+    if not kwargs.get("merge", True):
+        return None
+
+    missing = missing_shards(work)
+
+    if missing:
+        if callback:
+            callback(
+                f"{len(missing):,} shards are not finished (other workers may hold them), run again to merge."
+            )
+
+        return None
+
+    return merge_shards(work, path)
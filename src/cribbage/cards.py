@@ -22,12 +22,18 @@ Cribbage Scoring - <https://en.wikipedia.org/wiki/Rules_of_cribbage>
 # ------------
 # System Modules - Included with Python
 
-from dataclasses import dataclass
+from dataclasses import FrozenInstanceError
 from operator import methodcaller
 
+from array import array
+from bisect import insort
+from math import comb
+from typing import NamedTuple
+
 from itertools import (
     chain,
     combinations,
+    combinations_with_replacement,
     product,
     groupby,
 )
@@ -35,9 +41,15 @@ from itertools import (
 # ------------
 # 3rd Party - From pip
 
+import numpy as np
+
 # ------------
 # Custom Modules
 
+from .memo import (
+    MISSING,
+    get_cache,
+)
 
 # -------------
 
@@ -63,6 +75,34 @@ RANKS = (
 # shared tuple that stores the card suits
 SUITS = ("D", "H", "C", "S")
 
+# The rank ordinal of the jack
+_JACK = RANKS.index("J")
+
+# The sort value of each rank, see Card.sort_value
+RANK_SORT = {
+    "A": 1,
+    "2": 2,
+    "3": 3,
+    "4": 4,
+    "5": 5,
+    "6": 6,
+    "7": 7,
+    "8": 8,
+    "9": 9,
+    "T": 11,
+    "J": 12,
+    "Q": 13,
+    "K": 14,
+}
+
+# The sort value of each suit, see Card.sort_value
+SUIT_SORT = {
+    "H": 0,
+    "D": 100,
+    "S": 200,
+    "C": 300,
+}
+
 SUIT_SYMBOLS = {
     "C": "♣",  # u'\u2663',
     "D": "♦",  # u'\u2666',
@@ -133,7 +173,6 @@ CARD_SYMBOLS = {
 }
 
 
-@dataclass(frozen=True)
 class Card:
     """
     The Card class represents a playing card with a value rank and suit.
@@ -159,6 +198,21 @@ class Card:
     - C - Club
     - S - Spade
 
+    # Attributes
+
+    Every card carries the following precomputed, read-only attributes:
+
+    - `rank` - the rank string
+    - `suit` - the suit string
+    - `index` - an integer from 0 to 51, `RANKS.index(rank) * 4 +
+      SUITS.index(suit)`. This is the position of the card in
+      `make_deck()`.
+    - `rank_ordinal` - the position of the rank in RANKS, 0 to 12
+    - `suit_ordinal` - the position of the suit in SUITS, 0 to 3
+    - `value` - the face value of the card (see `face_value`)
+    - `sort_key` - an integer that orders the cards by rank, then suit
+      (see `sort_value`)
+
     # NOTE
 
     If you have a string representing the card ('6D') you can use this
@@ -171,33 +225,94 @@ class Card:
 
     Card(*rank)
 
-    """
+    # NOTE - Flyweights
+
+    There are only 52 cards. Each one is created once, when the module
+    is imported, and `Card('5', 'D')`, `Card('5', 'd')` and
+    `Card.from_index(16)` all return the same object. This means
+    equality and hashing are identity operations and the objects are
+    immutable.
 
-    rank: str = None
-    suit: str = None
+    """
 
-    def __post_init__(self):
+    __slots__ = (
+        "rank",
+        "suit",
+        "index",
+        "rank_ordinal",
+        "suit_ordinal",
+        "value",
+        "sort_key",
+    )
+
+    def __new__(cls, rank=None, suit=None):
         """
-        This method is called after the __init__ is finished. Normally
-        this is used for validation for dataclass objects
+        Return the shared instance of the card. The rank and suit are
+        validated and normalized to upper case.
         """
 
-        if self.rank is None:
+        card = _CARD_LOOKUP.get((rank, suit))
+
+        if card is not None:
+            return card
+
+        if rank is None:
             raise ValueError("Card.rank is not set!")
 
-        if self.suit is None:
+        if suit is None:
             raise ValueError("Card.suit is not set!")
 
-        # We only want upper case values for the rank and suit and we
-        # have to use this call because the class is frozen
-        object.__setattr__(self, "rank", self.rank.upper())
-        object.__setattr__(self, "suit", self.suit.upper())
+        # We only want upper case values for the rank and suit
+        rank = rank.upper()
+        suit = suit.upper()
+
+        if rank not in RANKS:
+            raise ValueError(f"INVALID Rank ({rank})! Must be one of: {RANKS}!")
+
+        if suit not in SUITS:
+            raise ValueError(f"INVALID Suit ({suit})! Must be one of: {SUITS}!")
+
+        return _CARD_LOOKUP[(rank, suit)]
+
+    @classmethod
+    def from_index(cls, index):
+        """
+        Return the card at the given index, 0 to 51. This is the same
+        ordering that `make_deck` uses.
+
+        # Parameters
+
+        index:int
+            - The integer encoding of the card.
+
+        # Return
+
+        The shared Card instance.
+
+        """
+
+        if not 0 <= index < len(_DECK):
+            raise ValueError(f"INVALID Card index ({index})! Must be between 0 and 51!")
+
+        return _DECK[index]
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __delattr__(self, name):
+        raise FrozenInstanceError(f"cannot delete field '{name}'")
 
-        if self.rank not in RANKS:
-            raise ValueError(f"INVALID Rank ({self.rank})! Must be one of: {RANKS}!")
+    def __reduce__(self):
+        """
+        Pickle (and copy) the card by index so that unpickling returns
+        the shared instance. This keeps identity based equality working
+        across processes (multiprocessing).
+        """
 
-        if self.suit not in SUITS:
-            raise ValueError(f"INVALID Suit ({self.suit})! Must be one of: {SUITS}!")
+        return (Card.from_index, (self.index,))
+
+    def __repr__(self):
+        return f"Card(rank={self.rank!r}, suit={self.suit!r})"
 
     def cool_display(self, display_card=False, **kwargs) -> str:
         """
@@ -252,14 +367,7 @@ class Card:
 
         """
 
-        if self.rank == "A":
-            return 1
-
-        elif self.rank in ("T", "J", "Q", "K"):
-            return 10
-
-        else:
-            return int(self.rank)
+        return self.value
 
     def sort_value(self, component='all', **kwargs):
         """
@@ -306,29 +414,6 @@ class Card:
 
         """
 
-        RANK_SORT = {
-            "A": 1,
-            "2": 2,
-            "3": 3,
-            "4": 4,
-            "5": 5,
-            "6": 6,
-            "7": 7,
-            "8": 8,
-            "9": 9,
-            "T": 11,
-            "J": 12,
-            "Q": 13,
-            "K": 14,
-        }
-
-        SUIT_SORT = {
-            "H": 0,
-            "D": 100,
-            "S": 200,
-            "C": 300,
-        }
-
         if component == 'all':
             return (RANK_SORT[self.rank], SUIT_SORT[self.suit])
 
@@ -354,7 +439,7 @@ class Card:
 
         """
 
-        return self.sort_value() < other.sort_value()
+        return self.sort_key < other.sort_key
 
     def __str__(self):
         """
@@ -366,6 +451,62 @@ class Card:
         return self.rank + self.suit
 
 
+def _face_value(rank):
+    """
+    Return the cribbage face value of the rank. Only used to initialize
+    the Card flyweights.
+    """
+
+    if rank == "A":
+        return 1
+
+    elif rank in ("T", "J", "Q", "K"):
+        return 10
+
+    else:
+        return int(rank)
+
+
+def _create_cards():
+    """
+    Create the 52 Card flyweights, in the same order as `make_deck`,
+    with all of their attributes precomputed.
+    """
+
+    cards = []
+
+    for rank_ordinal, suit_ordinal in product(range(len(RANKS)), range(len(SUITS))):
+        rank = RANKS[rank_ordinal]
+        suit = SUITS[suit_ordinal]
+
+        card = object.__new__(Card)
+
+        attributes = {
+            "rank": rank,
+            "suit": suit,
+            "index": len(cards),
+            "rank_ordinal": rank_ordinal,
+            "suit_ordinal": suit_ordinal,
+            "value": _face_value(rank),
+            "sort_key": RANK_SORT[rank] * 1000 + SUIT_SORT[suit],
+        }
+
+        # The class is frozen, bypass Card.__setattr__
+        for name, value in attributes.items():
+            object.__setattr__(card, name, value)
+
+        cards.append(card)
+
+    return tuple(cards)
+
+
+# The 52 shared Card instances, indexed by Card.index
+_DECK = _create_cards()
+
+# (rank, suit) -> Card, used by Card.__new__ to return the shared instance
+_CARD_LOOKUP = {(c.rank, c.suit): c for c in _DECK}
+
+
 def make_deck():
     """
     Creates a deck of 52 cards.
@@ -382,7 +523,165 @@ def make_deck():
 
     """
 
-    return [Card(*p) for p in product(RANKS, SUITS)]
+    return list(_DECK)
+
+
+def _popcount_fallback(mask):
+    """
+    Count the set bits in the integer. Used on Python versions that do
+    not have int.bit_count (< 3.10).
+    """
+
+    return bin(mask).count("1")
+
+
+popcount = getattr(int, "bit_count", _popcount_fallback)
+
+
+class CardSet:
+    """
+    An immutable set of cards stored as a 64-bit integer mask. Bit `i`
+    is set if the card with `Card.index == i` is in the set.
+
+    Union (|), intersection (&), difference (-), symmetric difference
+    (^), membership (in) and len are all constant time integer
+    operations. Iterating the set yields the Card objects in index
+    order, which is the same order as `make_deck()`.
+
+    >>> hand = CardSet([Card(*'5D'), Card(*'JS')])
+    >>> deck = FULL_DECK - hand
+    >>> len(deck)
+    50
+    >>> Card(*'5D') in deck
+    False
+
+    # Parameters
+
+    cards:iterable(Card)
+        - The cards to add to the set.
+        - If a CardSet is passed, the mask is copied.
+        - DEFAULT - ()
+
+    # NOTE
+
+    Use `CardSet.from_mask` to create a set from an existing integer
+    mask.
+
+    """
+
+    __slots__ = ("mask",)
+
+    def __init__(self, cards=()):
+
+        if isinstance(cards, CardSet):
+            mask = cards.mask
+
+        else:
+            mask = 0
+            for card in cards:
+                mask |= 1 << card.index
+
+        object.__setattr__(self, "mask", mask)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Create a CardSet from the integer mask.
+
+        # Parameters
+
+        mask:int
+            - The integer mask, bit `i` represents `Card.from_index(i)`.
+
+        # Return
+
+        A new CardSet.
+
+        """
+
+        if mask < 0 or mask >> len(_DECK):
+            raise ValueError(f"INVALID mask ({mask:#x})! Only the lower 52 bits can be set!")
+
+        cs = object.__new__(cls)
+        object.__setattr__(cs, "mask", mask)
+
+        return cs
+
+    def __setattr__(self, name, value):
+        raise FrozenInstanceError(f"cannot assign to field '{name}'")
+
+    def __reduce__(self):
+        return (CardSet.from_mask, (self.mask,))
+
+    def indices(self):
+        """
+        A generator yielding the index of each card in the set, in
+        increasing order.
+        """
+
+        mask = self.mask
+
+        while mask:
+            low = mask & -mask
+            yield low.bit_length() - 1
+            mask ^= low
+
+    def __iter__(self):
+        for i in self.indices():
+            yield _DECK[i]
+
+    def __len__(self):
+        return popcount(self.mask)
+
+    def __bool__(self):
+        return self.mask != 0
+
+    def __contains__(self, card):
+        return (self.mask >> card.index) & 1 == 1
+
+    def __or__(self, other):
+        return CardSet.from_mask(self.mask | other.mask)
+
+    def __and__(self, other):
+        return CardSet.from_mask(self.mask & other.mask)
+
+    def __sub__(self, other):
+        return CardSet.from_mask(self.mask & ~other.mask)
+
+    def __xor__(self, other):
+        return CardSet.from_mask(self.mask ^ other.mask)
+
+    def __eq__(self, other):
+
+        if not isinstance(other, CardSet):
+            return NotImplemented
+
+        return self.mask == other.mask
+
+    def __hash__(self):
+        return hash(self.mask)
+
+    def __repr__(self):
+        return f"CardSet([{', '.join(repr(c) for c in self)}])"
+
+    def __str__(self):
+        return display_hand(self, as_string=True)
+
+
+# The set of all 52 cards
+FULL_DECK = CardSet.from_mask((1 << len(_DECK)) - 1)
+
+
+def _mask_to_cards(hand):
+    """
+    Convert a CardSet (or an integer mask) to a list of cards in index
+    order.
+    """
+
+    if isinstance(hand, CardSet):
+        return list(hand)
+
+    return list(CardSet.from_mask(hand))
 
 
 def display_hand(
@@ -781,6 +1080,35 @@ def find_combinations(hand, cut):
     }
 
 
+def find_combinations_mask(hand, cut):
+    """
+    The same as `find_combinations` except the hand is a CardSet (or an
+    integer mask) instead of a list of cards.
+
+    # Parameters
+
+    hand:CardSet|int
+        - The 4 cards we want to score.
+
+    cut:Card
+        - The cut card that will be counted along with the hand.
+
+    # Return
+
+    The same dictionary as `find_combinations`. The hand cards are
+    considered in index order.
+
+    # NOTE
+
+    The combinations are lists of cards so the mask is converted to a
+    list of cards (in index order) and passed to `find_combinations`.
+    Use `score_hand_mask` if only the score is needed.
+
+    """
+
+    return find_combinations(_mask_to_cards(hand), cut)
+
+
 def score(values):
     """
     Given the dictionary of combinations from the find_combinations
@@ -823,135 +1151,908 @@ def score(values):
     }
 
 
-def score_hand(
-    hand,
-    cut,
-    include_nibs=False,
-    five_card_flush=False,
-    **kwargs,
-):
+class ScoreCounts(NamedTuple):
     """
-    Score the hand returning the result
+    The counts for each scoring category of a hand. These are the
+    lengths of the lists returned by `find_combinations` (except for the
+    runs), without the lists:
 
-    # Parameters
+    - fifteen - the number of card combinations that sum to 15
+    - pair - the number of pairs
+    - run - the number of cards in all of the runs (the run points)
+    - flush - the number of cards in the flush (0, 4 or 5)
+    - nobs - 1 if the hand holds the jack of the cut suit
+    - nibs - 1 if the cut card is a jack
 
-    hand:Hand
-        - The hand to score
+    """
 
-    cut:Card
-        - The cut card to score with the hand
+    fifteen: int
+    pair: int
+    run: int
+    flush: int
+    nobs: int
+    nibs: int
 
-    include_nibs:bool
-        - Include the calculation of nibs.
-        - Only dealer can claim this.
-        - DEFAULT - False
+    def points(self):
+        """
+        Return the points for each category. This is the same dictionary
+        returned by the `score` method.
+        """
 
-    five_card_flush:bool
-        - Only count the flush if it is 5 cards.
-        - Only applied when counting the crib.
-        - DEFAULT - False
+        return {
+            "fifteen": self.fifteen * 2,
+            "pair": self.pair * 2,
+            "run": self.run,
+            "flush": self.flush,
+            "nobs": self.nobs,
+            "nibs": self.nibs * 2,
+        }
 
-    # Return
+    def total(self, include_nibs=False, five_card_flush=False):
+        """
+        Return the score of the hand. The parameters have the same
+        meaning as `score_hand`.
+        """
 
-    An integer represent the score of the hand.
+        flush = 0 if five_card_flush and self.flush != 5 else self.flush
+        nibs = self.nibs * 2 if include_nibs else 0
 
-    # NOTE
+        return self.fifteen * 2 + self.pair * 2 + self.run + flush + self.nobs + nibs
 
-    If you are interested in a summary breaking the score down, use
-    `score_hand_breakdown` method which return a list of strings
-    breaking the score down.
 
-    """
+# ------------
+# Rank Histogram Scoring
 
-    hands = find_combinations(hand, cut)
-    hand_scores = score(hands)
+# The fifteens, pairs and runs can be counted directly from a histogram
+# of the ranks without enumerating the card combinations:
 
-    # Flush is worth 5 points and only 5 points if we are counting the
-    # crib (4 crib cards + cut). If we are not counting the crib we can
-    # use the value of hand_scores directly.
-    flush = 5 if hand_scores["flush"] == 5 and five_card_flush else hand_scores["flush"]
+# - fifteens - a subset sum dynamic program over the face values
+# - pairs - C(n, 2) pairs for each rank held n times
+# - runs - each maximal span of 3 or more consecutive ranks scores its
+#   length times the product of the counts of each rank in the span
 
-    # calculate the total excluding the nibs and flush
-    total = sum([v for k, v in hand_scores.items() if k not in ["nibs", "flush"]])
+# The face value of each rank ordinal
+_RANK_VALUES = tuple(_face_value(r) for r in RANKS)
 
-    # add the flush separately based on the flush calculation above.
-    total += flush
+# _RANK_FOLLOWS[r] is True if rank r follows rank r - 1 in a run. Like
+# find_runs, ranks are consecutive when their sort values
+# (Card.sort_value('rank')) differ by 1.
+_RANK_FOLLOWS = (False,) + tuple(
+    RANK_SORT[RANKS[r]] - RANK_SORT[RANKS[r - 1]] == 1 for r in range(1, len(RANKS))
+)
 
-    # Are we counting the dealer hand?
-    if include_nibs:
-        total += hand_scores["nibs"]
 
-    return total
+def rank_histogram(cards):
+    """
+    Count the number of cards of each rank.
 
+    # Parameters
+
+    cards:iterable(Card)
+        - The cards to count
+
+    # Return
+
+    A list of 13 integers, the number of cards for each rank ordinal.
 
-def score_hand_breakdown(
-    hand,
-    cut,
-    include_nibs=False,
-    five_card_flush=False,
-    **kwargs,
-):
     """
-    Score the hand and display the results. by
 
-    # Parameters
+    histogram = [0] * len(RANKS)
 
-    hand:Hand
-        - The hand to score
+    for card in cards:
+        histogram[card.rank_ordinal] += 1
 
-    cut:Card
-        - The cut card to score with the hand
+    return histogram
 
-    include_nibs:bool
-        - Include the calculation of nibs.
-        - Only dealer can claim this.
-        - DEFAULT - False
 
-    five_card_flush:bool
-        - Only count the flush if it is 5 cards.
-        - Only applied when counting the crib.
-        - DEFAULT - False
+def count_fifteens(histogram):
+    """
+    Count the number of card combinations that sum to 15.
 
-    # Parameters (kwargs)
+    This is a subset sum dynamic program. `ways[s]` is the number of
+    combinations of the cards seen so far that sum to `s`. Each card
+    adds the combinations that include it.
 
-    basic:bool
-        - Display the cards using letters for suits instead of symbols (♥,♦,♣,♠)
-        - DEFAULT - False
+    # Parameters
+
+    histogram:list(int)
+        - The rank histogram of the cards (see `rank_histogram`)
 
     # Return
 
-    A list of strings representing the counts
+    The number of combinations that sum to 15. This is the same as
+    `len(list(find_fifteens(cards)))`.
 
     """
 
-    basic = kwargs.get("basic", False)
+    ways = [1] + [0] * 15
 
-    hands = find_combinations(hand, cut)
-    hand_scores = score(hands)
+    for rank, count in enumerate(histogram):
 
-    # Flush is worth 5 points and only 5 points if we are counting the
-    # crib (4 crib cards + cut). If we are not counting the crib we can
-    # use the value of hand_scores directly.
-    flush = 5 if hand_scores["flush"] == 5 and five_card_flush else hand_scores["flush"]
+        value = _RANK_VALUES[rank]
 
-    # calculate the total excluding the nibs and flush
-    total = sum([v for k, v in hand_scores.items() if k not in ["nibs", "flush"]])
+        for _ in range(count):
+            for s in range(15, value - 1, -1):
+                ways[s] += ways[s - value]
 
-    # add the flush separately based on the flush calculation above.
-    total += flush
+    return ways[15]
 
-    # Are we counting the dealer hand?
-    if include_nibs:
-        total += hand_scores["nibs"]
 
-    summary = [
-        f"Hand = {display_hand(hand, cool=(not basic), as_string=True)}",
-        f"Cut  = {cut.cool_display(basic=basic)}",
-        "------------------",
-        f'{len(hands["fifteen"])} Fifteens for {hand_scores["fifteen"]}',
-        f'{len(hands["pair"])} Pairs for    {hand_scores["pair"]}',
-        f'{len(hands["run"])} Runs for     {hand_scores["run"]}',
-        f"Flush for      {flush}",
+def count_pairs(histogram):
+    """
+    Count the number of pairs.
+
+    # Parameters
+
+    histogram:list(int)
+        - The rank histogram of the cards (see `rank_histogram`)
+
+    # Return
+
+    The number of pairs. This is the same as
+    `len(list(find_pairs(cards)))`.
+
+    """
+
+    return sum(count * (count - 1) // 2 for count in histogram)
+
+
+def count_run_points(histogram):
+    """
+    Count the points for the runs. A run of length `n` is counted once
+    for every combination of cards that can form it, that is, the
+    product of the number of cards of each rank in the run.
+
+    # Parameters
+
+    histogram:list(int)
+        - The rank histogram of the cards (see `rank_histogram`)
+
+    # Return
+
+    The points for the runs. This is the same as
+    `sum(len(r) for r in find_runs(cards))`.
+
+    """
+
+    points = 0
+    length = 0
+    multiplicity = 1
+
+    for rank, count in enumerate(histogram):
+
+        if count == 0 or (length and not _RANK_FOLLOWS[rank]):
+
+            # The span has ended
+            if length >= 3:
+                points += length * multiplicity
+
+            length = 0
+            multiplicity = 1
+
+        if count:
+            length += 1
+            multiplicity *= count
+
+    if length >= 3:
+        points += length * multiplicity
+
+    return points
+
+
+def _histogram_counts(hand, cut):
+    """
+    Count the hand and cut card using the rank histogram, see
+    `score_histogram`.
+    """
+
+    histogram = rank_histogram(hand)
+
+    flush = 0
+    nobs = 0
+    nibs = 0
+
+    suits = {c.suit_ordinal for c in hand}
+
+    if cut:
+        histogram[cut.rank_ordinal] += 1
+
+        for c in hand:
+            if c.rank_ordinal == _JACK and c.suit_ordinal == cut.suit_ordinal:
+                nobs += 1
+
+        if cut.rank_ordinal == _JACK:
+            nibs = 1
+
+    if len(suits) == 1:
+        flush = 5 if cut and cut.suit_ordinal in suits else 4
+
+    elif cut and len(hand) == 4:
+
+        # 3 cards from the hand and the cut card (see find_flushes)
+        if sum(1 for c in hand if c.suit_ordinal == cut.suit_ordinal) == 3:
+            flush = 4
+
+    return ScoreCounts(
+        count_fifteens(histogram),
+        count_pairs(histogram),
+        count_run_points(histogram),
+        flush,
+        nobs,
+        nibs,
+    )
+
+
+def score_histogram(hand, cut):
+    """
+    Score the hand and cut card using the rank histogram. The result is
+    identical to `score(find_combinations(hand, cut))` but the card
+    combinations are never enumerated.
+
+    # Parameters
+
+    hand:list(Card)
+        - The hand we want to score.
+
+    cut:Card
+        - The cut card that will be counted along with the hand.
+
+    # Return
+
+    The same dictionary as the `score` method.
+
+    """
+
+    return _histogram_counts(hand, cut).points()
+
+
+# ------------
+# Rank Multiset Kernel
+
+# The fifteens, pairs and runs only depend on the ranks of the 5 cards
+# (hand + cut). There are only 6,175 distinct multisets of 5 ranks (5 of
+# a kind is impossible) so the rank portion of the score is looked up
+# in a small table. Only the flush, nobs and nibs depend on the suits
+# and they are added to the rank score with simple arithmetic.
+
+# The suit pattern descriptor bits, see canonicalize_hand
+PATTERN_FLUSH_4 = 1  # the 4 hand cards are the same suit
+PATTERN_FLUSH_5 = 2  # the 4 hand cards and the cut are the same suit
+PATTERN_FLUSH_CUT = 4  # 3 hand cards and the cut are the same suit
+PATTERN_NOBS = 8  # the hand holds the jack of the cut suit
+PATTERN_NIBS = 16  # the cut card is a jack
+
+# _MULTISET_BINOMIAL[k][n] = C(n, k)
+_MULTISET_BINOMIAL = tuple(
+    tuple(comb(n, k) for n in range(len(RANKS) + 5)) for k in range(6)
+)
+
+# The number of entries in the rank score table (includes the 13
+# impossible 5 of a kind entries)
+RANK_MULTISETS = comb(len(RANKS) + 4, 5)
+
+# The rank score and rank count tables, built the first time they are
+# needed (see _build_rank_tables)
+_rank_scores = None
+_rank_counts = None
+
+# The rank count table packs the counts into 16 bits:
+# fifteens | pairs << 5 | run points << 8
+_PAIR_SHIFT = 5
+_RUN_SHIFT = 8
+
+
+def rank_multiset_index(ranks):
+    """
+    Given 5 rank ordinals in increasing order, return the index of the
+    multiset in the rank score table.
+
+    Adding the position to each rank converts the multiset into a set
+    of distinct numbers from 0 to 16. The index is the position of that
+    set in colexicographical order, a number from 0 to C(17, 5) - 1.
+
+    # Parameters
+
+    ranks:list(int)
+        - The 5 rank ordinals (Card.rank_ordinal) in increasing order.
+
+    # Return
+
+    The index of the multiset.
+
+    """
+
+    b = _MULTISET_BINOMIAL
+
+    return b[1][ranks[0]] + b[2][ranks[1] + 1] + b[3][ranks[2] + 2] + b[4][ranks[3] + 3] + b[5][ranks[4] + 4]
+
+
+def _build_rank_tables():
+    """
+    Build the rank score and rank count tables for every multiset of 5
+    ranks.
+    """
+
+    global _rank_scores
+    global _rank_counts
+
+    scores = bytearray(RANK_MULTISETS)
+    counts = array("H", bytes(2 * RANK_MULTISETS))
+
+    for ranks in combinations_with_replacement(range(len(RANKS)), 5):
+
+        # 5 of a kind is impossible
+        if ranks[0] == ranks[4]:
+            continue
+
+        histogram = [0] * len(RANKS)
+        for r in ranks:
+            histogram[r] += 1
+
+        fifteens = count_fifteens(histogram)
+        pairs = count_pairs(histogram)
+        runs = count_run_points(histogram)
+
+        index = rank_multiset_index(ranks)
+
+        scores[index] = fifteens * 2 + pairs * 2 + runs
+        counts[index] = fifteens | pairs << _PAIR_SHIFT | runs << _RUN_SHIFT
+
+    _rank_scores = scores
+    _rank_counts = counts
+
+
+def rank_score_table():
+    """
+    Return the rank score table, building it if required. The table is
+    a bytearray indexed by `rank_multiset_index` holding the points for
+    the fifteens, pairs and runs of the 5 ranks.
+
+    # Return
+
+    A bytearray with RANK_MULTISETS entries.
+
+    """
+
+    if _rank_scores is None:
+        _build_rank_tables()
+
+    return _rank_scores
+
+
+def rank_count_table():
+    """
+    Return the rank count table, building it if required. The table is
+    indexed by `rank_multiset_index` and holds the number of fifteens,
+    the number of pairs and the run points of the 5 ranks packed into
+    16 bits:
+
+    fifteens | pairs << 5 | run points << 8
+
+    # Return
+
+    An array('H') with RANK_MULTISETS entries.
+
+    """
+
+    if _rank_counts is None:
+        _build_rank_tables()
+
+    return _rank_counts
+
+
+def set_rank_tables(scores, counts):
+    """
+    Use the given buffers as the rank score and rank count tables
+    instead of building them. Worker processes use this to share one
+    read-only copy of the tables (see `analytics.get_executor`).
+
+    # Parameters
+
+    scores:buffer
+        - RANK_MULTISETS bytes, laid out like `rank_score_table`.
+        - None to clear the table, it will be built when needed.
+
+    counts:buffer
+        - RANK_MULTISETS unsigned 16 bit integers, laid out like
+          `rank_count_table`.
+        - None to clear the table, it will be built when needed.
+
+    """
+
+    global _rank_scores
+    global _rank_counts
+
+    if scores is not None and len(scores) != RANK_MULTISETS:
+        raise ValueError(f"The rank score table must have {RANK_MULTISETS} entries!")
+
+    if counts is not None and len(counts) != RANK_MULTISETS:
+        raise ValueError(f"The rank count table must have {RANK_MULTISETS} entries!")
+
+    _rank_scores = scores
+    _rank_counts = counts
+
+
+def canonicalize_hand(hand, cut):
+    """
+    Reduce the 4 card hand and cut card to the index of its rank
+    multiset and a suit pattern descriptor. Two hands with the same
+    index and pattern have the same score.
+
+    The pattern is a combination of the bits:
+
+    - PATTERN_FLUSH_4 - the 4 hand cards are the same suit
+    - PATTERN_FLUSH_5 - the 4 hand cards and the cut are the same suit
+    - PATTERN_FLUSH_CUT - 3 hand cards and the cut are the same suit
+      (see `find_flushes`)
+    - PATTERN_NOBS - the hand holds the jack of the cut suit
+    - PATTERN_NIBS - the cut card is a jack
+
+    # Parameters
+
+    hand:list(Card)
+        - The 4 cards in the hand
+
+    cut:Card
+        - The cut card
+
+    # Return
+
+    A tuple, (rank multiset index, suit pattern).
+
+    """
+
+    a, b, c, d = hand
+
+    index = rank_multiset_index(
+        sorted(
+            (
+                a.rank_ordinal,
+                b.rank_ordinal,
+                c.rank_ordinal,
+                d.rank_ordinal,
+                cut.rank_ordinal,
+            )
+        )
+    )
+
+    pattern = 0
+    suit = cut.suit_ordinal
+
+    # the number of hand cards that match the suit of the cut
+    matches = (
+        (a.suit_ordinal == suit)
+        + (b.suit_ordinal == suit)
+        + (c.suit_ordinal == suit)
+        + (d.suit_ordinal == suit)
+    )
+
+    if matches == 4:
+        pattern = PATTERN_FLUSH_5
+
+    elif matches == 3:
+        pattern = PATTERN_FLUSH_CUT
+
+    elif a.suit_ordinal == b.suit_ordinal == c.suit_ordinal == d.suit_ordinal:
+        pattern = PATTERN_FLUSH_4
+
+    for card in hand:
+        if card.rank_ordinal == _JACK and card.suit_ordinal == suit:
+            pattern |= PATTERN_NOBS
+
+    if cut.rank_ordinal == _JACK:
+        pattern |= PATTERN_NIBS
+
+    return index, pattern
+
+
+# The bits of each suit in a card mask (Card.index = rank * 4 + suit)
+_SUIT_BITS = tuple(
+    sum(1 << (r * len(SUITS) + s) for r in range(len(RANKS))) for s in range(len(SUITS))
+)
+
+
+def canonicalize_mask(hand, cut):
+    """
+    The same as `canonicalize_hand` except the hand is a CardSet (or an
+    integer mask). The rank multiset and the suit pattern are read from
+    the mask bits, no cards are built.
+
+    # Parameters
+
+    hand:CardSet|int
+        - The 4 cards in the hand
+
+    cut:Card
+        - The cut card
+
+    # Return
+
+    A tuple, (rank multiset index, suit pattern).
+
+    """
+
+    mask = hand.mask if isinstance(hand, CardSet) else hand
+
+    if popcount(mask) != 4:
+        raise ValueError("The hand must hold 4 cards!")
+
+    # the set bits in increasing order give the ranks in increasing order
+    ranks = []
+    bits = mask
+
+    while bits:
+        low = bits & -bits
+        ranks.append((low.bit_length() - 1) >> 2)
+        bits ^= low
+
+    insort(ranks, cut.rank_ordinal)
+
+    index = rank_multiset_index(ranks)
+
+    pattern = 0
+    suit = cut.suit_ordinal
+
+    # the number of hand cards that match the suit of the cut
+    matches = popcount(mask & _SUIT_BITS[suit])
+
+    if matches == 4:
+        pattern = PATTERN_FLUSH_5
+
+    elif matches == 3:
+        pattern = PATTERN_FLUSH_CUT
+
+    elif any(mask & bits == mask for bits in _SUIT_BITS):
+        pattern = PATTERN_FLUSH_4
+
+    if mask >> (_JACK * len(SUITS) + suit) & 1:
+        pattern |= PATTERN_NOBS
+
+    if cut.rank_ordinal == _JACK:
+        pattern |= PATTERN_NIBS
+
+    return index, pattern
+
+
+def _pattern_points(pattern, include_nibs, five_card_flush):
+    """
+    Return the points for the flush, nobs and nibs described by the
+    suit pattern.
+    """
+
+    points = 0
+
+    if pattern & PATTERN_FLUSH_5:
+        points += 5
+
+    elif pattern & (PATTERN_FLUSH_4 | PATTERN_FLUSH_CUT) and not five_card_flush:
+        points += 4
+
+    if pattern & PATTERN_NOBS:
+        points += 1
+
+    if pattern & PATTERN_NIBS and include_nibs:
+        points += 2
+
+    return points
+
+
+# _PATTERN_POINTS[include_nibs + 2 * five_card_flush][pattern]
+_PATTERN_POINTS = tuple(
+    tuple(_pattern_points(p, nibs, crib) for p in range(32))
+    for crib in (False, True)
+    for nibs in (False, True)
+)
+
+
+def score_hand_kernel(hand, cut, include_nibs=False, five_card_flush=False):
+    """
+    Score the 4 card hand and cut card using the rank multiset table.
+    The result is identical to `score_hand`.
+
+    # Parameters
+
+    hand:list(Card)
+        - The 4 cards to score
+
+    cut:Card
+        - The cut card to score with the hand
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    # Return
+
+    An integer represent the score of the hand.
+
+    """
+
+    table = _rank_scores if _rank_scores is not None else rank_score_table()
+
+    index, pattern = canonicalize_hand(hand, cut)
+
+    return table[index] + _PATTERN_POINTS[include_nibs + 2 * five_card_flush][pattern]
+
+
+# The flush count for the suit pattern, see canonicalize_hand
+_PATTERN_FLUSH = tuple(
+    5 if p & PATTERN_FLUSH_5 else 4 if p & (PATTERN_FLUSH_4 | PATTERN_FLUSH_CUT) else 0
+    for p in range(32)
+)
+
+
+def score_counts(hand, cut):
+    """
+    Count the fifteens, pairs, runs, flush, nobs and nibs of the hand
+    without building any of the card combinations. Use
+    `find_combinations` if you need to know which cards score.
+
+    A 4 card hand with a cut card uses the rank multiset tables (see
+    `canonicalize_hand`), anything else uses the rank histogram.
+
+    # Parameters
+
+    hand:list(Card)
+        - The hand we want to score.
+
+    cut:Card
+        - The cut card that will be counted along with the hand.
+        - Can be None
+
+    # Return
+
+    A ScoreCounts.
+
+    """
+
+    if cut is not None and len(hand) == 4:
+
+        table = _rank_counts if _rank_counts is not None else rank_count_table()
+
+        index, pattern = canonicalize_hand(hand, cut)
+        counts = table[index]
+
+        return ScoreCounts(
+            counts & 0x1F,
+            (counts >> _PAIR_SHIFT) & 0x7,
+            counts >> _RUN_SHIFT,
+            _PATTERN_FLUSH[pattern],
+            1 if pattern & PATTERN_NOBS else 0,
+            1 if pattern & PATTERN_NIBS else 0,
+        )
+
+    return _histogram_counts(hand, cut)
+
+
+# The active score table (see tables.load_score_table). If it is set,
+# score_hand looks up the score instead of calculating it.
+_score_table = None
+
+
+def set_score_table(table):
+    """
+    Set the score table used by `score_hand`.
+
+    # Parameters
+
+    table:tables.ScoreTable
+        - The table to use. Set to None to calculate the scores.
+
+    """
+
+    global _score_table
+    _score_table = table
+
+
+def score_hand(
+    hand,
+    cut,
+    include_nibs=False,
+    five_card_flush=False,
+    **kwargs,
+):
+    """
+    Score the hand returning the result
+
+    # Parameters
+
+    hand:Hand
+        - The hand to score
+
+    cut:Card
+        - The cut card to score with the hand
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - Only dealer can claim this.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - Only applied when counting the crib.
+        - DEFAULT - False
+
+    # Return
+
+    An integer represent the score of the hand.
+
+    # NOTE
+
+    If you are interested in a summary breaking the score down, use
+    `score_hand_breakdown` method which return a list of strings
+    breaking the score down.
+
+    If a score table has been loaded (see `tables.load_score_table`),
+    the score of a 4 card hand and cut card is looked up instead of
+    being calculated. Otherwise the rank multiset kernel is used (see
+    `score_hand_kernel`). Any other hand is counted with `score_counts`.
+    The card combinations are never built.
+
+    The scores of 4 card hands and cut cards are cached if the
+    `score_hand` cache is enabled (see `memo.enable_caches`).
+
+    """
+
+    if cut is not None and len(hand) == 4:
+
+        cache = get_cache("score_hand")
+
+        if cache is not None:
+            index, pattern = canonicalize_hand(hand, cut)
+            key = (index << 5 | pattern) << 2 | include_nibs << 1 | five_card_flush
+
+            value = cache.lookup(key)
+
+            if value is not MISSING:
+                return value
+
+        # Use the precomputed score table if one has been loaded
+        if _score_table is not None:
+            value = _score_table.score(hand, cut, include_nibs, five_card_flush)
+
+        else:
+            value = score_hand_kernel(hand, cut, include_nibs, five_card_flush)
+
+        if cache is not None:
+            cache.store(key, value)
+
+        return value
+
+    # Flush is worth 5 points and only 5 points if we are counting the
+    # crib (4 crib cards + cut). Nibs are only counted for the dealer.
+    return score_counts(hand, cut).total(include_nibs, five_card_flush)
+
+
+def score_hand_mask(
+    hand,
+    cut,
+    include_nibs=False,
+    five_card_flush=False,
+    **kwargs,
+):
+    """
+    The same as `score_hand` except the hand is a CardSet (or an integer
+    mask) of 4 cards instead of a list of cards. The hand is reduced
+    with `canonicalize_mask` and scored with the rank multiset kernel,
+    the cards are never built.
+
+    # Parameters
+
+    hand:CardSet|int
+        - The 4 cards to score
+
+    cut:Card
+        - The cut card to score with the hand
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    # Return
+
+    An integer represent the score of the hand.
+
+    """
+
+    index, pattern = canonicalize_mask(hand, cut)
+
+    cache = get_cache("score_hand")
+
+    if cache is not None:
+        key = (index << 5 | pattern) << 2 | include_nibs << 1 | five_card_flush
+
+        value = cache.lookup(key)
+
+        if value is not MISSING:
+            return value
+
+    table = _rank_scores if _rank_scores is not None else rank_score_table()
+
+    value = table[index] + _PATTERN_POINTS[include_nibs + 2 * five_card_flush][pattern]
+
+    if cache is not None:
+        cache.store(key, value)
+
+    return value
+
+
+def score_hand_breakdown(
+    hand,
+    cut,
+    include_nibs=False,
+    five_card_flush=False,
+    **kwargs,
+):
+    """
+    Score the hand and display the results. by
+
+    # Parameters
+
+    hand:Hand
+        - The hand to score
+
+    cut:Card
+        - The cut card to score with the hand
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - Only dealer can claim this.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - Only applied when counting the crib.
+        - DEFAULT - False
+
+    # Parameters (kwargs)
+
+    basic:bool
+        - Display the cards using letters for suits instead of symbols (♥,♦,♣,♠)
+        - DEFAULT - False
+
+    # Return
+
+    A list of strings representing the counts
+
+    """
+
+    basic = kwargs.get("basic", False)
+
+    hands = find_combinations(hand, cut)
+    hand_scores = score(hands)
+
+    # Flush is worth 5 points and only 5 points if we are counting the
+    # crib (4 crib cards + cut). If we are not counting the crib we can
+    # use the value of hand_scores directly.
+    flush = 0 if hand_scores["flush"] != 5 and five_card_flush else hand_scores["flush"]
+
+    # calculate the total excluding the nibs and flush
+    total = sum([v for k, v in hand_scores.items() if k not in ["nibs", "flush"]])
+
+    # add the flush separately based on the flush calculation above.
+    total += flush
+
+    # Are we counting the dealer hand?
+    if include_nibs:
+        total += hand_scores["nibs"]
+
+    summary = [
+        f"Hand = {display_hand(hand, cool=(not basic), as_string=True)}",
+        f"Cut  = {cut.cool_display(basic=basic)}",
+        "------------------",
+        f'{len(hands["fifteen"])} Fifteens for {hand_scores["fifteen"]}',
+        f'{len(hands["pair"])} Pairs for    {hand_scores["pair"]}',
+        f'{len(hands["run"])} Runs for     {hand_scores["run"]}',
+        f"Flush for      {flush}",
         f'Nobs for       {hand_scores["nobs"]}',
         f'Nibs for       {hand_scores["nibs"] if include_nibs else 0}',
         "------------------",
@@ -988,3 +2089,460 @@ def score_hand_breakdown(
     summary.append("")
 
     return summary
+
+
+# ------------
+# Batch Scoring
+
+# The scoring modes for score_hands_batch
+SCORE_MODES = ("pone", "dealer", "crib")
+
+# The number of hands scored at a time by score_hands_batch. This bounds
+# the size of the temporary arrays.
+BATCH_SIZE = 1 << 16
+
+# The 32 subsets of 5 cards, one row per subset. A 1 means the card is
+# in the subset.
+_SUBSET_MATRIX = np.array(
+    [[(s >> i) & 1 for i in range(5)] for s in range(32)],
+    dtype=np.uint8,
+)
+
+# The face value of each rank ordinal
+_VALUE_ARRAY = np.array(_RANK_VALUES, dtype=np.uint8)
+
+# _RUN_WINDOW_MASKS[length] is 1 for each starting rank where a run of
+# that length is possible. Like find_runs, a run can't cross ranks that
+# are not consecutive (see _RANK_FOLLOWS).
+_RUN_WINDOW_MASKS = {
+    length: np.array(
+        [
+            all(_RANK_FOLLOWS[r] for r in range(start + 1, start + length))
+            for start in range(len(RANKS) - length + 1)
+        ],
+        dtype=np.int64,
+    )
+    for length in (3, 4, 5)
+}
+
+
+def _as_card_array(cards):
+    """
+    Convert the cards to a 2 dimensional numpy array with 5 columns
+    without copying, if possible.
+    """
+
+    if not isinstance(cards, np.ndarray):
+
+        try:
+            # anything supporting the buffer protocol (bytes, bytearray,
+            # array.array, mmap, ...) is wrapped without a copy
+            cards = np.asarray(memoryview(cards))
+
+        except TypeError:
+            cards = np.asarray(cards)
+
+    if cards.ndim == 1:
+        cards = cards.reshape(-1, 5)
+
+    if cards.ndim != 2 or cards.shape[1] != 5:
+        raise ValueError(f"Expected an array of shape (N, 5), not {cards.shape}!")
+
+    if cards.dtype.kind not in "iu":
+        raise ValueError(f"The cards must be integers (Card.index), not {cards.dtype}!")
+
+    return cards
+
+
+def _score_batch(cards, mode):
+    """
+    Score a block of hands, see score_hands_batch.
+    """
+
+    n = len(cards)
+
+    # check the range before the cast, 260 would wrap to card 4
+    if n and (cards.min() < 0 or cards.max() >= len(_DECK)):
+        raise ValueError("The card indices must be between 0 and 51!")
+
+    cards = cards.astype(np.uint8, copy=False)
+
+    ranks = cards // len(SUITS)
+    suits = cards % len(SUITS)
+
+    # fifteens - the sum of the face values of all 32 subsets
+    sums = _VALUE_ARRAY[ranks].astype(np.int16) @ _SUBSET_MATRIX.T
+    fifteen = np.count_nonzero(sums == 15, axis=1) * 2
+
+    # rank histogram, one row per hand
+    offsets = np.arange(n, dtype=np.int64)[:, None] * len(RANKS)
+    histogram = np.bincount((offsets + ranks).ravel(), minlength=n * len(RANKS))
+    histogram = histogram.reshape(n, len(RANKS))
+
+    pair = (histogram * (histogram - 1) // 2).sum(axis=1) * 2
+
+    # runs - the product of the rank counts for every window of 3, 4
+    # and 5 consecutive ranks. Five cards can only hold one maximal span
+    # so the longest window with any runs is the span.
+    window = histogram[:, :-2] * histogram[:, 1:-1] * histogram[:, 2:]
+    run3 = window @ _RUN_WINDOW_MASKS[3]
+
+    window = window[:, :-1] * histogram[:, 3:]
+    run4 = window @ _RUN_WINDOW_MASKS[4]
+
+    window = window[:, :-1] * histogram[:, 4:]
+    run5 = window @ _RUN_WINDOW_MASKS[5]
+
+    run = np.where(run5 > 0, 5 * run5, np.where(run4 > 0, 4 * run4, 3 * run3))
+
+    # flush - see find_flushes
+    cut_suit = suits[:, 4:5]
+    matches = np.count_nonzero(suits[:, :4] == cut_suit, axis=1)
+    hand_flush = (suits[:, :4] == suits[:, :1]).all(axis=1)
+
+    flush = np.where(matches == 4, 5, np.where((matches == 3) | hand_flush, 4, 0))
+
+    if mode == "crib":
+        flush = np.where(flush == 5, 5, 0)
+
+    nobs = np.count_nonzero((ranks[:, :4] == _JACK) & (suits[:, :4] == cut_suit), axis=1)
+
+    if mode == "dealer":
+        nibs = np.where(ranks[:, 4] == _JACK, 2, 0)
+
+    else:
+        nibs = np.zeros(n, dtype=np.int64)
+
+    return fifteen, pair, run, flush, nobs, nibs
+
+
+def score_hands_batch(cards, mode="pone"):
+    """
+    Score many hands at once using vectorized array operations.
+
+    Each row holds the integer encoding (Card.index) of the 4 hand cards
+    followed by the cut card. The cards in a row must be distinct.
+
+    >>> hands = np.array([[c.index for c in make_deck()[:5]]])
+    >>> score_hands_batch(hands)["total"]
+    array([12])
+
+    # Parameters
+
+    cards:array-like
+        - An (N, 5) integer array of card indices. Any object supporting
+          the buffer protocol (bytes, array.array, numpy.memmap, ...) is
+          used without copying. A 1 dimensional buffer is treated as
+          N rows of 5 cards.
+
+    mode:str
+        - The type of hand being counted:
+        - 'pone' - `score_hand(hand, cut)`
+        - 'dealer' - `score_hand(hand, cut, include_nibs=True)`
+        - 'crib' - `score_hand(hand, cut, five_card_flush=True)`
+        - DEFAULT - 'pone'
+
+    # Return
+
+    A dictionary of numpy arrays (int16), one entry per hand, with the
+    following keys:
+
+    - 'total' - the score of the hand
+    - 'fifteen', 'pair', 'run', 'flush', 'nobs', 'nibs' - the points for
+      each category (see `score`). The flush and nibs are adjusted for
+      the mode so the categories sum to the total.
+
+    """
+
+    if mode not in SCORE_MODES:
+        raise ValueError(f"mode={mode} is not a valid option! Choose one of: {SCORE_MODES}.")
+
+    cards = _as_card_array(cards)
+
+    keys = ("fifteen", "pair", "run", "flush", "nobs", "nibs")
+    results = {k: np.empty(len(cards), dtype=np.int16) for k in keys}
+
+    for start in range(0, len(cards), BATCH_SIZE):
+        stop = start + BATCH_SIZE
+
+        for k, values in zip(keys, _score_batch(cards[start:stop], mode)):
+            results[k][start:stop] = values
+
+    results["total"] = sum(results[k] for k in keys).astype(np.int16)
+
+    return results
+
+
+# ------------
+# Cut Score Vectors
+
+
+def cut_rank_scores(hand):
+    """
+    Given a 4 card hand, return the points for the fifteens, pairs and
+    runs of the hand with a cut card of each rank. The points are looked
+    up in the rank score table (see `rank_score_table`).
+
+    # Parameters
+
+    hand:list(Card)
+        - The 4 cards of the hand
+
+    # Return
+
+    A list of 13 integers, the points for each cut rank ordinal.
+
+    """
+
+    table = _rank_scores if _rank_scores is not None else rank_score_table()
+
+    ranks = sorted(card.rank_ordinal for card in hand)
+
+    return [
+        table[rank_multiset_index(sorted(ranks + [rank]))] for rank in range(len(RANKS))
+    ]
+
+
+_ALL_RANKS = frozenset(range(len(RANKS)))
+
+
+def keep_rank_scores(hand):
+    """
+    Given a 6 card hand, return the points for the fifteens, pairs and
+    runs of each 4 card keep with a cut card of each rank. This is
+    `cut_rank_scores` for the 15 keeps at once.
+
+    The keeps share most of their cards so the subsets are counted once
+    for the 64 subsets of the hand, each subset extends the subset
+    without its last card: `ways[m][s]` is the number of combinations of
+    the cards of subset `m` that sum to `s` and `pairs[m]` the number of
+    pairs in it. With a cut card of value `v` a keep has
+    `ways[m][15] + ways[m][15 - v]` fifteens and the pairs of its cards
+    plus the cards of the cut rank.
+
+    The runs of a keep are split into its spans of consecutive ranks
+    (see `count_run_points`) once. A cut card only changes the span it
+    falls in or the spans on either side of it that it joins, the other
+    spans keep their points.
+
+    # Parameters
+
+    hand:list(Card)
+        - The 6 cards of the hand
+
+    # Return
+
+    A list of 15 lists of 13 integers, the points for each cut rank
+    ordinal of each keep in the order of `hand_combinations(hand, 4)`.
+
+    """
+
+    assert len(hand) == 6
+
+    ranks = [card.rank_ordinal for card in hand]
+    values = [_RANK_VALUES[rank] for rank in ranks]
+
+    # same[i] - the mask of the cards before card i with the same rank
+    same = [
+        sum(1 << j for j in range(i) if ranks[j] == ranks[i]) for i in range(len(hand))
+    ]
+
+    ways = [[1] + [0] * 15]
+    pairs = [0]
+
+    for m in range(1, 1 << len(hand)):
+
+        # the last card of the subset and the subset without it
+        i = m.bit_length() - 1
+        rest = m ^ (1 << i)
+
+        w = ways[rest]
+        ways.append(w[: values[i]] + [a + b for a, b in zip(w[values[i] :], w)])
+        pairs.append(pairs[rest] + bin(rest & same[i]).count("1"))
+
+    scores = []
+    for keep in combinations(range(len(hand)), 4):
+
+        m = (1 << keep[0]) | (1 << keep[1]) | (1 << keep[2]) | (1 << keep[3])
+
+        histogram = [0] * len(RANKS)
+        for i in keep:
+            histogram[ranks[i]] += 1
+
+        held = sorted({ranks[i] for i in keep})
+
+        # span[r] - the [length, multiplicity] of the span of consecutive
+        # ranks holding rank r
+        span = {}
+        fragments = []
+
+        for rank in held:
+            if rank - 1 not in span or not _RANK_FOLLOWS[rank]:
+                fragment = [0, 1]
+                fragments.append(fragment)
+
+            fragment[0] += 1
+            fragment[1] *= histogram[rank]
+            span[rank] = fragment
+
+        runs = sum(length * count for length, count in fragments if length >= 3)
+
+        # the points with a cut card that doesn't match a rank of the
+        # keep or join its spans
+        w = ways[m]
+        base = 2 * pairs[m] + runs
+        keep_scores = [base + 2 * (w[15] + w[15 - v]) for v in _RANK_VALUES]
+
+        # only the ranks of the keep and their neighbours can change it
+        for rank in {r + d for r in held for d in (-1, 0, 1)} & _ALL_RANKS:
+
+            count = histogram[rank]
+
+            if count == 4:
+                # there is no fifth card of the rank, like the rank score table
+                keep_scores[rank] = 0
+
+            elif count:
+                # the cut adds a card to the span of its rank
+                length, multiplicity = span[rank]
+                keep_scores[rank] += 2 * count
+
+                if length >= 3:
+                    keep_scores[rank] += length * multiplicity // count
+
+            else:
+                # the cut joins the spans on either side of it
+                left = span.get(rank - 1) if _RANK_FOLLOWS[rank] else None
+                right = (
+                    span.get(rank + 1)
+                    if rank + 1 < len(RANKS) and _RANK_FOLLOWS[rank + 1]
+                    else None
+                )
+
+                length = 1
+                multiplicity = 1
+
+                for fragment in (left, right):
+                    if fragment:
+                        length += fragment[0]
+                        multiplicity *= fragment[1]
+
+                        if fragment[0] >= 3:
+                            keep_scores[rank] -= fragment[0] * fragment[1]
+
+                if length >= 3:
+                    keep_scores[rank] += length * multiplicity
+
+        scores.append(keep_scores)
+
+    return scores
+
+
+def cut_suit_scores(hand, five_card_flush=False):
+    """
+    Given a 4 card hand, return the points for the flush and nobs with
+    a cut card of each suit. See `find_flushes` for the flush rules.
+
+    # Parameters
+
+    hand:list(Card)
+        - The 4 cards of the hand
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    # Return
+
+    A list of 4 integers, the points for each cut suit ordinal.
+
+    """
+
+    suits = [0] * len(SUITS)
+    nobs = [0] * len(SUITS)
+
+    for card in hand:
+        suits[card.suit_ordinal] += 1
+
+        if card.rank_ordinal == _JACK:
+            nobs[card.suit_ordinal] += 1
+
+    hand_flush = max(suits) == 4
+
+    scores = []
+    for suit, matches in enumerate(suits):
+
+        if matches == 4:
+            flush = 5
+
+        elif (matches == 3 or hand_flush) and not five_card_flush:
+            flush = 4
+
+        else:
+            flush = 0
+
+        scores.append(flush + nobs[suit])
+
+    return scores
+
+
+def score_vector(hand, exclude=None, include_nibs=False, five_card_flush=False):
+    """
+    Score the 4 card hand with every possible cut card at once.
+
+    The score of the hand with a cut card is the sum of the points that
+    depend on the cut rank (fifteens, pairs, runs and nibs, see
+    `cut_rank_scores`) and the points that depend on the cut suit (flush
+    and nobs, see `cut_suit_scores`).
+
+    >>> v = score_vector(hand)
+    >>> v.mean()  # the expected average of the hand
+
+    # Parameters
+
+    hand:list(Card)
+        - The 4 cards of the hand
+
+    exclude:list(Card)
+        - Other cards that can't be the cut card (e.g. the discards).
+        - DEFAULT - None
+
+    include_nibs:bool
+        - Include the calculation of nibs.
+        - DEFAULT - False
+
+    five_card_flush:bool
+        - Only count the flush if it is 5 cards.
+        - DEFAULT - False
+
+    # Return
+
+    A numpy masked array of 52 integers indexed by `Card.index`. The
+    hand cards and the excluded cards are masked.
+
+    """
+
+    assert len(hand) == 4
+
+    rank_scores = np.array(cut_rank_scores(hand), dtype=np.int16)
+
+    if include_nibs:
+        rank_scores[_JACK] += 2
+
+    suit_scores = np.array(
+        cut_suit_scores(hand, five_card_flush=five_card_flush), dtype=np.int16
+    )
+
+    # Card.index = rank * 4 + suit
+    scores = (rank_scores[:, None] + suit_scores[None, :]).ravel()
+
+    mask = np.zeros(len(_DECK), dtype=bool)
+
+    for card in hand:
+        mask[card.index] = True
+
+    for card in exclude or ():
+        mask[card.index] = True
+
+    return np.ma.MaskedArray(scores, mask=mask)
+
@@ -20,6 +20,7 @@
 from zoneinfo import ZoneInfo
 from datetime import datetime
 from operator import itemgetter
+from contextlib import contextmanager
 
 # ------------
 # 3rd Party - From pip
@@ -43,6 +44,40 @@ from .analytics import (
     discard_consider_all_combos,
 )
 
+from .tables import (
+    TableError,
+    SCORE_TABLE_NAME,
+    CRIB_TABLE_NAME,
+    DISCARD_TABLE_NAME,
+    HAND_TABLE_NAME,
+    PEGGING_TABLE_NAME,
+    default_table_path,
+    load_score_table,
+    load_crib_table,
+    load_discard_table,
+    load_hand_table,
+    load_pegging_table,
+)
+
+from .board import (
+    GAME_POINTS,
+    BOARD_TABLE_NAME,
+    load_board_table,
+    add_win_probabilities,
+)
+
+from .builder import (
+    JOBS,
+    build,
+)
+
+from .store import (
+    ResultStore,
+    stored_results,
+    average_keys,
+    discard_keys,
+)
+
 # ------------
 
 
@@ -68,6 +103,51 @@ def main(*args, **kwargs):
     ctx.ensure_object(dict)
 
 
+# The loader of each table, they load the table at the default table
+# path
+TABLE_LOADERS = {
+    SCORE_TABLE_NAME: load_score_table,
+    CRIB_TABLE_NAME: load_crib_table,
+    DISCARD_TABLE_NAME: load_discard_table,
+    HAND_TABLE_NAME: load_hand_table,
+    BOARD_TABLE_NAME: load_board_table,
+    PEGGING_TABLE_NAME: load_pegging_table,
+}
+
+# The tables that ship with the package, the loaders fall back to them
+# if the table hasn't been built
+SHIPPED_TABLES = {CRIB_TABLE_NAME, BOARD_TABLE_NAME, PEGGING_TABLE_NAME}
+
+
+def load_tables(*names):
+    """
+    Load and activate the tables that have been built (see the
+    build-table command) or ship with the package.
+
+    The checksums are not verified. The tables are memory-mapped and
+    only the pages that are looked up are read, hashing the whole table
+    on every command would read all of it. The tables are verified when
+    they are built and by the check-table command.
+
+    # Parameters
+
+    names:str
+        - The names of the tables to load (see TABLE_LOADERS)
+
+    """
+
+    for name in names:
+
+        if name not in SHIPPED_TABLES and not default_table_path(name).exists():
+            continue
+
+        try:
+            TABLE_LOADERS[name](verify=False)
+
+        except TableError as e:
+            click.echo(f"Ignoring the {name} table: {e}", err=True)
+
+
 # -----------
 # Add the child menu options
 
@@ -205,6 +285,16 @@ def score(*args, **kwargs):
     is_flag=True,
     help="Display more information about the process.",
 )
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Don't use the persistent cache of expected averages.",
+)
+@click.option(
+    "--distribution",
+    is_flag=True,
+    help="Display the distribution of the hand value over the cut cards.",
+)
 @click.pass_context
 def average(*args, **kwargs):
     """
@@ -220,6 +310,11 @@ def average(*args, **kwargs):
     of hand and cut card. From there it can determine the average value
     of the hand.
 
+    The cut cards are grouped by rank, the `--verbose` option lists the
+    value of the hand with each cut rank and the number of cut cards of
+    that rank left in the deck, followed by the flush and nobs points
+    added for each cut suit.
+
     You need to specify 4 cards (separated by spaces) for your hand
     or it will raise an error.
 
@@ -245,6 +340,8 @@ def average(*args, **kwargs):
     Average Value = 12.48
     """
 
+    load_tables(SCORE_TABLE_NAME, HAND_TABLE_NAME)
+
     hand = [Card(*c) for c in kwargs["hand"]]
     discard = [Card(*c) for c in kwargs["discard"]]
 
@@ -256,15 +353,300 @@ def average(*args, **kwargs):
 
     cb = write_message if kwargs["verbose"] else None
 
-    hand_average = expected_average(hand, discard, callback=cb)
+    if kwargs["distribution"]:
+        distribution = expected_average(hand, discard, callback=cb, distribution=True)
+        hand_average = distribution.mean
+
+    else:
+        # the verbose breakdown is always calculated
+        with result_cache(average_keys(hand, discard), not (cb or kwargs["no_cache"])):
+            hand_average = expected_average(hand, discard, callback=cb)
+
     hand_value = score_hand(hand, None)
 
     click.echo()
     click.echo(f"Hand Value       = {hand_value}")
     click.echo(f"Expected Average = {hand_average:.3f}")
+
+    if kwargs["distribution"]:
+        display_distribution(distribution)
+
+    click.echo()
+
+
+@main.command("build-table")
+@click.argument(
+    "table",
+    type=click.Choice(list(JOBS)),
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    default=None,
+    help="Write the table to this file instead of the default location.",
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(file_okay=False),
+    default=None,
+    help="The folder holding the shards. Defaults to the table path with a '.shards' suffix.",
+)
+@click.option(
+    "--shard-size",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The number of units of work in a shard. Only used when a build is started.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="The number of worker processes to use.",
+)
+@click.option(
+    "--no-merge",
+    is_flag=True,
+    help="Only build shards, don't merge them into the table.",
+)
+@click.option(
+    "--lock-timeout",
+    type=float,
+    default=None,
+    help="Take over shards that have been locked for more than this many seconds.",
+)
+@click.pass_context
+def build_table(*args, **kwargs):
+    """
+    Build a precomputed lookup table and write it to disk.
+
+    \b
+    - score - The score of every 4 card hand and cut card combination.
+    - crib - The crib points of every 2 card discard. A copy ships
+      with the package, the built table is used in its place.
+    - discard - The discard results of every 6 card hand, the
+      discard command looks them up instead of computing them.
+    - hand - The base score and cut card deltas of every 4 card hand,
+      the average command looks them up.
+    - board - The probability of winning from every score, the discard
+      command uses it with --score. A copy ships with the package, the
+      built table is used in its place.
+    - pegging - The expected pegging of every 4 card hand as the pone
+      and as the dealer, the discard command uses it with --pegging. A
+      copy ships with the package, the built table is used in its place.
+
+    The tables are written to `~/.cache/cribbage` by default. Set the
+    `CRIBBAGE_TABLES` environment variable to use a different folder.
+    Once the score table is built, the other commands will use it
+    automatically.
+
+    The work is split into shards that are written to a work folder as
+    they finish. If the build is stopped, run the same command to
+    resume it. Other processes, or hosts that share the folder, can
+    help by running the command with `--no-merge`. The shards are merged
+    into the table once they are all finished.
+
+    # Usage
+
+    $ cribbage build-table score
+
+    $ cribbage build-table crib
+
+    $ cribbage build-table discard --workers=8
+
+    $ cribbage build-table discard --work-dir=/shared/discard --no-merge
+
+    """
+
+    build_start_time = datetime.now().replace(tzinfo=ZoneInfo("America/Toronto"))
+
+    click.echo()
+
+    try:
+        path = build(
+            kwargs["table"],
+            kwargs["output"],
+            kwargs["work_dir"],
+            shard_size=kwargs["shard_size"],
+            workers=kwargs["workers"],
+            merge=not kwargs["no_merge"],
+            lock_timeout=kwargs["lock_timeout"],
+            callback=write_message,
+        )
+
+    except TableError as e:
+        click.echo(f"{e}", err=True)
+        args[0].abort()
+
+    build_end_time = datetime.now().replace(tzinfo=ZoneInfo("America/Toronto"))
+
+    click.echo()
+    click.echo(f"Table    - {path if path else 'not merged'}")
+    click.echo(f"Started  - {build_start_time}")
+    click.echo(f"Finished - {build_end_time}")
+    click.echo(f"Elapsed:   {build_end_time - build_start_time}")
     click.echo()
 
 
+@main.command("check-table")
+@click.argument(
+    "tables",
+    nargs=-1,
+    type=click.Choice(list(TABLE_LOADERS)),
+)
+@click.pass_context
+def check_table(*args, **kwargs):
+    """
+    Verify the checksums of the tables. The other commands only check
+    the table headers when they load a table.
+
+    Without a table name, every table that has been built or ships with
+    the package is checked.
+
+    # Usage
+
+    $ cribbage check-table
+
+    $ cribbage check-table score discard
+
+    """
+
+    names = kwargs["tables"] or [
+        name
+        for name in TABLE_LOADERS
+        if name in SHIPPED_TABLES or default_table_path(name).exists()
+    ]
+
+    failed = False
+
+    click.echo()
+
+    for name in names:
+        try:
+            TABLE_LOADERS[name](activate=False)
+            click.echo(f"{name:<8} - ok")
+
+        except TableError as e:
+            click.echo(f"{name:<8} - {e}")
+            failed = True
+
+    click.echo()
+
+    if failed:
+        args[0].exit(1)
+
+
+@main.group("cache")
+def cache(*args, **kwargs):
+    """
+    Manage the persistent cache of expected averages.
+
+    The average and discard commands store the expected averages they
+    compute and reuse them on the next run. The cache is kept with the
+    tables in `~/.cache/cribbage` (see `CRIBBAGE_TABLES`).
+
+    # Usage
+
+    $ cribbage cache stats
+
+    $ cribbage cache prune --max-entries=1000000 --older-than=30
+
+    $ cribbage cache clear
+
+    """
+
+
+@cache.command("stats")
+def cache_stats(*args, **kwargs):
+    """
+    Display the number of stored expected averages.
+    """
+
+    with ResultStore() as store:
+        click.echo()
+        click.echo(f"Cache = {store.path} ({store.path.stat().st_size:,} bytes)")
+
+        for name, version, entries in store.stats():
+            stale = "" if version == store.version else " (stale)"
+            click.echo(f"{name} v{version} = {entries:,}{stale}")
+
+        click.echo()
+
+
+@cache.command("prune")
+@click.option(
+    "--max-entries",
+    type=click.IntRange(min=0),
+    default=None,
+    help="Keep at most this many entries, the most recently used.",
+)
+@click.option(
+    "--older-than",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Remove the entries that haven't been used in this many days.",
+)
+def cache_prune(*args, **kwargs):
+    """
+    Remove the entries stored by other versions of the scoring rules and,
+    optionally, the old and least recently used entries.
+    """
+
+    max_age = kwargs["older_than"] * 86_400 if kwargs["older_than"] is not None else None
+
+    with ResultStore() as store:
+        removed = store.prune(max_entries=kwargs["max_entries"], max_age=max_age)
+
+    click.echo(f"Removed {removed:,} entries")
+
+
+@cache.command("clear")
+def cache_clear(*args, **kwargs):
+    """
+    Remove every entry from the cache.
+    """
+
+    with ResultStore() as store:
+        removed = store.clear()
+
+    click.echo(f"Removed {removed:,} entries")
+
+
+@contextmanager
+def result_cache(keys, enabled=True):
+    """
+    Use the persistent cache of expected averages for the keys (see
+    `store.stored_results`), if it is enabled.
+    """
+
+    if not enabled:
+        yield
+        return
+
+    with ResultStore() as store, stored_results(store, keys):
+        yield
+
+
+def parse_score(ctx, param, value):
+    """
+    Parse the me:opponent score option into a tuple of 2 scores.
+    """
+
+    if value is None:
+        return None
+
+    try:
+        me, opponent = (int(s) for s in value.split(":"))
+
+    except ValueError:
+        raise click.BadParameter(f"Expected me:opponent, e.g. 96:110, not {value}")
+
+    for score in (me, opponent):
+        if not 0 <= score < GAME_POINTS:
+            raise click.BadParameter(f"The scores must be from 0 to {GAME_POINTS - 1}")
+
+    return me, opponent
+
+
 def write_message(message):
     """
     Simple callback method to allow library code to write messages to
@@ -274,11 +656,48 @@ def write_message(message):
     click.echo(message)
 
 
+def distribution_summary(distribution):
+    """
+    Return a one line summary of a distribution, the standard deviation
+    and the 10th, 50th and 90th percentiles.
+    """
+
+    percentiles = "/".join(str(distribution.percentile(q)) for q in (10, 50, 90))
+
+    return f"σ = {distribution.std:>5.3f}, {percentiles:>8}"
+
+
+def display_distribution(distribution):
+    """
+    Display the distribution of a hand value, the summary followed by the
+    probability of each score and of scoring at least that much.
+    """
+
+    click.echo(f"Variance         = {distribution.variance:.3f}")
+    click.echo(f"Std Deviation    = {distribution.std:.3f}")
+
+    percentiles = ", ".join(
+        f"{q}%: {distribution.percentile(q)}" for q in (10, 25, 50, 75, 90)
+    )
+    click.echo(f"Percentiles      = {percentiles}")
+
+    click.echo()
+    click.echo("Score  Ways      P   P(≥)")
+
+    for score, ways in distribution.histogram.items():
+        click.echo(
+            f"{score:>5} {ways:>5} {distribution.probability(score):>6.3f} "
+            f"{distribution.at_least(score):>6.3f}"
+        )
+
+
 def display_discard_results(results, processing_message, delta_key, **kwargs):
     """ """
 
     dp = kwargs.get("dp", 3)
     sp = kwargs.get("sp", 6)
+    win_key = kwargs.get("win_key", None)
+    pegging_key = kwargs.get("pegging_key", None)
 
     click.echo(processing_message)
 
@@ -291,6 +710,13 @@ def display_discard_results(results, processing_message, delta_key, **kwargs):
             f"Δ = {result[delta_key]:>{sp}.{dp}f}",
         ]
 
+        if pegging_key:
+            message.append(f"EP = {result['expected_' + pegging_key]:>{sp}.{dp}f}")
+            message.append(f"Δ + EP = {result['combined_' + delta_key]:>{sp}.{dp}f}")
+
+        if win_key:
+            message.append(f"P(win) = {result[win_key]:.3f}")
+
         click.echo(", ".join(message))
 
 
@@ -305,6 +731,38 @@ def display_discard_results(results, processing_message, delta_key, **kwargs):
     is_flag=True,
     help="Display more information about the process.",
 )
+@click.option(
+    "--exact",
+    is_flag=True,
+    help="Score every crib and cut card to find the crib average instead of using the crib table (slow).",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="The number of worker processes to use with --exact. Defaults to every core.",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Don't use the persistent cache of expected averages.",
+)
+@click.option(
+    "--distribution",
+    is_flag=True,
+    help="Display the spread of the hand and crib values of each discard.",
+)
+@click.option(
+    "--score",
+    callback=parse_score,
+    default=None,
+    help="The score, me:opponent. Rank the discards by the probability of winning the game.",
+)
+@click.option(
+    "--pegging",
+    is_flag=True,
+    help="Add the expected pegging of each hand and rank the discards by the combined delta.",
+)
 @click.pass_context
 def discard(*args, **kwargs):
     """
@@ -346,6 +804,12 @@ def discard(*args, **kwargs):
 
     $ cribbage discard KH 7D 9D AD 8C JD
 
+    $ cribbage discard KH 7D 9D AD 8C JD --exact --workers=4
+
+    $ cribbage discard KH 7D 9D AD 8C JD --score=112:95
+
+    $ cribbage discard KH 7D 9D AD 8C JD --pegging
+
     # NOTE
 
     \b
@@ -356,6 +820,16 @@ def discard(*args, **kwargs):
 
     For both the dealer and the pone, you want the hand that generates the largest delta (Δ).
 
+    With --score the discards are ranked by the probability of winning
+    the game from that score, P(win), instead (see `board`). Near the
+    end of the game the safest discard can be better than the largest
+    delta.
+
+    With --pegging the expected pegging of the hand, EP, is looked up in
+    the pegging table (see `build-table pegging`) and the discards are
+    ranked by Δ + EP. EP is the points pegged less the points pegged by
+    the opponent.
+
     """
 
     ctx = args[0]
@@ -382,31 +856,92 @@ def discard(*args, **kwargs):
 
     cb = write_message if kwargs["verbose"] else None
 
-    results = discard_consider_all_combos(cards, callback=cb)
+    load_tables(SCORE_TABLE_NAME, CRIB_TABLE_NAME, DISCARD_TABLE_NAME, HAND_TABLE_NAME)
+
+    if kwargs["pegging"]:
+        try:
+            load_pegging_table(verify=False)
+
+        except TableError as e:
+            click.echo(f"{e}", err=True)
+            ctx.abort()
+
+    with result_cache(
+        discard_keys(cards), not (kwargs["no_cache"] or kwargs["distribution"])
+    ):
+        results = discard_consider_all_combos(
+            cards,
+            callback=cb,
+            exact=kwargs["exact"],
+            workers=kwargs["workers"],
+            distribution=kwargs["distribution"],
+        )
+
+    pone_key, dealer_key = "delta_pone", "delta_dealer"
+
+    if kwargs["pegging"]:
+        pone_key, dealer_key = "combined_delta_pone", "combined_delta_dealer"
+
+    if kwargs["score"]:
+        try:
+            load_board_table(verify=False)
+
+        except TableError as e:
+            click.echo(f"{e}", err=True)
+            ctx.abort()
+
+        results = add_win_probabilities(results, *kwargs["score"])
+        pone_key, dealer_key = "win_pone", "win_dealer"
 
     click.echo()
 
     results_pone = sorted(
         results,
-        key=itemgetter('delta_pone'), #lambda x: x["delta_pone"],
+        key=itemgetter(pone_key), #lambda x: x["delta_pone"],
         reverse=True,
     )
 
     display_discard_results(
-        results_pone, "Processing Pone Hands....", "delta_pone", dp=3, sp=6
+        results_pone,
+        "Processing Pone Hands....",
+        "delta_pone",
+        dp=3,
+        sp=6,
+        win_key="win_pone" if kwargs["score"] else None,
+        pegging_key="pegging_pone" if kwargs["pegging"] else None,
     )
     click.echo()
 
     results_dealer = sorted(
         results,
-        key=itemgetter('delta_dealer'), #lambda x: x["delta_dealer"],
+        key=itemgetter(dealer_key), #lambda x: x["delta_dealer"],
         reverse=True,
     )
 
     display_discard_results(
-        results_dealer, "Processing Dealer Hands....", "delta_dealer", dp=3, sp=6
+        results_dealer,
+        "Processing Dealer Hands....",
+        "delta_dealer",
+        dp=3,
+        sp=6,
+        win_key="win_dealer" if kwargs["score"] else None,
+        pegging_key="pegging_dealer" if kwargs["pegging"] else None,
     )
 
+    if kwargs["distribution"]:
+        click.echo()
+        click.echo("Distributions (standard deviation, 10th/50th/90th percentiles)....")
+
+        for i, result in enumerate(results_pone, start=1):
+            hand = display_hand(sorted(result["hand"]), cool=True, as_string=True)
+            crib = display_hand(sorted(result["discard"]), cool=True, as_string=True)
+
+            click.echo(
+                f"{i:>2} {hand}; {crib}, "
+                f"H = {distribution_summary(result['distribution'])}, "
+                f"C = {distribution_summary(result['crib_distribution'])}"
+            )
+
     # --------------
     build_end_time = datetime.now().replace(tzinfo=ZoneInfo("America/Toronto"))
 
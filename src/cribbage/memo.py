@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+A module for the size bounded, least recently used (LRU) caches of the
+scoring and expected average methods.
+
+The caches are off by default. Turn them on with `enable_caches` when
+the same hands come up over and over, e.g. analysing many deals:
+
+>>> enable_caches(maxsize=100_000)
+>>> ... analyse the deals ...
+>>> cache_stats()["expected_average"]
+CacheStats(hits=..., misses=..., evictions=..., size=..., maxsize=100000)
+
+The methods look their results up with a key that doesn't depend on the
+suit names, equivalent hands share an entry:
+
+- score_hand - `cards.canonicalize_hand` (rank multiset index and suit
+  pattern) and the counting rules
+- expected_average - `analytics.expected_average_key`
+- expected_average_crib - `analytics.crib_key` and the counting rules
+
+Each process has its own caches. The process pool workers (see
+`analytics.get_executor`) are started with the same caches enabled as
+the process that created the pool, their statistics stay in the worker.
+
+"""
+
+# ------------
+# System Modules - Included with Python
+
+from typing import NamedTuple
+from collections import OrderedDict
+
+# ------------
+# Custom Modules
+
+# -------------
+
+# The names of the methods that can be cached
+CACHE_NAMES = (
+    "score_hand",
+    "expected_average",
+    "expected_average_crib",
+)
+
+DEFAULT_CACHE_SIZE = 65_536
+
+# Returned by LRUCache.lookup when the key isn't in the cache
+MISSING = object()
+
+
+class CacheStats(NamedTuple):
+    """
+    The statistics of a cache.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class LRUCache:
+    """
+    A size bounded cache that evicts the least recently used entry.
+
+    # Parameters
+
+    maxsize:int
+        - The maximum number of entries
+        - DEFAULT - DEFAULT_CACHE_SIZE
+
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+
+        if maxsize < 1:
+            raise ValueError(f"The cache size must be at least 1, not {maxsize}!")
+
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, key):
+        """
+        Return the value stored for the key, or MISSING.
+        """
+
+        value = self._entries.get(key, MISSING)
+
+        if value is MISSING:
+            self.misses += 1
+
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+
+        return value
+
+    def store(self, key, value):
+        """
+        Store the value for the key, evicting the least recently used
+        entry if the cache is full. Return the value.
+        """
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+        return value
+
+    def items(self):
+        """
+        Return a list of the (key, value) entries, least recently used
+        first.
+        """
+
+        return list(self._entries.items())
+
+    def clear(self):
+        """
+        Remove the entries and reset the statistics.
+        """
+
+        self._entries.clear()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Return the CacheStats of the cache.
+        """
+
+        return CacheStats(
+            self.hits, self.misses, self.evictions, len(self._entries), self.maxsize
+        )
+
+
+# The enabled caches by name
+_caches = {}
+
+
+def get_cache(name):
+    """
+    Return the named cache, or None if it isn't enabled.
+    """
+
+    return _caches.get(name)
+
+
+def enable_caches(maxsize=DEFAULT_CACHE_SIZE, names=None):
+    """
+    Enable the caches. A cache that is already enabled is replaced by an
+    empty one.
+
+    # Parameters
+
+    maxsize:int or dict
+        - The maximum number of entries of each cache, or a dictionary of
+          the maximum number of entries by name (see `cache_sizes`)
+        - DEFAULT - DEFAULT_CACHE_SIZE
+
+    names:list(str)
+        - The caches to enable (see CACHE_NAMES)
+        - DEFAULT - None - all of the caches in maxsize, or all of them
+
+    """
+
+    sizes = maxsize if isinstance(maxsize, dict) else {}
+
+    for name in names or sizes or CACHE_NAMES:
+
+        if name not in CACHE_NAMES:
+            raise ValueError(f"There is no {name} cache!")
+
+        _caches[name] = LRUCache(
+            sizes.get(name, DEFAULT_CACHE_SIZE) if sizes else maxsize
+        )
+
+
+def disable_caches(names=None):
+    """
+    Disable the caches and discard their entries.
+
+    # Parameters
+
+    names:list(str)
+        - The caches to disable
+        - DEFAULT - None - all of them
+
+    """
+
+    for name in names or CACHE_NAMES:
+        _caches.pop(name, None)
+
+
+def clear_caches():
+    """
+    Remove the entries of the enabled caches and reset their statistics.
+    """
+
+    for cache in _caches.values():
+        cache.clear()
+
+
+def cache_sizes():
+    """
+    Return a dictionary of the maximum number of entries of the enabled
+    caches by name. It can be passed to `enable_caches` to enable the
+    same caches in another process.
+    """
+
+    return {name: cache.maxsize for name, cache in _caches.items()}
+
+
+def cache_stats():
+    """
+    Return a dictionary of the CacheStats of the enabled caches by name.
+    """
+
+    return {name: cache.stats() for name, cache in _caches.items()}
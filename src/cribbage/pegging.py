@@ -0,0 +1,780 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+A module for scoring the play (pegging).
+
+The players take turns laying a card and announcing the count, the
+total of the face values since the count was last reset. The count
+can't go over 31. The player that lays a card pegs:
+
+- 2 for making the count 15
+- 2 for making the count 31
+- 2, 6 or 12 for a pair, pair royal or double pair royal, the card
+  matches the rank of the last 1, 2 or 3 cards laid
+- the length of the run, 3 or more of the last cards laid are
+  consecutive ranks in any order
+
+A player that can't lay a card says "go" and the other player keeps
+laying cards while they can. The player that lays the last card before
+neither of them can play pegs 1 (for the go or the last card), unless
+the count is 31. The count is then reset and the other player leads.
+
+Ranks are consecutive when their ordinals (`Card.rank_ordinal`) differ
+by 1, so 8-9-T and 9-T-J are runs. The ace is low.
+
+# Play State
+
+The state of the play is an immutable `PlayState`. The hands are
+integer masks of the card indices (see `cards.CardSet`) and the cards
+laid since the count was reset are packed 4 bits per rank into an
+integer, the last card in the low bits.
+
+The go is resolved when a card is laid: if the other player can't play
+the turn stays with the player that laid the card and, if neither can
+play, the go point is added to the points of the card and the count is
+reset. Every move is a card, the player to move always has one to lay
+until the hands are empty, and the points of a move always go to the
+player that made it.
+
+A move costs a constant amount of work for the count, the pairs (the
+number of matching cards at the end of the sequence is kept in the
+state) and the go, and a lookup of the runs of the sequence (scanned
+once, the first time it is seen). The pile is never rescanned.
+
+In CPython on one core `play` makes about 450,000 transitions a second
+and the search visits about 180,000 states a second. Most of the time
+goes to unpacking and building the state tuples, the interpreter
+overhead of a move, not to the scoring. Millions of transitions a second
+would need a compiled kernel.
+
+>>> state = start_play(pone, dealer)
+>>> while not is_over(state):
+...     player = state.turn
+...     state, points = play(state, choose(legal_plays(state)))
+...     scores[player] += points
+
+# Search
+
+`best_play` searches the rest of the play for the card that maximizes
+the points of the player to move less the points of the opponent. It is
+an alpha-beta search with:
+
+- a transposition table keyed by the Zobrist key of the state, the
+  key is updated with a few XORs per move
+- move ordering, the best move found for the state before and then the
+  moves that peg the most points
+- iterative deepening, one more card at a time, so it can stop when the
+  time runs out
+
+When the hand of the opponent isn't known, hands are sampled from the
+unseen cards and the values are averaged over the samples.
+
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import math
+import time
+import random
+
+from typing import NamedTuple
+
+# ------------
+# Custom Modules
+
+from .cards import (
+    RANKS,
+    Card,
+    CardSet,
+    make_deck,
+    popcount,
+)
+
+# -------------
+
+# The players
+PONE = 0
+DEALER = 1
+
+# The highest count
+PLAY_LIMIT = 31
+
+# The points for the number of cards of the same rank at the end of the
+# sequence
+_PAIR_POINTS = (0, 0, 2, 6, 12)
+
+# The face value of each card index
+_VALUES = tuple(c.value for c in make_deck())
+
+# _PLAYABLE[n] is the mask of the cards with a face value of n or less
+_PLAYABLE = tuple(
+    sum(1 << i for i, v in enumerate(_VALUES) if v <= n) for n in range(PLAY_LIMIT + 1)
+)
+
+
+class PlayState(NamedTuple):
+    """
+    The state of the play.
+
+    - hands - the masks of the cards left in the pone and dealer hands
+    - turn - the player to lay the next card, PONE or DEALER
+    - count - the count
+    - sequence - the ranks of the cards laid since the count was reset,
+      4 bits each, the last card in the low bits
+    - length - the number of cards in the sequence
+    - same - the number of cards at the end of the sequence with the
+      same rank
+    - go - a mask of the players that have said go, bit PONE or DEALER
+
+    """
+
+    hands: tuple
+    turn: int
+    count: int
+    sequence: int
+    length: int
+    same: int
+    go: int
+
+    def ranks(self):
+        """
+        Return the list of the rank ordinals of the cards laid since the
+        count was reset, in the order they were laid.
+        """
+
+        return [self.sequence >> 4 * i & 15 for i in reversed(range(self.length))]
+
+
+# Create a PlayState without the argument handling of PlayState(...),
+# used in the transitions
+_new = tuple.__new__
+
+
+def _mask(cards):
+    """
+    Return the mask of the cards, a CardSet, an integer mask or an
+    iterable of Cards.
+    """
+
+    if isinstance(cards, int):
+        return cards
+
+    return CardSet(cards).mask
+
+
+def start_play(pone, dealer):
+    """
+    Return the state at the start of the play, the pone leads.
+
+    # Parameters
+
+    pone:list(Card)
+        - The 4 cards of the pone, a CardSet or a mask
+
+    dealer:list(Card)
+        - The 4 cards of the dealer, a CardSet or a mask
+
+    # Return
+
+    The PlayState
+
+    """
+
+    pone = _mask(pone)
+    dealer = _mask(dealer)
+
+    if pone & dealer:
+        raise ValueError("The hands share cards!")
+
+    return PlayState((pone, dealer), PONE if pone else DEALER, 0, 0, 0, 0, 0)
+
+
+def is_over(state):
+    """
+    Return True if every card has been laid.
+    """
+
+    return not (state.hands[0] | state.hands[1])
+
+
+def playable(state):
+    """
+    Return the mask of the cards the player to move can lay.
+    """
+
+    return state.hands[state.turn] & _PLAYABLE[PLAY_LIMIT - state.count]
+
+
+def _indices(mask):
+    """
+    Return the list of the card indices in the mask.
+    """
+
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+
+    return indices
+
+
+def legal_plays(state):
+    """
+    Return the list of the indices of the cards the player to move can
+    lay, in increasing order. It is empty when the play is over.
+    """
+
+    return _indices(state.hands[state.turn] & _PLAYABLE[PLAY_LIMIT - state.count])
+
+
+def run_length(sequence, length):
+    """
+    Return the length of the longest run at the end of the packed
+    sequence of ranks (see `PlayState`), 0 if there isn't a run of 3 or
+    more cards.
+
+    The cards are added to the window one at a time, from the last card
+    laid, until a rank repeats. The window is a run when its ranks span
+    exactly its length.
+    """
+
+    best = 0
+
+    low = high = sequence & 15
+    seen = 1 << low
+
+    for i in range(1, length):
+        order = sequence >> 4 * i & 15
+        bit = 1 << order
+
+        if seen & bit:
+            break
+
+        seen |= bit
+
+        if order < low:
+            low = order
+
+        elif order > high:
+            high = order
+
+        if i >= 2 and high - low == i:
+            best = i + 1
+
+    return best
+
+
+# The run_length of each (sequence, length) seen by play. There are only
+# a few thousand sequences of ranks that stay under 31.
+_runs = {}
+
+
+def play(state, card):
+    """
+    Lay the card and return the new state and the points pegged by the
+    player that laid it (see the module documentation).
+
+    # Parameters
+
+    state:PlayState
+        - The state of the play
+
+    card:Card
+        - The card to lay, a Card or a card index. It must be one of the
+          `legal_plays`.
+
+    # Return
+
+    A tuple of the new PlayState and the points.
+
+    # Raises
+
+    ValueError if the card can't be laid.
+
+    """
+
+    index = card if isinstance(card, int) else card.index
+
+    hands, turn, count, sequence, length, same, go = state
+
+    bit = 1 << index
+
+    if not hands[turn] & bit:
+        raise ValueError(f"{Card.from_index(index)} is not in the hand to play!")
+
+    count += _VALUES[index]
+
+    if count > PLAY_LIMIT:
+        raise ValueError(f"{Card.from_index(index)} takes the count over {PLAY_LIMIT}!")
+
+    rank = index >> 2
+
+    points = 2 if count == 15 or count == PLAY_LIMIT else 0
+
+    if length and sequence & 15 == rank:
+        same += 1
+        points += _PAIR_POINTS[same]
+
+    else:
+        same = 1
+
+    sequence = sequence << 4 | rank
+    length += 1
+
+    if same == 1 and length >= 3:
+        key = sequence << 4 | length
+        run = _runs.get(key)
+
+        if run is None:
+            run = _runs[key] = run_length(sequence, length)
+
+        points += run
+
+    if turn == PONE:
+        hands = (hands[0] ^ bit, hands[1])
+
+    else:
+        hands = (hands[0], hands[1] ^ bit)
+
+    other = 1 - turn
+
+    if count < PLAY_LIMIT:
+        limit = _PLAYABLE[PLAY_LIMIT - count]
+
+        if hands[other] & limit:
+            return _new(PlayState, (hands, other, count, sequence, length, same, go)), points
+
+        if hands[turn] & limit:
+            return (
+                _new(PlayState, (hands, turn, count, sequence, length, same, go | 1 << other)),
+                points,
+            )
+
+        # neither player can lay a card, the go or the last card
+        points += 1
+
+    # the count is reset and the other player leads
+    if not hands[other]:
+        other = turn
+
+    return _new(PlayState, (hands, other, 0, 0, 0, 0, 0)), points
+
+
+def greedy_policy(state, plays):
+    """
+    The reference play policy: lay the card that pegs the most points,
+    the highest card if more than one pegs the same. It can be passed to
+    `play_hands`.
+    """
+
+    return max(plays, key=lambda move: (play(state, move)[1], move))
+
+
+def play_hands(pone, dealer, choose):
+    """
+    Play the hands out and return the points pegged by the pone and the
+    dealer.
+
+    # Parameters
+
+    pone, dealer
+        - The hands, see `start_play`
+
+    choose:func
+        - choose(state, plays) returns the card index to lay, one of the
+          legal plays, e.g. `greedy_policy`.
+
+    # Return
+
+    A list of the points of the pone and the dealer.
+
+    """
+
+    scores = [0, 0]
+
+    state = start_play(pone, dealer)
+
+    while not is_over(state):
+        player = state.turn
+        state, points = play(state, choose(state, legal_plays(state)))
+
+        scores[player] += points
+
+    return scores
+
+
+# ------------
+# Search
+
+# Zobrist keys: a random 64 bit number for each card in each hand, for
+# each rank at each position of the sequence and for the player to move.
+# The key of a state is the XOR of its numbers and is updated with a few
+# XORs per move. The count and the pairs follow from the sequence so
+# they don't need keys.
+_zobrist = random.Random(31)
+
+_Z_HAND = tuple(tuple(_zobrist.getrandbits(64) for _ in range(52)) for _ in range(2))
+_Z_SEQUENCE = tuple(
+    tuple(_zobrist.getrandbits(64) for _ in RANKS) for _ in range(PLAY_LIMIT + 1)
+)
+_Z_TURN = _zobrist.getrandbits(64)
+
+# The transposition table entry flags
+_EXACT = 0
+_LOWER = 1
+_UPPER = 2
+
+# The number of nodes between checks of the clock
+_CLOCK_NODES = 1024
+
+
+class PlayResult(NamedTuple):
+    """
+    The result of `best_play`.
+
+    - card - the best card to lay
+    - value - the expected pegging points of the player to move less the
+      points of the opponent, for the rest of the play, after laying the
+      best card
+    - values - a dictionary of the value of each card that can be laid
+    - samples - the number of opponent hands searched, 1 with perfect
+      information
+    - nodes - the number of states searched
+
+    """
+
+    card: Card
+    value: float
+    values: dict
+    samples: int
+    nodes: int
+
+
+class _Timeout(Exception):
+    """
+    Raised when the search runs out of time.
+    """
+
+
+def zobrist_key(state):
+    """
+    Return the Zobrist key of the state, the XOR of the keys of the cards
+    in each hand, the ranks of the sequence and the player to move.
+    """
+
+    key = _Z_TURN if state.turn else 0
+
+    for player, hand in enumerate(state.hands):
+        while hand:
+            low = hand & -hand
+            key ^= _Z_HAND[player][low.bit_length() - 1]
+            hand ^= low
+
+    return key ^ _sequence_key(state)
+
+
+def _sequence_key(state):
+
+    key = 0
+    for i, rank in enumerate(state.ranks()):
+        key ^= _Z_SEQUENCE[i][rank]
+
+    return key
+
+
+class _Search:
+    """
+    An alpha-beta search of the play with a transposition table.
+
+    The value of a state is the points the player to move will peg, less
+    the points of the opponent, for the rest of the play. A move that
+    leaves the turn with the same player (the opponent said go) adds to
+    the value of the next state instead of negating it.
+
+    # Parameters
+
+    deadline:float
+        - The time.perf_counter() value to stop searching at.
+        - DEFAULT - None - no limit
+
+    """
+
+    def __init__(self, deadline=None):
+
+        self.deadline = deadline
+        self.nodes = 0
+        self.table = {}
+
+    def children(self, state, key, sequence_key, best_move=None):
+        """
+        Return the list of (move, points, child, child key, child
+        sequence key) of the state, ordered with the best move of the
+        table first and then by the points of the move.
+        """
+
+        turn = state.turn
+        length = state.length
+        hand_keys = _Z_HAND[turn]
+
+        children = []
+
+        for move in legal_plays(state):
+            child, points = play(state, move)
+
+            child_key = key ^ hand_keys[move]
+
+            if child.turn != turn:
+                child_key ^= _Z_TURN
+
+            if child.length:
+                child_sequence = sequence_key ^ _Z_SEQUENCE[length][move >> 2]
+
+            else:
+                child_sequence = 0
+
+            child_key ^= sequence_key ^ child_sequence
+
+            children.append(
+                (move == best_move, points, move, child, child_key, child_sequence)
+            )
+
+        children.sort(reverse=True)
+
+        return children
+
+    def value(self, state, key, sequence_key, depth, alpha, beta):
+        """
+        Return the value of the state searched depth cards ahead, the
+        alpha-beta window is (alpha, beta).
+        """
+
+        self.nodes += 1
+
+        if self.deadline and not self.nodes % _CLOCK_NODES:
+            if time.perf_counter() > self.deadline:
+                raise _Timeout()
+
+        if depth == 0 or not (state.hands[0] | state.hands[1]):
+            return 0
+
+        best_move = None
+        entry = self.table.get(key)
+
+        if entry is not None:
+            entry_depth, entry_value, flag, best_move = entry
+
+            if entry_depth >= depth:
+                if flag == _EXACT:
+                    return entry_value
+
+                if flag == _LOWER:
+                    alpha = max(alpha, entry_value)
+
+                else:
+                    beta = min(beta, entry_value)
+
+                if alpha >= beta:
+                    return entry_value
+
+        start = alpha
+        turn = state.turn
+        best = -math.inf
+
+        for _, points, move, child, child_key, child_sequence in self.children(
+            state, key, sequence_key, best_move
+        ):
+            if child.turn == turn:
+                v = points + self.value(
+                    child, child_key, child_sequence, depth - 1, alpha - points, beta - points
+                )
+
+            else:
+                v = points - self.value(
+                    child, child_key, child_sequence, depth - 1, points - beta, points - alpha
+                )
+
+            if v > best:
+                best, best_move = v, move
+
+                if v > alpha:
+                    alpha = v
+
+                    if alpha >= beta:
+                        break
+
+        if best <= start:
+            flag = _UPPER
+
+        elif best >= beta:
+            flag = _LOWER
+
+        else:
+            flag = _EXACT
+
+        self.table[key] = (depth, best, flag, best_move)
+
+        return best
+
+    def root(self, state, depth):
+        """
+        Return a dictionary of the exact value of each move of the state
+        searched depth cards ahead.
+        """
+
+        key = zobrist_key(state)
+        sequence_key = _sequence_key(state)
+
+        values = {}
+
+        for _, points, move, child, child_key, child_sequence in self.children(
+            state, key, sequence_key
+        ):
+            v = self.value(child, child_key, child_sequence, depth - 1, -math.inf, math.inf)
+            values[move] = points + v if child.turn == state.turn else points - v
+
+        return values
+
+
+def best_play(state, unseen=None, **kwargs):
+    """
+    Search the play and return the best card for the player to move.
+
+    With perfect information (unseen is None) both hands of the state
+    are known and the play is searched to the end, one more card at a
+    time (iterative deepening) until the search is complete or the time
+    runs out.
+
+    Otherwise the cards of the opponent are not known. Hands for the
+    opponent are sampled from the unseen cards, each sample is searched
+    with perfect information and the values of the cards are averaged
+    over the samples.
+
+    # Parameters
+
+    state:PlayState
+        - The state of the play. With unseen cards the hand of the
+          opponent is ignored.
+
+    unseen:list(Card)
+        - The cards the player to move hasn't seen, a CardSet or a mask
+          (see `start_play`). The opponent holds some of them.
+        - DEFAULT - None - perfect information
+
+    # Parameters (kwargs)
+
+    opponent_cards:int
+        - The number of cards the opponent holds
+        - DEFAULT - None - the number of cards in the opponent hand of
+          the state
+
+    samples:int
+        - The number of opponent hands to sample
+        - DEFAULT - 100
+
+    time_limit:float
+        - The number of seconds to search for. The first iteration, or
+          sample, is always finished.
+        - DEFAULT - None - no limit
+
+    seed:int
+        - The seed of the random opponent hands
+        - DEFAULT - None
+
+    # Return
+
+    The PlayResult
+
+    # Raises
+
+    ValueError if the play is over.
+
+    """
+
+    time_limit = kwargs.get("time_limit", None)
+
+    plays = legal_plays(state)
+
+    if not plays:
+        raise ValueError("The play is over, there is no card to lay!")
+
+    search = _Search()
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    if unseen is None:
+        values = None
+
+        for depth in range(1, popcount(state.hands[0] | state.hands[1]) + 1):
+            if values and deadline is not None and time.perf_counter() > deadline:
+                break
+
+            try:
+                values = search.root(state, depth)
+
+            except _Timeout:
+                break
+
+            search.deadline = deadline
+
+        samples = 1
+
+    else:
+        other = 1 - state.turn
+
+        unseen = _mask(unseen) & ~state.hands[state.turn]
+
+        # an opponent that said go holds no card that can be laid
+        if state.go >> other & 1:
+            unseen &= ~_PLAYABLE[PLAY_LIMIT - state.count]
+
+        unseen = [Card.from_index(i) for i in _indices(unseen)]
+        count = kwargs.get("opponent_cards", None)
+
+        if count is None:
+            count = popcount(state.hands[other])
+
+        rng = random.Random(kwargs.get("seed", None))
+
+        totals = dict.fromkeys(plays, 0)
+        samples = 0
+
+        for _ in range(kwargs.get("samples", 100)):
+            if samples and deadline is not None and time.perf_counter() > deadline:
+                break
+
+            hand = CardSet(rng.sample(unseen, count)).mask
+
+            hands = (hand, state.hands[1]) if other == PONE else (state.hands[0], hand)
+            sample = state._replace(hands=hands)
+
+            try:
+                sampled = search.root(sample, popcount(hands[0] | hands[1]))
+
+            except _Timeout:
+                break
+
+            for move, v in sampled.items():
+                totals[move] += v
+
+            samples += 1
+            search.deadline = deadline
+
+        values = {move: total / samples for move, total in totals.items()}
+
+    values = {Card.from_index(move): v for move, v in values.items()}
+    card = max(values, key=values.get)
+
+    return PlayResult(card, values[card], values, samples, search.nodes)
+
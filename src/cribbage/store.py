@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+A module for the persistent cache of the expected averages.
+
+The results of `analytics.expected_average` and
+`analytics.expected_average_crib` are stored in a SQLite database so
+they survive from one run of the command line to the next. Each entry
+is keyed by:
+
+- name - the method, `expected_average` or `expected_average_crib`
+- version - RESULTS_VERSION, entries of other versions are ignored
+- key - the suit canonical key of the query (see `memo`)
+
+The store is used in batches with the in memory caches (see
+`stored_results`). The keys a command needs are read in one query and
+loaded into the caches, the command runs, and the new results are
+written in one transaction.
+
+The database uses write-ahead logging and writes take the lock up front
+(BEGIN IMMEDIATE) so any number of processes can share it. A process
+that finds the database locked waits for it.
+
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import time
+import sqlite3
+
+from pathlib import Path
+from contextlib import contextmanager
+
+# ------------
+# Custom Modules
+
+from .tables import default_table_folder
+
+from .analytics import (
+    discard_splits,
+    expected_average_key,
+    crib_key,
+)
+
+from .memo import (
+    get_cache,
+    enable_caches,
+    disable_caches,
+)
+
+# -------------
+
+STORE_NAME = "results.sqlite"
+
+# Increment this whenever the scoring rules or the cache keys change.
+# The entries of other versions are ignored and removed by `prune`.
+RESULTS_VERSION = 1
+
+# The methods that are stored
+STORE_NAMES = (
+    "expected_average",
+    "expected_average_crib",
+)
+
+# The number of keys in one query, below the SQLite variable limit
+_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    name TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    value REAL NOT NULL,
+    used REAL NOT NULL,
+    PRIMARY KEY (name, version, key)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+"""
+
+
+def default_store_path():
+    """
+    Return the default path of the result store. It is kept with the
+    tables (see `tables.default_table_folder`).
+    """
+
+    return default_table_folder() / STORE_NAME
+
+
+class ResultStore:
+    """
+    A SQLite database of expected average results.
+
+    # Parameters
+
+    path:Path
+        - The location of the database, it is created if it doesn't
+          exist.
+        - DEFAULT - None - use `default_store_path`
+
+    timeout:float
+        - The number of seconds to wait for another process that holds
+          the lock.
+        - DEFAULT - 30
+
+    version:int
+        - The results version
+        - DEFAULT - RESULTS_VERSION
+
+    """
+
+    def __init__(self, path=None, timeout=30.0, version=RESULTS_VERSION):
+
+        self.path = Path(path) if path else default_store_path()
+        self.version = version
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # autocommit, the transactions are started explicitly
+        self._connection = sqlite3.connect(
+            self.path, timeout=timeout, isolation_level=None
+        )
+
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """
+        Close the database.
+        """
+
+        self._connection.close()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run the statements in a transaction that holds the write lock.
+        """
+
+        self._connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield self._connection
+
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+
+        self._connection.execute("COMMIT")
+
+    def lookup(self, name, keys):
+        """
+        Look up the stored values of the keys.
+
+        # Parameters
+
+        name:str
+            - The name of the method
+
+        keys:iterable
+            - The keys to look up
+
+        # Return
+
+        A dictionary of the values of the keys that are stored.
+
+        """
+
+        keys = {repr(key): key for key in keys}
+        texts = list(keys)
+
+        values = {}
+
+        for i in range(0, len(texts), _BATCH_SIZE):
+            batch = texts[i : i + _BATCH_SIZE]
+
+            rows = self._connection.execute(
+                "SELECT key, value FROM results WHERE name = ? AND version = ? "
+                f"AND key IN ({', '.join('?' * len(batch))})",
+                (name, self.version, *batch),
+            )
+
+            values.update((keys[text], value) for text, value in rows)
+
+        return values
+
+    def save(self, values, used=None):
+        """
+        Store the values and mark the used entries, in one transaction.
+
+        # Parameters
+
+        values:dict
+            - A dictionary, by method name, of dictionaries of the values
+              by key.
+
+        used:dict
+            - A dictionary, by method name, of the keys of the stored
+              entries that were used.
+            - DEFAULT - None
+
+        """
+
+        now = time.time()
+
+        with self._transaction() as db:
+            for name, entries in values.items():
+                db.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (name, self.version, repr(key), value, now)
+                        for key, value in entries.items()
+                    ),
+                )
+
+            for name, keys in (used or {}).items():
+                db.executemany(
+                    "UPDATE results SET used = ? "
+                    "WHERE name = ? AND version = ? AND key = ?",
+                    ((now, name, self.version, repr(key)) for key in keys),
+                )
+
+    def stats(self):
+        """
+        Return a list of the (name, version, entries) in the store.
+        """
+
+        return self._connection.execute(
+            "SELECT name, version, COUNT(*) FROM results "
+            "GROUP BY name, version ORDER BY name, version"
+        ).fetchall()
+
+    def prune(self, max_entries=None, max_age=None):
+        """
+        Remove the entries of other versions, the entries that haven't
+        been used in max_age seconds and the least recently used entries
+        over max_entries.
+
+        # Parameters
+
+        max_entries:int
+            - The number of entries to keep
+            - DEFAULT - None - no limit
+
+        max_age:float
+            - The number of seconds to keep an entry that isn't used
+            - DEFAULT - None - no limit
+
+        # Return
+
+        The number of entries removed.
+
+        """
+
+        with self._transaction() as db:
+            removed = db.execute(
+                "DELETE FROM results WHERE version != ?", (self.version,)
+            ).rowcount
+
+            if max_age is not None:
+                removed += db.execute(
+                    "DELETE FROM results WHERE used < ?", (time.time() - max_age,)
+                ).rowcount
+
+            if max_entries is not None:
+                removed += db.execute(
+                    "DELETE FROM results WHERE (name, key) IN ("
+                    "SELECT name, key FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,),
+                ).rowcount
+
+        self._connection.execute("VACUUM")
+
+        return removed
+
+    def clear(self):
+        """
+        Remove every entry. Return the number of entries removed.
+        """
+
+        with self._transaction() as db:
+            removed = db.execute("DELETE FROM results").rowcount
+
+        self._connection.execute("VACUUM")
+
+        return removed
+
+
+def average_keys(hand, discard=None):
+    """
+    Return the keys `stored_results` needs for the expected average of
+    the 4 card hand (see `analytics.expected_average`).
+    """
+
+    return {"expected_average": [expected_average_key(hand, discard)]}
+
+
+def discard_keys(hand):
+    """
+    Return the keys `stored_results` needs for the results of the 6 card
+    hand (see `analytics.discard_consider_all_combos`).
+    """
+
+    splits = discard_splits(hand)
+
+    return {
+        "expected_average": [expected_average_key(ch, d) for ch, d in splits],
+        "expected_average_crib": [(crib_key(ch, d), False, False) for ch, d in splits],
+    }
+
+
+@contextmanager
+def stored_results(store, keys):
+    """
+    Load the stored values of the keys into the in memory caches (see
+    `memo`), enabling the caches that aren't, and save the new results
+    when the block finishes. Only the results computed in the block are
+    saved, the entries that were already in the caches are left alone.
+
+    >>> with stored_results(store, discard_keys(hand)):
+    ...     results = discard_consider_all_combos(hand)
+
+    # Parameters
+
+    store:ResultStore
+        - The result store
+
+    keys:dict
+        - A dictionary, by method name, of the keys the block needs
+          (see `average_keys` and `discard_keys`).
+
+    """
+
+    enabled = [name for name in keys if get_cache(name) is None]
+
+    if enabled:
+        enable_caches(names=enabled)
+
+    try:
+        # the entries in the caches before the block
+        existing = {name: {key for key, _ in get_cache(name).items()} for name in keys}
+
+        loaded = {}
+
+        for name, needed in keys.items():
+            loaded[name] = store.lookup(name, needed)
+
+            cache = get_cache(name)
+            for key, value in loaded[name].items():
+                cache.store(key, value)
+
+        yield
+
+        new = {}
+        for name in keys:
+            new[name] = {
+                key: value
+                for key, value in get_cache(name).items()
+                if key not in loaded[name] and key not in existing[name]
+            }
+
+        store.save(new, used=loaded)
+
+    finally:
+        if enabled:
+            disable_caches(enabled)
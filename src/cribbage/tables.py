@@ -0,0 +1,1739 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+A module for building, writing and loading precomputed lookup tables.
+
+The tables are stored on disk as a fixed size header followed by the
+raw array data. The header records the name of the table, its version,
+the numpy dtype, the shape and a sha256 checksum of the data. At
+runtime the tables are memory-mapped so they are shared by every
+process that loads them and only the pages that are used are read from
+disk.
+
+A table is rejected (TableError) if the header does not match what the
+code expects. That is, the name, version or size is different or the
+checksum doesn't match the data. This prevents a stale table from
+producing incorrect scores.
+
+# Score Table
+
+The score table holds the score of every 4 card hand and cut card
+combination. There are C(52, 5) = 2,598,960 five card sets and any one
+of the 5 cards can be the cut card. Each row holds 3 scores:
+
+- pone - `score_hand(hand, cut)`
+- dealer - `score_hand(hand, cut, include_nibs=True)`
+- crib - `score_hand(hand, cut, five_card_flush=True)`
+
+The row is located using a perfect hash. The 5 card indices are sorted
+and converted to their position in colexicographical order (the
+combinatorial number system). That number times 5 plus the position of
+the cut card in the sorted cards is the row.
+
+# Crib Table
+
+The crib table holds the total points of every crib that can be formed
+from each of the C(52, 2) = 1,326 two card discards, with every cut
+card, when nothing else is known about the deck. The row is the
+position of the 2 discard cards in colexicographical order. Each row
+holds 2 totals, see `analytics.expected_average_crib`:
+
+- rank - the fifteens, pairs and runs points
+- suit - the flush and nobs points
+
+The table is small and ships with the package. The 4 cards kept in
+hand are removed from the deck with an exact correction (see
+`CribTable`).
+
+# Discard Table
+
+The discard table holds the `analytics.discard_consider_all_combos`
+results for every 6 card hand. Renaming the suits doesn't change the
+results so the C(52, 6) = 20,358,520 hands are reduced to 962,988
+classes, one for each multiset of the 4 suit rank masks. The class key
+packs the masks, largest first, into 52 bits. The keys are stored,
+sorted, in a second table and the row of a hand is found with a binary
+search.
+
+Each row holds the totals for the 15 splits of the canonical hand
+(the cards of the class sorted by index, split in the order of
+`hand_combinations(hand, 4)`):
+
+- 15 hand totals - the points of the hand with each of the 46 cut cards
+- 15 crib totals - the crib points of each of the 43,560 cribs and cut
+  cards
+
+# Hand Table
+
+The hand table splits the score of each of the C(52, 4) = 270,725 four
+card hands with a cut card into the points of the hand alone and what
+the cut card adds. The row is the position of the 4 cards in
+colexicographical order. Each row holds:
+
+- base - the fifteens, pairs, runs and 4 card flush of the hand alone
+- delta - 13 columns, the fifteens, pairs and runs points that a cut
+  card of each rank adds
+- flush - a mask of the suits that add flush points when cut
+- flush points - the points those suits add
+- nobs - a mask of the suits of the jacks in the hand
+
+With the cards left in the deck counted by rank and by suit, the
+expected average of a hand is the base plus a 13 term weighted sum of
+the deltas and the suit points (see `HandTable.expected_average`).
+
+# Pegging Table
+
+The pegging table holds the expected pegging points of each 4 card
+hand less the points of the opponent, as the pone and as the dealer.
+The play doesn't depend on the suits so there is a row for each of the
+C(16, 4) = 1,820 multisets of 4 ranks, the row is the position of the
+multiset in colexicographical order (see `pegging_row`). Each row holds:
+
+- pone - the expected differential when the hand is played as the pone
+- dealer - the expected differential when the hand is played as the
+  dealer
+
+The opponent is dealt 4 of the 48 other cards at random and both
+players lay their cards with `pegging.greedy_policy`. Each row averages
+PEGGING_SAMPLES deals, the same deals are played in both seats. The
+table is small and ships with the package.
+
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import os
+import struct
+import hashlib
+import tempfile
+
+from math import comb
+from operator import mul
+from pathlib import Path
+from itertools import combinations
+
+# ------------
+# 3rd Party - From pip
+
+import numpy as np
+
+# ------------
+# Custom Modules
+
+from .cards import (
+    RANKS,
+    SUITS,
+    Card,
+    make_deck,
+    popcount,
+    count_fifteens,
+    count_pairs,
+    count_run_points,
+    rank_score_table,
+    score_hand_kernel,
+    set_score_table,
+)
+
+from .pegging import (
+    greedy_policy,
+    play_hands,
+)
+
+from .analytics import (
+    crib_count,
+    crib_rank_points,
+    crib_suit_points,
+    discard_splits,
+    discard_results,
+    expected_averages,
+    set_crib_table,
+    set_discard_table,
+    set_hand_table,
+    set_pegging_table,
+)
+
+# -------------
+
+
+class TableError(ValueError):
+    """
+    Raised when a table file is missing, corrupt or stale.
+    """
+
+
+# The table file header:
+# - magic - identifies the file format (and the format version)
+# - name - the name of the table
+# - version - the version of the table contents
+# - dtype - the numpy dtype string of the data, e.g. '|u1'
+# - rows - the number of rows
+# - columns - the number of columns
+# - checksum - sha256 digest of the data
+TABLE_MAGIC = b"CRIBTBL1"
+_HEADER = struct.Struct("<8s16sI4sQQ32s")
+
+# The data starts on this offset so it is aligned for any dtype
+HEADER_SIZE = 128
+
+# The environment variable that can be used to change the location of
+# the tables
+TABLE_PATH_VARIABLE = "CRIBBAGE_TABLES"
+
+SCORE_TABLE_NAME = "score"
+
+# Increment this whenever the scoring rules change. Tables built with a
+# different version are rejected.
+SCORE_TABLE_VERSION = 1
+
+# The number of 5 card sets and the number of rows in the score table
+FIVE_CARD_SETS = comb(52, 5)
+SCORE_TABLE_ROWS = FIVE_CARD_SETS * 5
+
+# The column that stores the score for each type of count
+SCORE_COLUMNS = {
+    "pone": 0,
+    "dealer": 1,
+    "crib": 2,
+}
+
+CRIB_TABLE_NAME = "crib"
+
+# Increment this whenever the scoring rules change.
+CRIB_TABLE_VERSION = 1
+
+# One row for every 2 card discard
+CRIB_TABLE_ROWS = comb(52, 2)
+
+CRIB_COLUMNS = {
+    "rank": 0,
+    "suit": 1,
+}
+
+DISCARD_TABLE_NAME = "discard"
+DISCARD_KEYS_NAME = "discard-keys"
+
+# Increment this whenever the scoring rules change.
+DISCARD_TABLE_VERSION = 1
+
+# The number of 6 card hands that are different under suit renaming
+DISCARD_CLASSES = 962_988
+
+# The 6 cards are split into a 4 card hand and a 2 card discard 15 ways
+DISCARD_SPLITS = comb(6, 4)
+
+# The number of cut cards for each hand and the number of cribs and
+# cut cards for each discard
+HAND_CUTS = 52 - 6
+CRIB_CUTS = comb(HAND_CUTS, 2) * (HAND_CUTS - 2)
+
+HAND_TABLE_NAME = "hand"
+
+# Increment this whenever the scoring rules change.
+HAND_TABLE_VERSION = 1
+
+# One row for every 4 card hand
+HAND_TABLE_ROWS = comb(52, 4)
+
+# The first column of each field, delta is 13 columns
+HAND_COLUMNS = {
+    "base": 0,
+    "delta": 1,
+    "flush": 1 + len(RANKS),
+    "flush_points": 2 + len(RANKS),
+    "nobs": 3 + len(RANKS),
+}
+
+HAND_TABLE_COLUMNS = 4 + len(RANKS)
+
+PEGGING_TABLE_NAME = "pegging"
+
+# Increment this whenever the play rules or the reference policy change.
+PEGGING_TABLE_VERSION = 2
+
+# One row for every multiset of 4 ranks
+PEGGING_TABLE_ROWS = comb(len(RANKS) + 3, 4)
+
+PEGGING_COLUMNS = {
+    "pone": 0,
+    "dealer": 1,
+}
+
+# The number of deals averaged for each row
+PEGGING_SAMPLES = 1_000
+
+# The crib table that ships with the package
+CRIB_TABLE_PATH = Path(__file__).parent / "data" / f"{CRIB_TABLE_NAME}.tbl"
+
+# The pegging table that ships with the package
+PEGGING_TABLE_PATH = Path(__file__).parent / "data" / f"{PEGGING_TABLE_NAME}.tbl"
+
+# _BINOMIAL[k][n] = C(n, k) - used for the perfect hash
+_BINOMIAL = tuple(tuple(comb(n, k) for n in range(53)) for k in range(6))
+
+
+def default_table_folder():
+    """
+    Return the folder the tables are kept in. It can be set with the
+    `CRIBBAGE_TABLES` environment variable, otherwise `~/.cache/cribbage`
+    is used.
+    """
+
+    folder = os.environ.get(TABLE_PATH_VARIABLE)
+
+    if folder:
+        return Path(folder)
+
+    return Path.home() / ".cache" / "cribbage"
+
+
+def default_table_path(name):
+    """
+    Return the default path of the named table, in the
+    `default_table_folder`.
+
+    # Parameters
+
+    name:str
+        - The name of the table
+
+    # Return
+
+    A Path to the table file.
+
+    """
+
+    return default_table_folder() / f"{name}.tbl"
+
+
+def combination_index(indices):
+    """
+    Given a sorted sequence of distinct card indices, return the
+    position of the combination in colexicographical order. For k cards
+    this is a number from 0 to C(52, k) - 1 and every combination has a
+    unique number (a perfect hash).
+
+    >>> combination_index([0, 1, 2, 3, 4])
+    0
+    >>> combination_index([47, 48, 49, 50, 51])
+    2598959
+
+    # Parameters
+
+    indices:list(int)
+        - The card indices in increasing order.
+
+    # Return
+
+    The index of the combination.
+
+    """
+
+    return sum(_BINOMIAL[k][c] for k, c in enumerate(indices, start=1))
+
+
+def combination_at(index, k):
+    """
+    Return the k card indices of the combination at the position in
+    colexicographical order, the inverse of `combination_index`.
+
+    >>> combination_at(2598959, 5)
+    [47, 48, 49, 50, 51]
+
+    # Parameters
+
+    index:int
+        - The position of the combination
+
+    k:int
+        - The number of cards in the combination
+
+    # Return
+
+    The card indices in increasing order.
+
+    """
+
+    combo = []
+    for k in range(k, 0, -1):
+        n = k - 1
+        while _BINOMIAL[k][n + 1] <= index:
+            n += 1
+
+        combo.insert(0, n)
+        index -= _BINOMIAL[k][n]
+
+    return combo
+
+
+def write_table(path, name, version, data):
+    """
+    Write the array to the path with a header describing it. The file
+    is written to a temporary file first and moved into place so a
+    partially written table is never visible.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table
+
+    name:str
+        - The name of the table. Stored in the header and verified when
+          the table is loaded.
+
+    version:int
+        - The version of the table. Stored in the header and verified
+          when the table is loaded.
+
+    data:numpy.ndarray
+        - A 1 or 2 dimensional array to write.
+
+    """
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    data = np.ascontiguousarray(data)
+
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+
+    if data.ndim != 2:
+        raise ValueError(f"Only 1 or 2 dimensional tables are supported, not {data.ndim}!")
+
+    header = _HEADER.pack(
+        TABLE_MAGIC,
+        name.encode("ascii"),
+        version,
+        data.dtype.str.encode("ascii"),
+        data.shape[0],
+        data.shape[1],
+        hashlib.sha256(data).digest(),
+    )
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+
+    try:
+        with os.fdopen(fd, "wb") as fo:
+            fo.write(header.ljust(HEADER_SIZE, b"\0"))
+            fo.write(data.tobytes())
+
+        os.replace(tmp, path)
+
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_table(path, name, version, shape=None, verify=True):
+    """
+    Memory-map the table stored at path. The header is verified against
+    the expected name, version and shape.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+
+    name:str
+        - The expected name of the table.
+
+    version:int
+        - The expected version of the table.
+
+    shape:tuple(int, int)
+        - The expected shape of the table.
+        - DEFAULT - None - Accept any shape
+
+    verify:bool
+        - Verify the sha256 checksum of the data. This reads the entire
+          table.
+        - DEFAULT - True
+
+    # Return
+
+    A read-only numpy.memmap of the table data.
+
+    # Raises
+
+    TableError if the file is missing or doesn't match.
+
+    """
+
+    path = Path(path)
+
+    if not path.exists():
+        raise TableError(f"The table ({path}) does not exist!")
+
+    with path.open("rb") as fi:
+        header = fi.read(HEADER_SIZE)
+
+    if len(header) < HEADER_SIZE:
+        raise TableError(f"The table ({path}) is truncated!")
+
+    magic, stored_name, stored_version, dtype, rows, columns, checksum = _HEADER.unpack(
+        header[: _HEADER.size]
+    )
+
+    if magic != TABLE_MAGIC:
+        raise TableError(f"The file ({path}) is not a table!")
+
+    stored_name = stored_name.rstrip(b"\0").decode("ascii")
+    if stored_name != name:
+        raise TableError(f"The table ({path}) is `{stored_name}`, expected `{name}`!")
+
+    if stored_version != version:
+        raise TableError(
+            f"The table ({path}) is version {stored_version}, expected {version}! Rebuild the table."
+        )
+
+    if shape is not None and (rows, columns) != tuple(shape):
+        raise TableError(f"The table ({path}) has shape {(rows, columns)}, expected {tuple(shape)}!")
+
+    dtype = np.dtype(dtype.rstrip(b"\0").decode("ascii"))
+
+    if path.stat().st_size != HEADER_SIZE + rows * columns * dtype.itemsize:
+        raise TableError(f"The table ({path}) is the wrong size!")
+
+    data = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(rows, columns))
+
+    if verify and hashlib.sha256(data).digest() != checksum:
+        raise TableError(f"The table ({path}) checksum does not match!")
+
+    return data
+
+
+def score_table_row(hand, cut):
+    """
+    Return the row of the score table for the hand and cut card.
+
+    # Parameters
+
+    hand:list(Card)
+        - The 4 cards of the hand
+
+    cut:Card
+        - The cut card
+
+    # Return
+
+    The row index, 0 to SCORE_TABLE_ROWS - 1.
+
+    """
+
+    a, b, c, d = hand
+    cards = sorted((a.index, b.index, c.index, d.index, cut.index))
+
+    return combination_index(cards) * 5 + cards.index(cut.index)
+
+
+def score_table_rows(start, stop):
+    """
+    Score the 5 card sets from start to stop (in colexicographical
+    order) using `cards.score_hand_kernel`.
+
+    # Parameters
+
+    start:int
+        - The index of the first 5 card set.
+
+    stop:int
+        - The index of the last 5 card set (exclusive).
+
+    # Return
+
+    A numpy array, (stop - start) * 5 rows by 3 columns (uint8).
+
+    """
+
+    deck = make_deck()
+
+    rows = np.zeros(((stop - start) * 5, len(SCORE_COLUMNS)), dtype=np.uint8)
+
+    combo = combination_at(start, 5)
+
+    for i in range(0, len(rows), 5):
+        cards = [deck[c] for c in combo]
+
+        for position, cut in enumerate(cards):
+            hand = cards[:position] + cards[position + 1:]
+
+            rows[i + position] = (
+                score_hand_kernel(hand, cut),
+                score_hand_kernel(hand, cut, include_nibs=True),
+                score_hand_kernel(hand, cut, five_card_flush=True),
+            )
+
+        # advance to the next combination in colexicographical order
+        k = 0
+        while k < 4 and combo[k] + 1 == combo[k + 1]:
+            k += 1
+
+        combo[k] += 1
+        combo[:k] = range(k)
+
+    return rows
+
+
+def build_score_table(path=None, callback=None, chunk=64_974):
+    """
+    Build the score table and write it to path.
+
+    This scores all 2,598,960 five card sets and takes a while.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table
+        - DEFAULT - None - use `default_table_path`
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    chunk:int
+        - The number of 5 card sets to score at a time.
+        - DEFAULT - 64,974 (40 chunks)
+
+    # Return
+
+    The path to the table
+
+    """
+
+    path = Path(path) if path else default_table_path(SCORE_TABLE_NAME)
+
+    data = np.zeros((SCORE_TABLE_ROWS, len(SCORE_COLUMNS)), dtype=np.uint8)
+
+    for start in range(0, FIVE_CARD_SETS, chunk):
+        stop = min(start + chunk, FIVE_CARD_SETS)
+        data[start * 5: stop * 5] = score_table_rows(start, stop)
+
+        if callback:
+            callback(f"Scored {stop:,} of {FIVE_CARD_SETS:,} five card sets")
+
+    write_table(path, SCORE_TABLE_NAME, SCORE_TABLE_VERSION, data)
+
+    return path
+
+
+class ScoreTable:
+    """
+    A memory-mapped table of the score of every 4 card hand and cut
+    card. See `build_score_table`.
+
+    # Parameters
+
+    data:numpy.ndarray
+        - The table data, SCORE_TABLE_ROWS rows by 3 columns.
+
+    """
+
+    def __init__(self, data):
+
+        if data.shape != (SCORE_TABLE_ROWS, len(SCORE_COLUMNS)):
+            raise TableError(f"The score table has the wrong shape {data.shape}!")
+
+        self.data = data
+
+        # A flat view of the memory map. Indexing a memoryview returns a
+        # python int directly which is much faster than indexing numpy
+        # for a single value.
+        self._scores = memoryview(data).cast("B")
+
+    def score(self, hand, cut, include_nibs=False, five_card_flush=False):
+        """
+        Look up the score of the hand. The parameters have the same
+        meaning as `cards.score_hand`.
+        """
+
+        row = score_table_row(hand, cut) * 3
+
+        if five_card_flush:
+            value = self._scores[row + 2]
+
+            if include_nibs:
+                value += self._scores[row + 1] - self._scores[row]
+
+            return value
+
+        return self._scores[row + 1 if include_nibs else row]
+
+
+def load_score_table(path=None, activate=True, verify=True):
+    """
+    Load the score table from disk.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+        - DEFAULT - None - use `default_table_path`
+
+    activate:bool
+        - Use the table in `cards.score_hand`.
+        - DEFAULT - True
+
+    verify:bool
+        - Verify the checksum of the table.
+        - DEFAULT - True
+
+    # Return
+
+    The ScoreTable
+
+    # Raises
+
+    TableError if the table is missing, corrupt or stale.
+
+    """
+
+    path = Path(path) if path else default_table_path(SCORE_TABLE_NAME)
+
+    table = ScoreTable(
+        load_table(
+            path,
+            SCORE_TABLE_NAME,
+            SCORE_TABLE_VERSION,
+            shape=(SCORE_TABLE_ROWS, len(SCORE_COLUMNS)),
+            verify=verify,
+        )
+    )
+
+    if activate:
+        set_score_table(table)
+
+    return table
+
+
+def crib_table_rows(start=0, stop=CRIB_TABLE_ROWS):
+    """
+    Compute the rows of the crib table from start to stop, the total
+    rank and suit points of every crib formed by each 2 card discard
+    (see `analytics.crib_rank_points` and `analytics.crib_suit_points`).
+
+    # Parameters
+
+    start:int
+        - The first row
+        - DEFAULT - 0
+
+    stop:int
+        - The last row (exclusive)
+        - DEFAULT - CRIB_TABLE_ROWS
+
+    # Return
+
+    A numpy array, stop - start rows by 2 columns (int32).
+
+    """
+
+    deck = make_deck()
+
+    data = np.zeros((stop - start, len(CRIB_COLUMNS)), dtype=np.int32)
+
+    for row in range(start, stop):
+        discard = [deck[i] for i in combination_at(row, 2)]
+
+        data[row - start] = (
+            crib_rank_points([], discard),
+            crib_suit_points([], discard),
+        )
+
+    return data
+
+
+def build_crib_table(path=None, callback=None):
+    """
+    Build the crib table and write it to path.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table
+        - DEFAULT - None - use `default_table_path`
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Return
+
+    The path to the table
+
+    """
+
+    path = Path(path) if path else default_table_path(CRIB_TABLE_NAME)
+
+    data = crib_table_rows()
+
+    if callback:
+        callback(f"Scored {CRIB_TABLE_ROWS:,} discards")
+
+    write_table(path, CRIB_TABLE_NAME, CRIB_TABLE_VERSION, data)
+
+    return path
+
+
+# The card removal tables, built the first time they are needed (see
+# _build_removal_tables)
+_removal_tables = None
+
+
+def _build_removal_tables():
+    """
+    Build the card removal tables used by `CribTable` to remove the
+    cards kept in hand from the crib rank points. For the discard ranks
+    d1, d2 and the hand ranks r1, r2, r3:
+
+    - [0][d1, d2, r1] - the rank points of the cribs (and cuts) that
+      use a given card of rank r1
+    - [1][d1, d2, r1, r2] - the rank points of the cribs that use 2
+      given cards of ranks r1 and r2
+    - [2][d1, d2, r1, r2, r3] - the rank points of the crib that uses 3
+      given cards of ranks r1, r2 and r3
+
+    The points only depend on the ranks so the tables are indexed by
+    rank ordinal.
+
+    """
+
+    global _removal_tables
+
+    n = len(RANKS)
+
+    # the multiset index of every ordered 5 rank tuple
+    ranks = np.sort(np.indices((n,) * 5).reshape(5, -1).T, axis=1)
+    binomial = np.array([[comb(i, k) for i in range(n + 4)] for k in range(6)])
+
+    index = sum(binomial[k + 1, ranks[:, k] + k] for k in range(5))
+
+    points = np.frombuffer(rank_score_table(), dtype=np.uint8)
+    points = points[index].reshape((n,) * 5).astype(np.int64)
+
+    # eye[r] - 1 for each card of rank r
+    eye = np.eye(n, dtype=np.int64)
+
+    # the cards of each rank left in the deck, for the discard ranks
+    # and a card of rank r1 removed
+    left = 4 - eye[:, None, None, :] - eye[None, :, None, :] - eye[None, None, :, :]
+
+    # ordered pairs of distinct cards, each pair is counted twice
+    pairs = left[..., :, None] * (left[..., None, :] - eye)
+
+    one = (pairs * points).sum(axis=(3, 4)) // 2
+
+    # the cards of each rank left in the deck, for the discard ranks
+    # and the cards of rank r1 and r2 removed
+    left = left[:, :, :, None, :] - eye[None, None, None, :, :]
+
+    two = (left * points).sum(axis=4)
+
+    # each 3 card set is a pair and a cut card in 3 ways
+    _removal_tables = (3 * one, 3 * two, 3 * points)
+
+
+class CribTable:
+    """
+    A table of the total crib points for every 2 card discard. See
+    `build_crib_table`.
+
+    The cribs that use any of the cards kept in hand are removed from
+    the rank points with inclusion-exclusion. The cribs with one hand
+    card are subtracted, the cribs with 2 hand cards were subtracted
+    twice so they are added back and the cribs with 3 hand cards are
+    subtracted again. The suit points are computed directly (see
+    `analytics.crib_suit_points`).
+
+    # Parameters
+
+    data:numpy.ndarray
+        - The table data, CRIB_TABLE_ROWS rows by 2 columns.
+
+    """
+
+    def __init__(self, data):
+
+        if data.shape != (CRIB_TABLE_ROWS, len(CRIB_COLUMNS)):
+            raise TableError(f"The crib table has the wrong shape {data.shape}!")
+
+        self.data = data
+
+    def average(self, discard):
+        """
+        The expected average of the crib formed by the 2 discarded
+        cards when none of the other cards are known.
+        """
+
+        a, b = sorted(c.index for c in discard)
+
+        return int(self.data[combination_index([a, b])].sum()) / crib_count([], discard)
+
+    def rank_points(self, hand, discard):
+        """
+        The total fifteens, pairs and runs points of the cribs formed by
+        the discard with the hand cards removed from the deck. The same
+        value as `analytics.crib_rank_points`.
+        """
+
+        if _removal_tables is None:
+            _build_removal_tables()
+
+        one, two, three = _removal_tables
+
+        a, b = sorted(c.index for c in discard)
+        d1, d2 = sorted(c.rank_ordinal for c in discard)
+
+        ranks = [c.rank_ordinal for c in hand]
+
+        total = int(self.data[combination_index([a, b]), CRIB_COLUMNS["rank"]])
+        total -= sum(int(one[d1, d2, r]) for r in ranks)
+        total += sum(int(two[d1, d2, r1, r2]) for r1, r2 in combinations(ranks, 2))
+        total -= sum(int(three[d1, d2, r1, r2, r3]) for r1, r2, r3 in combinations(ranks, 3))
+
+        return total
+
+    def expected_average_crib(self, hand, discard):
+        """
+        The expected average of the crib formed by the 2 discarded
+        cards, the same value as `analytics.expected_average_crib`.
+        """
+
+        total = self.rank_points(hand, discard) + crib_suit_points(hand, discard)
+
+        return total / crib_count(hand, discard)
+
+
+def load_crib_table(path=None, activate=True, verify=True):
+    """
+    Load the crib table from disk.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+        - DEFAULT - None - use the table at `default_table_path`, if it
+          has been built, otherwise the table that ships with the
+          package.
+
+    activate:bool
+        - Use the table in `analytics.expected_average_crib`.
+        - DEFAULT - True
+
+    verify:bool
+        - Verify the checksum of the table.
+        - DEFAULT - True
+
+    # Return
+
+    The CribTable
+
+    # Raises
+
+    TableError if the table is missing, corrupt or stale.
+
+    """
+
+    if path is None:
+        path = default_table_path(CRIB_TABLE_NAME)
+
+        if not path.exists():
+            path = CRIB_TABLE_PATH
+
+    table = CribTable(
+        load_table(
+            path,
+            CRIB_TABLE_NAME,
+            CRIB_TABLE_VERSION,
+            shape=(CRIB_TABLE_ROWS, len(CRIB_COLUMNS)),
+            verify=verify,
+        )
+    )
+
+    if activate:
+        set_crib_table(table)
+
+    return table
+
+
+# The column of each split of the canonical hand, indexed by the bit
+# mask of the positions of the 4 cards kept in hand
+_SPLIT_COLUMNS = {
+    sum(1 << i for i in kept): column
+    for column, kept in enumerate(combinations(range(6), 4))
+}
+
+# The number of bits used for each suit in the class key
+_SUIT_BITS = len(RANKS)
+
+
+def canonical_hand_key(hand):
+    """
+    Return the class key of the hand in the discard table and the suit
+    permutation that maps the hand onto the canonical hand of its class.
+
+    The key packs the rank mask of each suit, largest first. Suits with
+    the same mask are interchangeable.
+
+    # Parameters
+
+    hand:list(Card)
+        - The cards of the hand
+
+    # Return
+
+    A tuple (key, suits). `suits[s]` is the canonical suit ordinal of
+    suit ordinal s.
+
+    """
+
+    masks = [0] * len(SUITS)
+
+    for card in hand:
+        masks[card.suit_ordinal] |= 1 << card.rank_ordinal
+
+    order = sorted(range(len(SUITS)), key=masks.__getitem__, reverse=True)
+
+    key = 0
+    for s in order:
+        key = key << _SUIT_BITS | masks[s]
+
+    suits = [0] * len(SUITS)
+    for canonical, s in enumerate(order):
+        suits[s] = canonical
+
+    return key, suits
+
+
+def key_hand(key):
+    """
+    Return the canonical hand of the class key, the cards sorted by
+    index.
+    """
+
+    masks = []
+    for _ in SUITS:
+        masks.insert(0, key & ((1 << _SUIT_BITS) - 1))
+        key >>= _SUIT_BITS
+
+    return [
+        Card.from_index(rank * len(SUITS) + suit)
+        for rank in range(len(RANKS))
+        for suit, mask in enumerate(masks)
+        if mask >> rank & 1
+    ]
+
+
+def discard_table_keys():
+    """
+    Return the class key of every 6 card hand, sorted.
+
+    # Return
+
+    A numpy array of DISCARD_CLASSES keys (int64)
+
+    """
+
+    masks = [[] for _ in range(7)]
+
+    for mask in range(1 << _SUIT_BITS):
+        count = popcount(mask)
+
+        if count <= 6:
+            masks[count].append(mask)
+
+    keys = []
+
+    def add(counts, chosen):
+        # a suit with the same number of cards as the previous suit has
+        # a smaller mask so each class is only added once
+        if len(counts) == 0:
+            key = 0
+            for mask in sorted(chosen, reverse=True):
+                key = key << _SUIT_BITS | mask
+
+            keys.append(key)
+            return
+
+        for mask in masks[counts[0]]:
+            if chosen and popcount(chosen[-1]) == counts[0] and mask > chosen[-1]:
+                break
+
+            add(counts[1:], chosen + [mask])
+
+    # the number of cards in each suit, largest first
+    for a in range(6, -1, -1):
+        for b in range(min(a, 6 - a), -1, -1):
+            for c in range(min(b, 6 - a - b), -1, -1):
+                d = 6 - a - b - c
+
+                if d <= c:
+                    add([a, b, c, d], [])
+
+    return np.array(sorted(keys), dtype=np.int64)
+
+
+def discard_table_rows(keys, crib_table=None):
+    """
+    Compute the rows of the discard table for the class keys.
+
+    # Parameters
+
+    keys:iterable(int)
+        - The class keys
+
+    crib_table:CribTable
+        - The crib table used to compute the crib totals.
+        - DEFAULT - None - use `load_crib_table`
+
+    # Return
+
+    A numpy array, len(keys) rows by 30 columns (int32).
+
+    """
+
+    if crib_table is None:
+        crib_table = load_crib_table(activate=False)
+
+    rows = np.zeros((len(keys), DISCARD_SPLITS * 2), dtype=np.int32)
+
+    for i, key in enumerate(keys):
+        hand = key_hand(int(key))
+
+        # the averages are integer totals over the cut cards
+        rows[i, :DISCARD_SPLITS] = [
+            round(a * HAND_CUTS) for a in expected_averages(hand)
+        ]
+
+        for column, (ch, discard) in enumerate(discard_splits(hand)):
+            rows[i, DISCARD_SPLITS + column] = crib_table.rank_points(
+                ch, discard
+            ) + crib_suit_points(ch, discard)
+
+    return rows
+
+
+def build_discard_table(path=None, callback=None, chunk=10_000):
+    """
+    Build the discard table and write it, and the class keys, to path.
+
+    This analyses all 962,988 six card hand classes and takes a while.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table. The keys are written next to
+          it (see `discard_keys_path`).
+        - DEFAULT - None - use `default_table_path`
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    chunk:int
+        - The number of classes to analyse at a time.
+        - DEFAULT - 10,000
+
+    # Return
+
+    The path to the table
+
+    """
+
+    path = Path(path) if path else default_table_path(DISCARD_TABLE_NAME)
+
+    keys = discard_table_keys()
+    crib_table = load_crib_table(activate=False)
+
+    data = np.zeros((len(keys), DISCARD_SPLITS * 2), dtype=np.int32)
+
+    for start in range(0, len(keys), chunk):
+        stop = min(start + chunk, len(keys))
+        data[start:stop] = discard_table_rows(keys[start:stop], crib_table)
+
+        if callback:
+            callback(f"Analysed {stop:,} of {len(keys):,} six card hands")
+
+    write_table(discard_keys_path(path), DISCARD_KEYS_NAME, DISCARD_TABLE_VERSION, keys)
+    write_table(path, DISCARD_TABLE_NAME, DISCARD_TABLE_VERSION, data)
+
+    return path
+
+
+def discard_keys_path(path):
+    """
+    Return the path of the keys table that goes with the discard table
+    at path.
+    """
+
+    path = Path(path)
+
+    return path.with_name(f"{path.stem}-keys{path.suffix}")
+
+
+class DiscardTable:
+    """
+    A memory-mapped table of the `analytics.discard_consider_all_combos`
+    results for every 6 card hand class. See `build_discard_table`.
+
+    # Parameters
+
+    data:numpy.ndarray
+        - The table data, one row of 30 totals per class.
+
+    keys:numpy.ndarray
+        - The sorted class keys, one per row.
+
+    """
+
+    def __init__(self, data, keys):
+
+        if data.shape != (len(keys), DISCARD_SPLITS * 2):
+            raise TableError(f"The discard table has the wrong shape {data.shape}!")
+
+        self.data = data
+        self.keys = keys.reshape(-1)
+
+    def averages(self, hand):
+        """
+        Look up the expected averages of the hand and the crib for each
+        way of splitting the 6 cards, in the order of
+        `analytics.discard_splits`.
+
+        # Parameters
+
+        hand:list(Card)
+            - The 6 cards
+
+        # Return
+
+        A tuple of 2 lists, the 15 hand averages and the 15 crib
+        averages.
+
+        """
+
+        key, suits = canonical_hand_key(hand)
+
+        row = int(np.searchsorted(self.keys, key))
+
+        if row == len(self.keys) or self.keys[row] != key:
+            raise TableError(f"The discard table has no entry for the hand {hand}!")
+
+        totals = self.data[row].tolist()
+
+        # the position of each card in the canonical hand
+        canonical = [c.rank_ordinal * len(SUITS) + suits[c.suit_ordinal] for c in hand]
+        position = {index: i for i, index in enumerate(sorted(canonical))}
+
+        hand_averages = []
+        crib_averages = []
+
+        for kept in combinations(canonical, 4):
+            column = _SPLIT_COLUMNS[sum(1 << position[index] for index in kept)]
+
+            hand_averages.append(totals[column] / HAND_CUTS)
+            crib_averages.append(totals[DISCARD_SPLITS + column] / CRIB_CUTS)
+
+        return hand_averages, crib_averages
+
+    def lookup(self, hand):
+        """
+        Look up the results of `analytics.discard_consider_all_combos`
+        for the 6 card hand.
+        """
+
+        return discard_results(discard_splits(hand), *self.averages(hand))
+
+
+def load_discard_table(path=None, activate=True, verify=True):
+    """
+    Load the discard table, and its keys, from disk.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+        - DEFAULT - None - use `default_table_path`
+
+    activate:bool
+        - Use the table in `analytics.discard_consider_all_combos`.
+        - DEFAULT - True
+
+    verify:bool
+        - Verify the checksum of the table.
+        - DEFAULT - True
+
+    # Return
+
+    The DiscardTable
+
+    # Raises
+
+    TableError if the table is missing, corrupt or stale.
+
+    """
+
+    path = Path(path) if path else default_table_path(DISCARD_TABLE_NAME)
+
+    keys = load_table(
+        discard_keys_path(path),
+        DISCARD_KEYS_NAME,
+        DISCARD_TABLE_VERSION,
+        verify=verify,
+    )
+
+    table = DiscardTable(
+        load_table(
+            path,
+            DISCARD_TABLE_NAME,
+            DISCARD_TABLE_VERSION,
+            shape=(len(keys), DISCARD_SPLITS * 2),
+            verify=verify,
+        ),
+        keys,
+    )
+
+    if activate:
+        set_discard_table(table)
+
+    return table
+
+
+def _rank_deltas(ranks):
+    """
+    Return the fifteens, pairs and runs points of the 4 ranks and the
+    points a cut card of each rank adds to them. A cut card of a rank
+    that is held 4 times isn't possible and adds 0.
+    """
+
+    histogram = [0] * len(RANKS)
+    for rank in ranks:
+        histogram[rank] += 1
+
+    def points():
+        return (
+            2 * count_fifteens(histogram)
+            + 2 * count_pairs(histogram)
+            + count_run_points(histogram)
+        )
+
+    base = points()
+
+    deltas = []
+    for rank in range(len(RANKS)):
+
+        if histogram[rank] == 4:
+            deltas.append(0)
+            continue
+
+        histogram[rank] += 1
+        deltas.append(points() - base)
+        histogram[rank] -= 1
+
+    return base, deltas
+
+
+def hand_table_rows(start=0, stop=HAND_TABLE_ROWS):
+    """
+    Compute the rows of the hand table from start to stop.
+
+    The fifteens, pairs and runs only depend on the ranks so they are
+    computed once for each of the 1,820 multisets of 4 ranks. The flush
+    and nobs columns are computed for all the hands at once.
+
+    # Parameters
+
+    start:int
+        - The first row
+        - DEFAULT - 0
+
+    stop:int
+        - The last row (exclusive)
+        - DEFAULT - HAND_TABLE_ROWS
+
+    # Return
+
+    A numpy array, stop - start rows by 17 columns (uint8).
+
+    """
+
+    # every 4 card hand, in colexicographical order
+    hands = np.array(list(combinations(range(52), 4)), dtype=np.int64)
+    rows = sum(
+        np.array(_BINOMIAL[k], dtype=np.int64)[hands[:, k - 1]] for k in range(1, 5)
+    )
+    hands = hands[np.argsort(rows)][start:stop]
+
+    ranks = hands // len(SUITS)
+    suits = hands % len(SUITS)
+
+    data = np.zeros((len(hands), HAND_TABLE_COLUMNS), dtype=np.uint8)
+
+    # the card indices are sorted so the ranks are too
+    keys = ranks @ np.array([len(RANKS) ** k for k in range(3, -1, -1)])
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    points = np.zeros((len(first), 1 + len(RANKS)), dtype=np.uint8)
+
+    for i, multiset in enumerate(ranks[first].tolist()):
+        base, deltas = _rank_deltas(multiset)
+        points[i] = [base] + deltas
+
+    data[:, : HAND_COLUMNS["delta"] + len(RANKS)] = points[inverse]
+
+    counts = np.stack([(suits == s).sum(axis=1) for s in range(len(SUITS))], axis=1)
+    bits = 1 << np.arange(len(SUITS))
+
+    four = counts.max(axis=1) == 4
+
+    # see `cards.cut_suit_scores`, 3 cards of a suit and the cut card are
+    # a 4 card flush
+    flush = (counts >= 3) @ bits
+    data[:, HAND_COLUMNS["base"]] += np.uint8(4) * four
+    data[:, HAND_COLUMNS["flush"]] = flush
+    data[:, HAND_COLUMNS["flush_points"]] = np.where(four, 1, np.where(flush, 4, 0))
+    data[:, HAND_COLUMNS["nobs"]] = (
+        (ranks == RANKS.index("J")) * bits[suits]
+    ).sum(axis=1)
+
+    return data
+
+
+def build_hand_table(path=None, callback=None):
+    """
+    Build the hand table and write it to path.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table
+        - DEFAULT - None - use `default_table_path`
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    # Return
+
+    The path to the table
+
+    """
+
+    path = Path(path) if path else default_table_path(HAND_TABLE_NAME)
+
+    data = hand_table_rows()
+
+    if callback:
+        callback(f"Scored {HAND_TABLE_ROWS:,} four card hands")
+
+    write_table(path, HAND_TABLE_NAME, HAND_TABLE_VERSION, data)
+
+    return path
+
+
+class HandTable:
+    """
+    A memory-mapped table of the base score, cut rank deltas and suit
+    flags of every 4 card hand. See `build_hand_table`.
+
+    # Parameters
+
+    data:numpy.ndarray
+        - The table data, HAND_TABLE_ROWS rows by 17 columns.
+
+    """
+
+    def __init__(self, data):
+
+        if data.shape != (HAND_TABLE_ROWS, HAND_TABLE_COLUMNS):
+            raise TableError(f"The hand table has the wrong shape {data.shape}!")
+
+        self.data = data
+        self._rows = memoryview(data).cast("B")
+
+    def row(self, hand):
+        """
+        Return the base, the 13 deltas, the flush mask, the flush points
+        and the nobs mask of the 4 card hand.
+        """
+
+        i = combination_index(sorted(c.index for c in hand)) * HAND_TABLE_COLUMNS
+
+        return self._rows[i : i + HAND_TABLE_COLUMNS].tolist()
+
+    def expected_average(self, hand, discard=None):
+        """
+        Look up the expected average of the hand. The parameters have the
+        same meaning as `analytics.expected_average`.
+        """
+
+        base, *deltas, flush, flush_points, nobs = self.row(hand)
+
+        rank_count = [4] * len(RANKS)
+        suit_count = [13] * len(SUITS)
+
+        for card in list(hand) + list(discard or []):
+            rank_count[card.rank_ordinal] -= 1
+            suit_count[card.suit_ordinal] -= 1
+
+        cuts = sum(rank_count)
+
+        total = base * cuts + sum(map(mul, rank_count, deltas))
+
+        for suit, count in enumerate(suit_count):
+            if flush >> suit & 1:
+                total += flush_points * count
+
+            if nobs >> suit & 1:
+                total += count
+
+        return total / cuts
+
+
+def load_hand_table(path=None, activate=True, verify=True):
+    """
+    Load the hand table from disk.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+        - DEFAULT - None - use `default_table_path`
+
+    activate:bool
+        - Use the table in `analytics.expected_average`.
+        - DEFAULT - True
+
+    verify:bool
+        - Verify the checksum of the table.
+        - DEFAULT - True
+
+    # Return
+
+    The HandTable
+
+    # Raises
+
+    TableError if the table is missing, corrupt or stale.
+
+    """
+
+    path = Path(path) if path else default_table_path(HAND_TABLE_NAME)
+
+    table = HandTable(
+        load_table(
+            path,
+            HAND_TABLE_NAME,
+            HAND_TABLE_VERSION,
+            shape=(HAND_TABLE_ROWS, HAND_TABLE_COLUMNS),
+            verify=verify,
+        )
+    )
+
+    if activate:
+        set_hand_table(table)
+
+    return table
+
+
+def pegging_row(hand):
+    """
+    Return the pegging table row of the 4 card hand.
+
+    Adding the position to each of the sorted ranks converts the
+    multiset into a set of distinct numbers from 0 to 15, the row is the
+    position of that set in colexicographical order (see
+    `cards.rank_multiset_index`).
+    """
+
+    ranks = sorted(c.rank_ordinal for c in hand)
+
+    return combination_index([r + i for i, r in enumerate(ranks)])
+
+
+def _pegging_hand(row):
+    """
+    Return a 4 card hand with the ranks of the pegging table row, the
+    inverse of `pegging_row`.
+    """
+
+    ranks = [n - i for i, n in enumerate(combination_at(row, 4))]
+
+    # the repeated ranks take the next suit
+    return [Card.from_index(r * len(SUITS) + ranks[:i].count(r)) for i, r in enumerate(ranks)]
+
+
+def pegging_table_rows(start=0, stop=PEGGING_TABLE_ROWS, samples=PEGGING_SAMPLES):
+    """
+    Play out the deals of the pegging table rows from start to stop and
+    return the expected differentials (see `build_pegging_table`).
+
+    The opponent hands of each row are drawn from a random generator
+    seeded with the row so a row doesn't depend on how the table is
+    split into shards.
+
+    # Return
+
+    A float32 array, one row for each multiset and the PEGGING_COLUMNS.
+
+    """
+
+    deck = make_deck()
+
+    data = np.zeros((stop - start, len(PEGGING_COLUMNS)), dtype=np.float32)
+
+    for row in range(start, stop):
+        hand = _pegging_hand(row)
+        rest = [c for c in deck if c not in hand]
+
+        rng = np.random.default_rng(row)
+
+        pone = 0
+        dealer = 0
+
+        for _ in range(samples):
+            other = [rest[i] for i in rng.choice(len(rest), 4, replace=False)]
+
+            mine, theirs = play_hands(hand, other, greedy_policy)
+            pone += mine - theirs
+
+            theirs, mine = play_hands(other, hand, greedy_policy)
+            dealer += mine - theirs
+
+        data[row - start] = (pone / samples, dealer / samples)
+
+    return data
+
+
+def build_pegging_table(path=None, callback=None, samples=PEGGING_SAMPLES):
+    """
+    Build the pegging table and write it to path.
+
+    # Parameters
+
+    path:Path
+        - The location to write the table
+        - DEFAULT - None - use `default_table_path`
+
+    callback:func
+        - A message callback function used to communicate progress
+          back to the caller.
+        - DEFAULT - None
+
+    samples:int
+        - The number of deals averaged for each row
+        - DEFAULT - PEGGING_SAMPLES
+
+    # Return
+
+    The path to the table
+
+    """
+
+    path = Path(path) if path else default_table_path(PEGGING_TABLE_NAME)
+
+    data = pegging_table_rows(samples=samples)
+
+    if callback:
+        callback(f"Played {PEGGING_TABLE_ROWS * samples:,} deals in each seat")
+
+    write_table(path, PEGGING_TABLE_NAME, PEGGING_TABLE_VERSION, data)
+
+    return path
+
+
+class PeggingTable:
+    """
+    A memory-mapped table of the expected pegging differentials of every
+    multiset of 4 ranks. See `build_pegging_table`.
+
+    # Parameters
+
+    data:numpy.ndarray
+        - The table data, PEGGING_TABLE_ROWS rows by 2 columns.
+
+    """
+
+    def __init__(self, data):
+
+        if data.shape != (PEGGING_TABLE_ROWS, len(PEGGING_COLUMNS)):
+            raise TableError(f"The pegging table has the wrong shape {data.shape}!")
+
+        self.data = data
+        self._rows = [tuple(row) for row in data.tolist()]
+
+    def expected_pegging(self, hand):
+        """
+        Return the expected pegging differentials (pone, dealer) of the 4
+        card hand.
+        """
+
+        return self._rows[pegging_row(hand)]
+
+
+def load_pegging_table(path=None, activate=True, verify=True):
+    """
+    Load the pegging table from disk.
+
+    # Parameters
+
+    path:Path
+        - The location of the table
+        - DEFAULT - None - use the table at `default_table_path`, if it
+          has been built, otherwise the table that ships with the
+          package.
+
+    activate:bool
+        - Add the expected pegging to the results of
+          `analytics.discard_consider_all_combos`.
+        - DEFAULT - True
+
+    verify:bool
+        - Verify the checksum of the table.
+        - DEFAULT - True
+
+    # Return
+
+    The PeggingTable
+
+    # Raises
+
+    TableError if the table is missing, corrupt or stale.
+
+    """
+
+    if path is None:
+        path = default_table_path(PEGGING_TABLE_NAME)
+
+        if not path.exists():
+            path = PEGGING_TABLE_PATH
+
+    table = PeggingTable(
+        load_table(
+            path,
+            PEGGING_TABLE_NAME,
+            PEGGING_TABLE_VERSION,
+            shape=(PEGGING_TABLE_ROWS, len(PEGGING_COLUMNS)),
+            verify=verify,
+        )
+    )
+
+    if activate:
+        set_pegging_table(table)
+
+    return table
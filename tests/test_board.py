@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+Test module for the win probabilities.
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import sys
+
+from functools import lru_cache
+
+# ------------
+# 3rd Party - From pip
+
+import numpy as np
+import pytest
+
+# ------------
+# Custom Modules
+
+from cribbage.cards import Card
+
+from cribbage.analytics import (
+    ScoreDistribution,
+    discard_consider_all_combos,
+)
+
+from cribbage.board import (
+    GAME_POINTS,
+    BOARD_TABLE_ROWS,
+    BOARD_TABLE_COLUMNS,
+    DealModel,
+    win_table,
+    win_probability,
+    build_board_table,
+    load_board_table,
+    discard_win_probabilities,
+)
+
+# -------------
+
+
+def test_win_table():
+
+    # every step scores so a deal always moves the game forward
+    model = DealModel(
+        heels=np.array([0.75, 0, 0.25]),
+        pone_pegging=np.array([0, 0.5, 0.5]),
+        dealer_pegging=np.array([0, 0.25, 0.75]),
+        pone_hand=np.array([0, 0, 0.5, 0, 0.5]),
+        dealer_hand=np.array([0, 0.5, 0.5]),
+        crib=np.array([0, 0.5, 0.5]),
+    )
+
+    sys.setrecursionlimit(10_000)
+
+    def steps(score, p):
+        for points, w in enumerate(p):
+            if w:
+                yield score + points, w
+
+    @lru_cache(maxsize=None)
+    def dealer_wins(a, b):
+        total = 0
+
+        # his heels are pegged first
+        for a0, w0 in steps(a, model.heels):
+            if a0 >= GAME_POINTS:
+                total += w0
+                continue
+
+            for b1, w1 in steps(b, model.pone_pegging):
+                if b1 >= GAME_POINTS:
+                    continue
+
+                for a1, w2 in steps(a0, model.dealer_pegging):
+                    w = w0 * w1 * w2
+
+                    if a1 >= GAME_POINTS:
+                        total += w
+                        continue
+
+                    for b2, w3 in steps(b1, model.pone_hand):
+                        if b2 >= GAME_POINTS:
+                            continue
+
+                        for a2, w4 in steps(a1, np.convolve(model.dealer_hand, model.crib)):
+                            if a2 >= GAME_POINTS:
+                                total += w * w3 * w4
+
+                            else:
+                                total += w * w3 * w4 * (1 - dealer_wins(b2, a2))
+
+        return total
+
+    table = win_table(model)
+
+    for a, b in [(0, 0), (60, 80), (100, 90), (119, 118), (120, 120)]:
+        assert pytest.approx(table[a, b], abs=1e-12) == dealer_wins(a, b)
+
+    # the pone always pegs at least 1 point, unless the dealer cuts a
+    # jack at 119
+    assert np.all(table[:119, GAME_POINTS - 1] == 0)
+    assert pytest.approx(table[119, GAME_POINTS - 1]) == 0.25
+
+
+def test_board_table(tmp_path):
+
+    path = build_board_table(tmp_path / "board.tbl", samples=10, workers=1)
+
+    table = load_board_table(path, activate=False)
+
+    assert table.data.shape == (BOARD_TABLE_ROWS, BOARD_TABLE_COLUMNS)
+    assert np.all((table.win >= 0) & (table.win <= 1))
+
+    for p in table.model:
+        assert pytest.approx(p.sum()) == 1
+
+
+def test_win_probability():
+
+    # the table that ships with the package
+    assert win_probability(0, 0, True) > 0.5
+
+    for me, opponent in [(0, 0), (45, 80), (112, 95), (120, 120)]:
+        assert win_probability(me, opponent, True) == pytest.approx(
+            1 - win_probability(opponent, me, False)
+        )
+
+    # the model pegs points for both players
+    model = load_board_table(activate=False).model
+
+    for p in (model.pone_pegging, model.dealer_pegging):
+        assert p[0] < 0.5
+        assert np.arange(len(p)) @ p > 1
+
+    # being further ahead is better
+    assert win_probability(100, 90, False) > win_probability(90, 90, False)
+
+    with pytest.raises(ValueError):
+        win_probability(121, 0, True)
+
+
+def test_split_win_probability():
+
+    table = load_board_table(activate=False)
+
+    def distribution(p):
+        return ScoreDistribution({s: w for s, w in enumerate(p)})
+
+    crib = distribution(table.model.crib)
+
+    # a deal drawn from the model gives the table values
+    for me, opponent in [(0, 0), (70, 90), (115, 100)]:
+        dealer = table.split_win_probability(
+            distribution(table.model.dealer_hand), crib, me, opponent, True
+        )
+        assert pytest.approx(dealer, abs=1e-9) == table.win_probability(
+            me, opponent, True
+        )
+
+        pone = table.split_win_probability(
+            distribution(table.model.pone_hand), crib, me, opponent, False
+        )
+        assert pytest.approx(pone, abs=1e-9) == table.win_probability(
+            me, opponent, False
+        )
+
+
+def test_discard_win_probabilities():
+
+    hand = [Card(*c) for c in ("5H", "5D", "JC", "QS", "6C", "9H")]
+
+    expected = discard_consider_all_combos(hand)
+    results = discard_win_probabilities(hand, 112, 95)
+
+    for result, other in zip(results, expected):
+        assert result["delta_pone"] == other["delta_pone"]
+        assert 0 <= result["win_pone"] <= 1
+        assert 0 <= result["win_dealer"] <= 1
+
+    best = max(results, key=lambda r: r["win_pone"])
+
+    # keeping the 10 point hand wins as the pone counts first
+    assert sorted(best["hand"]) == sorted(hand[:4])
+    assert best["win_pone"] == pytest.approx(1)
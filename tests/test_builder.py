@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+Test module for the sharded table builder.
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import os
+import json
+import socket
+
+# ------------
+# 3rd Party - From pip
+
+import numpy as np
+import pytest
+
+# ------------
+# Custom Modules
+
+from cribbage.tables import (
+    TableError,
+    CRIB_TABLE_NAME,
+    SCORE_TABLE_NAME,
+    crib_table_rows,
+    load_table,
+)
+
+from cribbage.builder import (
+    build,
+    create_manifest,
+    read_manifest,
+    run_shards,
+    missing_shards,
+    merge_shards,
+    shard_path,
+)
+
+# -------------
+
+
+def test_build_resume(tmp_path):
+
+    work = tmp_path / "work"
+    path = tmp_path / "crib.tbl"
+
+    create_manifest(work, CRIB_TABLE_NAME, shard_size=200)
+
+    # a build that stopped after 2 shards
+    assert run_shards(work, limit=2) == 2
+    assert missing_shards(work) == [2, 3, 4, 5, 6]
+
+    # another worker, that doesn't merge
+    assert build(CRIB_TABLE_NAME, path, work, merge=False) is None
+    assert missing_shards(work) == []
+    assert not path.exists()
+
+    assert build(CRIB_TABLE_NAME, path, work) == path
+
+    table = load_table(path, CRIB_TABLE_NAME, 1)
+    assert np.array_equal(table, crib_table_rows())
+
+    # the work folder is removed once the table is merged
+    assert not work.exists()
+
+
+def test_manifest_mismatch(tmp_path):
+
+    work = tmp_path / "work"
+
+    manifest = create_manifest(work, CRIB_TABLE_NAME, shard_size=200)
+    assert read_manifest(work) == manifest
+    assert manifest["shards"] == 7
+
+    # resuming keeps the manifest
+    assert create_manifest(work, CRIB_TABLE_NAME) == manifest
+
+    with pytest.raises(TableError):
+        create_manifest(work, SCORE_TABLE_NAME)
+
+    with pytest.raises(TableError):
+        create_manifest(work, CRIB_TABLE_NAME, shard_size=100)
+
+
+def test_shard_locks(tmp_path):
+
+    work = tmp_path / "work"
+    create_manifest(work, CRIB_TABLE_NAME, shard_size=700)
+
+    host = socket.gethostname()
+
+    # shard 0 is locked by a running process (this one), shard 1 by a
+    # process that has stopped
+    locks = [
+        {"host": host, "pid": os.getpid(), "time": 0},
+        {"host": host, "pid": 2**22 + 1, "time": 0},
+    ]
+
+    for shard, owner in enumerate(locks):
+        (work / f"shard-{shard:05d}.lock").write_text(json.dumps(owner))
+
+    assert run_shards(work) == 1
+    assert missing_shards(work) == [0]
+
+    # the lock is older than the timeout
+    assert run_shards(work, lock_timeout=60) == 1
+    assert missing_shards(work) == []
+
+
+def test_corrupt_shard(tmp_path):
+
+    work = tmp_path / "work"
+    create_manifest(work, CRIB_TABLE_NAME, shard_size=700)
+
+    run_shards(work)
+
+    # corrupt the last byte of the first shard
+    with shard_path(work, 0).open("r+b") as fo:
+        fo.seek(-1, 2)
+        fo.write(b"\xff")
+
+    with pytest.raises(TableError):
+        merge_shards(work, tmp_path / "crib.tbl")
+
+    # the corrupt shard is built again
+    assert missing_shards(work) == [0]
+    assert run_shards(work) == 1
+
+    path = merge_shards(work, tmp_path / "crib.tbl")
+    assert np.array_equal(load_table(path, CRIB_TABLE_NAME, 1), crib_table_rows())
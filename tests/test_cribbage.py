@@ -18,10 +18,17 @@ Test module for testing them the cribbage methods.
 # ------------
 # System Modules - Included with Python
 
+import pickle
+import random
+
+from collections import Counter
+
+from itertools import combinations, combinations_with_replacement
 
 # ------------
 # 3rd Party - From pip
 
+import numpy as np
 import pytest
 
 # ------------
@@ -29,6 +36,8 @@ import pytest
 
 from cribbage.cards import (
     Card,
+    CardSet,
+    FULL_DECK,
     make_deck,
     display_hand,
     hand_combinations,
@@ -37,14 +46,44 @@ from cribbage.cards import (
     find_runs,
     find_flushes,
     find_combinations,
+    find_combinations_mask,
     score,
+    score_hand,
+    score_hand_mask,
+    score_hand_kernel,
+    score_counts,
+    score_hands_batch,
+    score_vector,
+    cut_rank_scores,
+    keep_rank_scores,
+    score_histogram,
+    rank_histogram,
+    count_fifteens,
+    count_pairs,
+    count_run_points,
+    rank_multiset_index,
+    rank_score_table,
+    rank_count_table,
+    set_rank_tables,
+    canonicalize_hand,
+    canonicalize_mask,
+    PATTERN_FLUSH_CUT,
+    PATTERN_NOBS,
 )
 
 from cribbage.analytics import (
     # maximum_four_card_score,
     expected_average,
+    expected_averages,
     # discard_max_hand_value,
     expected_average_crib,
+    expected_average_crib_enumerated,
+    expected_average_key,
+    crib_key,
+    discard_consider_all_combos,
+    discard_splits,
+    ScoreDistribution,
+    crib_distribution,
 )
 
 # -------------
@@ -237,6 +276,47 @@ def test_card_exception(data):
         c = Card(*data)
 
 
+# -------------
+# Test Card - flyweights
+
+data = [
+    ("AD", 0),
+    ("AH", 1),
+    ("5d", 16),
+    ("TC", 38),
+    ("KS", 51),
+]
+
+
+@pytest.mark.parametrize("data", data)
+def test_card_from_index(data):
+
+    left, right = data
+
+    c = Card(*left)
+
+    assert c.index == right
+    assert Card.from_index(right) is c
+
+
+def test_card_flyweight():
+
+    deck = make_deck()
+
+    assert all(Card.from_index(i) is c for i, c in enumerate(deck))
+    assert all(Card(c.rank.lower(), c.suit) is c for c in deck)
+
+    # pickling must return the shared instance
+    c = Card(*"JS")
+    assert pickle.loads(pickle.dumps(c)) is c
+
+    with pytest.raises(AttributeError):
+        c.rank = "Q"
+
+    with pytest.raises(ValueError):
+        Card.from_index(52)
+
+
 # -------------
 # Test make_deck
 
@@ -267,6 +347,38 @@ def test_make_deck_delete():
     assert c not in deck
 
 
+# -------------
+# Test CardSet
+
+
+def test_cardset_operations():
+
+    hand = CardSet([Card(*c) for c in ("5D", "JS", "AH")])
+
+    assert len(hand) == 3
+    assert len(FULL_DECK) == 52
+    assert Card(*"5D") in hand
+    assert Card(*"5S") not in hand
+
+    deck = FULL_DECK - hand
+    assert len(deck) == 49
+    assert Card(*"JS") not in deck
+    assert (deck | hand) == FULL_DECK
+    assert not (deck & hand)
+    assert (deck ^ FULL_DECK) == hand
+
+    # iteration is in index (make_deck) order
+    assert list(hand) == [Card(*"AH"), Card(*"5D"), Card(*"JS")]
+    assert list(FULL_DECK) == make_deck()
+    assert list(hand.indices()) == [1, 16, 43]
+
+    assert CardSet.from_mask(hand.mask) == hand
+    assert pickle.loads(pickle.dumps(hand)) == hand
+
+    with pytest.raises(ValueError):
+        CardSet.from_mask(1 << 52)
+
+
 # -------------
 # Test display_hand
 
@@ -704,6 +816,364 @@ def test_score(data):
 
     assert results == right
 
+
+@pytest.mark.parametrize("data", data)
+def test_score_mask(data):
+
+    left, right = data
+
+    hand_left, cut_left = left
+
+    cards = CardSet([Card(*c) for c in hand_left])
+    cut = Card(*cut_left)
+
+    assert score(find_combinations_mask(cards, cut)) == right
+    assert score_hand_mask(cards, cut) == score_hand(list(cards), cut)
+    assert score_hand_mask(cards.mask, cut, include_nibs=True) == score_hand(list(cards), cut, include_nibs=True)
+
+
+# -------------
+# Test score_hand - dealer and crib
+
+left = (("3C", "TC", "AC", "8C"), ("KS"))
+right = (4, 4, 0)
+
+data = [(left, right)]
+
+left = (("3C", "TC", "AC", "8C"), ("KC"))
+right = (5, 5, 5)
+
+data.append((left, right))
+
+left = (("3C", "TC", "KS", "8C"), ("JS"))
+right = (0, 2, 0)
+
+data.append((left, right))
+
+
+@pytest.mark.parametrize("data", data)
+def test_score_hand_dealer_crib(data):
+
+    left, right = data
+
+    hand_left, cut_left = left
+
+    cards = [Card(*c) for c in hand_left]
+    cut = Card(*cut_left)
+
+    pone, dealer, crib = right
+
+    assert score_hand(cards, cut) == pone
+    assert score_hand(cards, cut, include_nibs=True) == dealer
+    assert score_hand(cards, cut, five_card_flush=True) == crib
+
+
+# -------------
+# Test rank histogram scoring
+
+left = ("4C", "5C", "6D", "5S", "QS")
+right = (4, 1, 6)
+
+data = [(left, right)]
+
+left = ("5C", "5D", "5H", "JS", "5S")
+right = (8, 6, 0)
+
+data.append((left, right))
+
+left = ("3C", "3D", "4H", "4S", "5S")
+right = (2, 2, 12)
+
+data.append((left, right))
+
+# NOTE: Like find_runs, the 9 and T are not consecutive (sort values 9
+# and 11)
+left = ("8C", "9D", "TH", "2S", "KS")
+right = (0, 0, 0)
+
+data.append((left, right))
+
+left = ("AC", "2D", "3H", "4S", "5S")
+right = (1, 0, 5)
+
+data.append((left, right))
+
+
+@pytest.mark.parametrize("data", data)
+def test_count_histogram(data):
+
+    left, right = data
+
+    cards = [Card(*c) for c in left]
+    histogram = rank_histogram(cards)
+
+    fifteens, pairs, runs = right
+
+    assert count_fifteens(histogram) == fifteens == len(list(find_fifteens(cards)))
+    assert count_pairs(histogram) == pairs == len(list(find_pairs(cards)))
+    assert count_run_points(histogram) == runs == sum(len(r) for r in find_runs(cards))
+
+
+# Cards with flushes, nobs, nibs, fifteens, pairs and runs
+cards = [Card(*c) for c in ("5H", "5D", "JH", "JD", "TH", "4H", "6H", "AH", "QS")]
+
+data = [(list(c[:4]), c[4]) for c in combinations(cards, 5)]
+data.extend((list(c), None) for c in combinations(cards, 4))
+
+
+@pytest.mark.parametrize("data", data)
+def test_score_histogram(data):
+
+    hand, cut = data
+
+    assert score_histogram(hand, cut) == score(find_combinations(hand, cut))
+
+
+def test_rank_score_table():
+
+    deck = make_deck()
+    table = rank_score_table()
+
+    # every multiset of 5 ranks, 5 of a kind is impossible
+    for ranks in combinations_with_replacement(range(13), 5):
+
+        if ranks[0] == ranks[4]:
+            continue
+
+        cards = [deck[r * 4 + ranks[:i].count(r)] for i, r in enumerate(ranks)]
+
+        expected = (
+            len(list(find_fifteens(cards))) * 2
+            + len(list(find_pairs(cards))) * 2
+            + sum(len(r) for r in find_runs(cards))
+        )
+
+        assert table[rank_multiset_index(ranks)] == expected
+
+
+def test_set_rank_tables():
+
+    scores = rank_score_table()
+    counts = rank_count_table()
+
+    hands = [(list(h[:4]), h[4]) for h in combinations(cards, 5)]
+    expected = [score_counts(hand, cut) for hand, cut in hands]
+
+    # read-only views, like the shared memory buffers of the workers
+    buffer = memoryview(bytes(scores) + counts.tobytes())
+    n = len(scores)
+
+    try:
+        set_rank_tables(buffer[:n], buffer[n:].cast("H"))
+
+        assert [score_counts(hand, cut) for hand, cut in hands] == expected
+
+        with pytest.raises(ValueError):
+            set_rank_tables(buffer[: n - 1], None)
+
+    finally:
+        set_rank_tables(None, None)
+
+    assert rank_score_table() == scores
+
+
+# -------------
+# Test score_hand_kernel
+
+
+def reference_score(hand, cut, include_nibs, five_card_flush):
+    """
+    Score the hand directly from the card combinations.
+    """
+
+    values = score(find_combinations(hand, cut))
+
+    flush = values["flush"]
+    if five_card_flush and flush != 5:
+        flush = 0
+
+    nibs = values["nibs"] if include_nibs else 0
+
+    return values["fifteen"] + values["pair"] + values["run"] + values["nobs"] + flush + nibs
+
+
+data = [(list(c[:4]), c[4]) for c in combinations(cards, 5)]
+
+
+@pytest.mark.parametrize("data", data)
+def test_score_hand_kernel(data):
+
+    hand, cut = data
+
+    for include_nibs in (False, True):
+        for five_card_flush in (False, True):
+
+            expected = reference_score(hand, cut, include_nibs, five_card_flush)
+
+            assert score_hand_kernel(hand, cut, include_nibs, five_card_flush) == expected
+            assert score_hand(hand, cut, include_nibs, five_card_flush) == expected
+
+
+data = [(list(c[:4]), c[4]) for c in combinations(cards, 5)]
+data.extend((list(c), None) for c in combinations(cards, 4))
+
+
+@pytest.mark.parametrize("data", data)
+def test_score_counts(data):
+
+    hand, cut = data
+
+    combos = find_combinations(hand, cut)
+    counts = score_counts(hand, cut)
+
+    assert counts.fifteen == len(combos["fifteen"])
+    assert counts.pair == len(combos["pair"])
+    assert counts.run == sum(len(r) for r in combos["run"])
+    assert counts.flush == len(combos["flush"])
+    assert counts.nobs == len(combos["nobs"])
+    assert counts.nibs == len(combos["nibs"])
+
+    assert counts.points() == score(combos)
+
+    if cut:
+        for include_nibs in (False, True):
+            for five_card_flush in (False, True):
+                assert counts.total(include_nibs, five_card_flush) == reference_score(
+                    hand, cut, include_nibs, five_card_flush
+                )
+
+
+def test_canonicalize_hand():
+
+    hand = [Card(*c) for c in ("3C", "TC", "JS", "8C")]
+
+    index, pattern = canonicalize_hand(hand, Card(*"6C"))
+
+    assert pattern == PATTERN_FLUSH_CUT
+
+    # the same ranks in other suits
+    other, pattern = canonicalize_hand(hand, Card(*"6S"))
+
+    assert other == index
+    assert pattern == PATTERN_NOBS
+
+
+def test_canonicalize_mask():
+
+    rng = random.Random(7)
+    deck = make_deck()
+
+    for _ in range(2000):
+        *hand, cut = rng.sample(deck, 5)
+
+        assert canonicalize_mask(CardSet(hand), cut) == canonicalize_hand(hand, cut)
+
+    with pytest.raises(ValueError):
+        canonicalize_mask(CardSet(deck[:3]), deck[3])
+
+
+# -------------
+# Test score_hands_batch
+
+# Every hand and cut from the test cards (flushes, nobs, nibs, fifteens,
+# pairs and runs) plus the 9/T run boundary
+batch_cards = cards + [Card(*c) for c in ("8C", "9D", "TC")]
+batch_hands = [list(c[:4]) + [c[4]] for c in combinations(batch_cards, 5)]
+
+
+@pytest.mark.parametrize("mode", ["pone", "dealer", "crib"])
+def test_score_hands_batch(mode):
+
+    include_nibs = mode == "dealer"
+    five_card_flush = mode == "crib"
+
+    indices = np.array([[c.index for c in h] for h in batch_hands], dtype=np.uint8)
+
+    results = score_hands_batch(indices, mode=mode)
+
+    for i, h in enumerate(batch_hands):
+
+        counts = score_counts(h[:4], h[4])
+        points = counts.points()
+
+        assert results["total"][i] == counts.total(include_nibs, five_card_flush)
+
+        for k in ("fifteen", "pair", "run", "nobs"):
+            assert results[k][i] == points[k]
+
+    assert (
+        sum(results[k] for k in ("fifteen", "pair", "run", "flush", "nobs", "nibs"))
+        == results["total"]
+    ).all()
+
+
+def test_score_hands_batch_buffer(tmp_path):
+
+    indices = np.array([[c.index for c in h] for h in batch_hands[:50]], dtype=np.uint8)
+    expected = score_hands_batch(indices)["total"]
+
+    # buffer protocol objects
+    assert (score_hands_batch(indices.tobytes())["total"] == expected).all()
+    assert (score_hands_batch(bytearray(indices.tobytes()))["total"] == expected).all()
+
+    # memory-mapped file
+    path = tmp_path / "hands.bin"
+    indices.tofile(path)
+
+    hands = np.memmap(path, dtype=np.uint8, mode="r")
+    assert (score_hands_batch(hands)["total"] == expected).all()
+
+    with pytest.raises(ValueError):
+        score_hands_batch(indices, mode="other")
+
+    with pytest.raises(ValueError):
+        score_hands_batch(indices[:, :4])
+
+    with pytest.raises(ValueError):
+        score_hands_batch(indices + 52)
+
+    # indices that would wrap around as bytes
+    with pytest.raises(ValueError):
+        score_hands_batch(np.array([[260, 1, 2, 3, 4]]))
+
+    with pytest.raises(ValueError):
+        score_hands_batch(np.array([[-1, 1, 2, 3, 4]]))
+
+
+# ------------
+# score_vector
+
+
+@pytest.mark.parametrize("hand", list(combinations(cards, 4)))
+def test_score_vector(hand):
+
+    deck = make_deck()
+    discard = [c for c in cards if c not in hand][:2]
+
+    for nibs in (False, True):
+        for crib in (False, True):
+            scores = score_vector(
+                hand, exclude=discard, include_nibs=nibs, five_card_flush=crib
+            )
+
+            assert scores.count() == 46
+
+            for cut in deck:
+                if cut in hand or cut in discard:
+                    assert scores.mask[cut.index]
+
+                else:
+                    assert scores[cut.index] == score_hand(hand, cut, nibs, crib)
+
+
+@pytest.mark.parametrize("hand", list(combinations(cards, 6)))
+def test_keep_rank_scores(hand):
+
+    expected = [cut_rank_scores(ch) for ch in hand_combinations(hand, 4)]
+
+    assert keep_rank_scores(hand) == expected
+
+
 # ------------
 # average_hand
 
@@ -738,6 +1208,25 @@ def test_maximum_average_hand(data):
     assert pytest.approx(average_value, rel=1e-4, abs=1e-12) == right
 
 
+@pytest.mark.parametrize("hand", list(combinations(cards, 4)))
+def test_expected_average_exact(hand):
+
+    # the rank grouped average is exactly equal to scoring every cut
+    for discard in (None, [c for c in cards if c not in hand][:2]):
+        deck = FULL_DECK - CardSet(hand) - CardSet(discard or [])
+        total = sum(score_hand(hand, cut) for cut in deck)
+
+        assert expected_average(hand, discard) == total / len(deck)
+
+
+@pytest.mark.parametrize("hand", list(combinations(cards, 6)))
+def test_expected_averages(hand):
+
+    assert expected_averages(hand) == [
+        expected_average(ch, discard) for ch, discard in discard_splits(hand)
+    ]
+
+
 # ------------
 # expected_average_crib
 
@@ -769,3 +1258,221 @@ def test_expected_average_crib(data):
     average_value = expected_average_crib(hand, discard)
 
     assert pytest.approx(average_value, rel=1e-6, abs=1e-12) == right
+
+
+@pytest.mark.parametrize("data", data)
+def test_expected_average_crib_enumerated(data):
+
+    left, right = data
+
+    hand = [Card(*c) for c in left[0]]
+    discard = [Card(*c) for c in left[1]]
+
+    # in process and in the shared pool (created once, used twice)
+    value = expected_average_crib_enumerated(hand, discard, workers=1)
+
+    assert value == expected_average_crib_enumerated(hand, discard, workers=2)
+    assert value == expected_average_crib_enumerated(hand, discard, workers=2)
+
+    assert pytest.approx(value, rel=1e-12) == expected_average_crib(hand, discard)
+
+
+# the discards hold jacks and cards that can flush with the crib
+data = [
+    (("AH", "2H", "3H", "4H"), ("JH", "5H")),
+    (("AC", "2D", "JS", "4H"), ("JD", "QD")),
+]
+
+
+@pytest.mark.parametrize("data", data)
+def test_expected_average_crib_rules(data):
+
+    hand = [Card(*c) for c in data[0]]
+    discard = [Card(*c) for c in data[1]]
+
+    deck = list(FULL_DECK - CardSet(hand) - CardSet(discard))
+
+    for nibs in (False, True):
+        for crib in (False, True):
+
+            total = 0
+            count = 0
+
+            for pair in combinations(deck, 2):
+                for cut in deck:
+                    if cut not in pair:
+                        total += score_hand(discard + list(pair), cut, nibs, crib)
+                        count += 1
+
+            assert pytest.approx(total / count, rel=1e-12) == expected_average_crib(
+                hand, discard, include_nibs=nibs, five_card_flush=crib
+            )
+
+
+# ------------
+# discard_consider_all_combos
+
+
+def test_discard_consider_all_combos():
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+
+    results = discard_consider_all_combos(hand)
+    enumerated = discard_consider_all_combos(hand, exact=True, workers=2)
+
+    assert len(results) == 15
+
+    for result, other in zip(results, enumerated):
+        assert result["expected_average"] == expected_average(
+            result["hand"], result["discard"]
+        )
+
+        assert result["expected_average_crib"] == expected_average_crib(
+            result["hand"], result["discard"]
+        )
+
+        assert pytest.approx(result["expected_average_crib"], rel=1e-12) == (
+            other["expected_average_crib"]
+        )
+
+
+def test_equivalence_keys():
+
+    # the 2 splits are the same with hearts and clubs swapped
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+    swapped = [Card(*c) for c in ("3C", "4D", "5D", "5S", "JS", "2H")]
+
+    kept = hand[1:5]
+    discard = [hand[0], hand[5]]
+    other = [swapped[0], swapped[5]]
+
+    assert expected_average_key(kept, discard) == expected_average_key(kept, other)
+    assert crib_key(kept, discard) == crib_key(kept, other)
+    assert expected_average_crib(kept, discard) == expected_average_crib(kept, other)
+
+    # the jack of spades is in the hand, nobs is possible in spades only
+    assert expected_average_key(kept, discard) != expected_average_key(
+        [Card(*c) for c in ("4D", "5D", "5S", "JD")], discard
+    )
+
+    rng = np.random.default_rng(16)
+    deck = list(FULL_DECK)
+
+    keys = {}
+    cribs = {}
+    for _ in range(200):
+        cards = [deck[i] for i in rng.choice(52, 6, replace=False)]
+        kept, discard = cards[:4], cards[4:]
+
+        value = expected_average(kept, discard)
+        assert keys.setdefault(expected_average_key(kept, discard), value) == value
+
+        value = expected_average_crib(kept, discard)
+        assert pytest.approx(cribs.setdefault(crib_key(kept, discard), value)) == value
+
+    # relabeled suits give the same keys
+    for _ in range(50):
+        cards = [deck[i] for i in rng.choice(52, 6, replace=False)]
+        suits = rng.permutation(4)
+        relabeled = [
+            Card.from_index(c.rank_ordinal * 4 + suits[c.suit_ordinal]) for c in cards
+        ]
+
+        assert expected_average_key(cards[:4], cards[4:]) == expected_average_key(
+            relabeled[:4], relabeled[4:]
+        )
+        assert crib_key(cards[:4], cards[4:]) == crib_key(relabeled[:4], relabeled[4:])
+
+
+def test_score_distribution():
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S")]
+    discard = [Card(*c) for c in ("JS", "2C")]
+
+    distribution = expected_average(hand, discard, distribution=True)
+
+    assert distribution.histogram == {8: 4, 10: 8, 12: 22, 14: 4, 16: 3, 17: 2, 20: 3}
+    assert distribution.count == 46
+    assert distribution.mean == expected_average(hand, discard)
+
+    assert distribution.probability(12) == 22 / 46
+    assert distribution.probability(13) == 0
+    assert distribution.at_least(16) == 8 / 46
+    assert distribution.at_least(0) == 1
+
+    assert distribution.percentile(10) == 10
+    assert distribution.percentile(50) == 12
+    assert distribution.percentile(100) == 20
+
+    mean = distribution.mean
+    variance = sum(w * (v - mean) ** 2 for v, w in distribution.histogram.items()) / 46
+
+    assert pytest.approx(distribution.variance) == variance
+    assert pytest.approx(distribution.std**2) == variance
+
+    assert ScoreDistribution({3: 1, 5: 0}).histogram == {3: 1}
+
+
+data = [
+    (("3H", "4D", "5D", "5S"), ("JS", "2C"), False, False),
+    (("4H", "5H", "6H", "JH"), ("JD", "5S"), True, False),
+    (("2C", "7D", "9S", "KC"), ("5C", "JC"), True, True),
+]
+
+
+@pytest.mark.parametrize("data", data)
+def test_crib_distribution(data):
+
+    hand, discard, include_nibs, five_card_flush = data
+
+    hand = [Card(*c) for c in hand]
+    discard = [Card(*c) for c in discard]
+
+    deck = [c for c in FULL_DECK if c not in hand + discard]
+
+    expected = Counter()
+    for pair in combinations(deck, 2):
+        for cut in deck:
+            if cut not in pair:
+                expected[
+                    score_hand(
+                        discard + list(pair),
+                        cut,
+                        include_nibs=include_nibs,
+                        five_card_flush=five_card_flush,
+                    )
+                ] += 1
+
+    distribution = expected_average_crib(
+        hand,
+        discard,
+        include_nibs=include_nibs,
+        five_card_flush=five_card_flush,
+        distribution=True,
+    )
+
+    assert distribution.histogram == dict(sorted(expected.items()))
+
+    assert pytest.approx(distribution.mean, rel=1e-12) == expected_average_crib(
+        hand, discard, include_nibs=include_nibs, five_card_flush=five_card_flush
+    )
+
+
+def test_discard_distributions():
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+
+    expected = discard_consider_all_combos(hand)
+    results = discard_consider_all_combos(hand, distribution=True)
+
+    for result, other in zip(results, expected):
+        assert result["hand"] == other["hand"]
+        assert pytest.approx(result["expected_average"]) == other["expected_average"]
+        assert pytest.approx(result["expected_average_crib"]) == (
+            other["expected_average_crib"]
+        )
+
+        assert result["distribution"].mean == result["expected_average"]
+        assert result["crib_distribution"].histogram == (
+            crib_distribution(result["hand"], result["discard"]).histogram
+        )
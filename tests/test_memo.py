@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+Test module for the scoring and expected average caches.
+"""
+
+# ------------
+# System Modules - Included with Python
+
+# ------------
+# 3rd Party - From pip
+
+import pytest
+
+# ------------
+# Custom Modules
+
+from cribbage.cards import (
+    Card,
+    score_hand,
+)
+
+from cribbage.analytics import (
+    expected_average,
+    expected_average_crib,
+    discard_consider_all_combos,
+)
+
+from cribbage.memo import (
+    MISSING,
+    CacheStats,
+    LRUCache,
+    enable_caches,
+    disable_caches,
+    clear_caches,
+    cache_sizes,
+    cache_stats,
+)
+
+# -------------
+
+
+@pytest.fixture
+def caches():
+
+    enable_caches(maxsize=1000)
+
+    yield
+
+    disable_caches()
+
+
+def test_lru_cache():
+
+    cache = LRUCache(maxsize=2)
+
+    assert cache.lookup("a") is MISSING
+
+    cache.store("a", 1)
+    cache.store("b", 2)
+
+    # "a" is used so "b" is the least recently used
+    assert cache.lookup("a") == 1
+
+    cache.store("c", 3)
+
+    assert cache.lookup("b") is MISSING
+    assert cache.lookup("c") == 3
+    assert len(cache) == 2
+
+    assert cache.stats() == CacheStats(
+        hits=2, misses=2, evictions=1, size=2, maxsize=2
+    )
+
+    cache.clear()
+    assert cache.stats() == CacheStats(0, 0, 0, 0, 2)
+
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+def test_enable_caches():
+
+    try:
+        enable_caches(maxsize=10, names=["score_hand"])
+        assert cache_sizes() == {"score_hand": 10}
+
+        enable_caches({"expected_average": 20})
+        assert cache_sizes() == {"score_hand": 10, "expected_average": 20}
+
+        with pytest.raises(ValueError):
+            enable_caches(names=["score"])
+
+    finally:
+        disable_caches()
+
+    assert cache_stats() == {}
+
+
+def test_score_hand_cache(caches):
+
+    hand = [Card(*c) for c in ("4H", "5H", "6H", "JC")]
+    cut = Card("5", "C")
+
+    # the same hand with the hearts and clubs swapped
+    other = [Card(*c) for c in ("4C", "5C", "6C", "JH")]
+    other_cut = Card("5", "H")
+
+    value = score_hand(hand, cut)
+
+    assert score_hand(other, other_cut) == value
+    assert score_hand(hand, cut, include_nibs=True) == value
+
+    stats = cache_stats()["score_hand"]
+    assert (stats.hits, stats.misses, stats.size) == (1, 2, 2)
+
+    clear_caches()
+    assert cache_stats()["score_hand"].size == 0
+
+
+def test_expected_average_cache(caches):
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S")]
+    discard = [Card(*c) for c in ("JS", "2C")]
+
+    # the same split with the hearts and clubs swapped
+    other = [Card(*c) for c in ("3C", "4D", "5D", "5S")]
+    other_discard = [Card(*c) for c in ("JS", "2H")]
+
+    expected = expected_average(hand, discard)
+
+    assert expected_average(other, other_discard) == expected
+    assert cache_stats()["expected_average"].hits == 1
+
+    crib = expected_average_crib(hand, discard)
+
+    assert expected_average_crib(other, other_discard) == crib
+    assert expected_average_crib(hand, discard, five_card_flush=True) != crib
+    assert cache_stats()["expected_average_crib"].hits == 1
+
+    # the verbose breakdown is not cached
+    messages = []
+    assert expected_average(hand, discard, callback=messages.append) == expected
+    assert messages
+    assert cache_stats()["expected_average"].hits == 1
+
+
+def test_pool_caches(caches):
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+
+    results = discard_consider_all_combos(hand, exact=True, workers=2)
+
+    disable_caches()
+
+    for result, other in zip(results, discard_consider_all_combos(hand)):
+        assert pytest.approx(result["expected_average_crib"], rel=1e-12) == (
+            other["expected_average_crib"]
+        )
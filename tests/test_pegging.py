@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+Test module for scoring the play.
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import random
+
+# ------------
+# 3rd Party - From pip
+
+import pytest
+
+# ------------
+# Custom Modules
+
+from cribbage.cards import (
+    Card,
+    make_deck,
+)
+
+from cribbage.pegging import (
+    PONE,
+    DEALER,
+    start_play,
+    is_over,
+    legal_plays,
+    play,
+    play_hands,
+    run_length,
+    best_play,
+    zobrist_key,
+    _Search,
+    _sequence_key,
+)
+
+# -------------
+
+
+def lay(pone, dealer, cards):
+    """
+    Lay the cards in order and return the list of (player, points).
+    """
+
+    state = start_play([Card(*c) for c in pone], [Card(*c) for c in dealer])
+
+    pegged = []
+    for c in cards:
+        player = state.turn
+        state, points = play(state, Card(*c))
+        pegged.append((player, points))
+
+    return state, pegged
+
+
+data = [
+    # fifteen, then a pair and the last card
+    (("5H", "3S"), ("TD", "3D"), ("5H", "TD", "3S", "3D"), [0, 2, 0, 3]),
+    # a pair royal and a double pair royal
+    (("7H", "7D"), ("7S", "7C"), ("7H", "7S", "7D", "7C"), [0, 2, 6, 13]),
+    # runs in any order, the longest run at the end counts
+    (
+        ("3H", "4D", "AC"),
+        ("5S", "2C", "6D"),
+        ("3H", "5S", "4D", "2C", "AC", "6D"),
+        [0, 0, 3, 4, 7, 7],
+    ),
+    # a pair ends the run
+    (("3H", "4D"), ("5S", "4C"), ("3H", "5S", "4D", "4C"), [0, 0, 3, 3]),
+    # 8, 9 and T are a run
+    (("8H", "TD"), ("9S", "AC"), ("8H", "9S", "TD", "AC"), [0, 0, 3, 1]),
+    # 31 for 2, no point for the go
+    (("KH", "AD", "2C"), ("KS", "QD"), ("KH", "KS", "AD", "QD", "2C"), [0, 2, 0, 2, 1]),
+]
+
+
+@pytest.mark.parametrize("data", data)
+def test_play_points(data):
+
+    pone, dealer, cards, expected = data
+
+    state, pegged = lay(pone, dealer, cards)
+
+    assert [p for _, p in pegged] == expected
+    assert is_over(state)
+
+
+def test_go():
+
+    state, pegged = lay(("KH", "5C"), ("KS", "8D", "AC", "2C"), ("KH", "KS", "5C", "AC"))
+
+    # the pone can't lay a card, the dealer plays on
+    assert (state.turn, state.count, state.go) == (DEALER, 26, 1 << PONE)
+    assert legal_plays(state) == [Card("2", "C").index]
+
+    # the dealer pegs the go and leads again, the pone has no cards
+    state, points = play(state, Card("2", "C"))
+    assert points == 1
+    assert (state.turn, state.count, state.go) == (DEALER, 0, 0)
+
+    state, points = play(state, Card("8", "D"))
+    assert points == 1
+    assert is_over(state)
+
+    # 31 resets the count and the pone leads
+    state, pegged = lay(("KH", "QH", "5C"), ("KS", "AD", "4C"), ("KH", "KS", "QH", "AD"))
+
+    assert pegged[-1] == (DEALER, 2)
+    assert (state.turn, state.count, state.go) == (PONE, 0, 0)
+
+    # neither player can lay a card, the pone pegs the go and the dealer
+    # leads
+    state, pegged = lay(("KH", "QH", "5C"), ("KS", "9D", "3C"), ("KH", "KS", "QH"))
+
+    assert pegged[-1] == (PONE, 1)
+    assert (state.turn, state.count, state.length) == (DEALER, 0, 0)
+
+
+def test_invalid_plays():
+
+    state = start_play(
+        [Card("K", "H"), Card("5", "C")], [Card("K", "S"), Card("Q", "S"), Card("A", "D")]
+    )
+
+    with pytest.raises(ValueError):
+        play(state, Card("K", "S"))
+
+    state, _ = play(state, Card("K", "H"))
+    state, _ = play(state, Card("K", "S"))
+    state, _ = play(state, Card("5", "C"))
+
+    # over 31
+    with pytest.raises(ValueError):
+        play(state, Card("Q", "S"))
+
+    with pytest.raises(ValueError):
+        start_play([Card("K", "H")], [Card("K", "H")])
+
+
+def reference_points(pile, count):
+    """
+    Score the last card laid by rescanning the pile.
+    """
+
+    points = 2 if count in (15, 31) else 0
+
+    same = 1
+    for card in reversed(pile[:-1]):
+        if card.rank != pile[-1].rank:
+            break
+
+        same += 1
+
+    points += {1: 0, 2: 2, 3: 6, 4: 12}[same]
+
+    run = 0
+    for k in range(3, len(pile) + 1):
+        values = sorted(c.rank_ordinal for c in pile[-k:])
+
+        if all(b - a == 1 for a, b in zip(values, values[1:])):
+            run = k
+
+    return points + run
+
+
+def reference_play(pone, dealer, cards):
+    """
+    Play the cards in order with explicit go calls and return the points
+    pegged by each player.
+    """
+
+    hands = [list(pone), list(dealer)]
+    scores = [0, 0]
+    cards = iter(cards)
+
+    turn, count, pile, go, last = PONE, 0, [], [False, False], None
+
+    while hands[0] or hands[1]:
+        if not any(count + c.value <= 31 for c in hands[turn]):
+            go[turn] = True
+
+            if go[1 - turn] or not any(count + c.value <= 31 for c in hands[1 - turn]):
+                scores[last] += 1 if count != 31 else 0
+
+                turn = 1 - last if hands[1 - last] else last
+                count, pile, go, last = 0, [], [False, False], None
+
+            else:
+                turn = 1 - turn
+
+            continue
+
+        card = next(cards)
+
+        hands[turn].remove(card)
+        count += card.value
+        pile.append(card)
+
+        scores[turn] += reference_points(pile, count)
+        last = turn
+        turn = 1 - turn
+
+    if last is not None and count != 31:
+        scores[last] += 1
+
+    return scores
+
+
+def test_play_hands():
+
+    rng = random.Random(23)
+    deck = make_deck()
+
+    for _ in range(2000):
+        cards = rng.sample(deck, 8)
+
+        laid = []
+
+        def choose(state, plays):
+            index = rng.choice(plays)
+            laid.append(Card.from_index(index))
+            return index
+
+        scores = play_hands(cards[:4], cards[4:], choose)
+
+        assert scores == reference_play(cards[:4], cards[4:], laid)
+
+
+def test_run_length():
+
+    # the ranks are packed 4 bits each, the last card in the low bits
+    def pack(ranks):
+        sequence = 0
+        for r in ranks:
+            sequence = sequence << 4 | "A23456789TJQK".index(r)
+
+        return sequence, len(ranks)
+
+    assert run_length(*pack("A23")) == 3
+    assert run_length(*pack("7A32")) == 3
+    assert run_length(*pack("3A2")) == 3
+    assert run_length(*pack("32A4")) == 4
+    assert run_length(*pack("A24")) == 0
+    assert run_length(*pack("2A3A")) == 0
+    assert run_length(*pack("JQK")) == 3
+    assert run_length(*pack("89T")) == 3
+    assert run_length(*pack("JT9")) == 3
+    assert run_length(*pack("QKA")) == 0
+
+
+def minimax(state):
+    """
+    The value of the state for the player to move, searched without
+    pruning.
+    """
+
+    if is_over(state):
+        return 0
+
+    values = []
+    for move in legal_plays(state):
+        child, points = play(state, move)
+        v = minimax(child)
+        values.append(points + v if child.turn == state.turn else points - v)
+
+    return max(values)
+
+
+def random_states(count, seed):
+
+    rng = random.Random(seed)
+    deck = make_deck()
+
+    for _ in range(count):
+        cards = rng.sample(deck, 8)
+        state = start_play(cards[:4], cards[4:])
+
+        for _ in range(rng.randrange(4)):
+            state, _ = play(state, rng.choice(legal_plays(state)))
+
+        yield state
+
+
+def test_best_play():
+
+    for state in random_states(100, 29):
+        result = best_play(state)
+
+        expected = {}
+        for move in legal_plays(state):
+            child, points = play(state, move)
+            v = minimax(child)
+            expected[Card.from_index(move)] = (
+                points + v if child.turn == state.turn else points - v
+            )
+
+        assert result.values == expected
+        assert result.value == max(expected.values())
+        assert expected[result.card] == result.value
+        assert result.samples == 1
+
+    # out of time, only the points of the card are counted
+    state = start_play(
+        [Card(*c) for c in ("5H", "TD", "2C", "7S")],
+        [Card(*c) for c in ("5S", "KD", "3C", "8S")],
+    )
+    state, _ = play(state, Card("T", "D"))
+
+    result = best_play(state, time_limit=0)
+    assert result.values == {
+        Card("5", "S"): 2,
+        Card("K", "D"): 0,
+        Card("3", "C"): 0,
+        Card("8", "S"): 0,
+    }
+
+    # the play is over
+    state = start_play([], [])
+
+    with pytest.raises(ValueError):
+        best_play(state)
+
+
+def test_zobrist_keys():
+
+    for state in random_states(100, 31):
+        search = _Search()
+
+        key = zobrist_key(state)
+        sequence_key = _sequence_key(state)
+
+        for *_, child, child_key, child_sequence in search.children(
+            state, key, sequence_key
+        ):
+            assert child_key == zobrist_key(child)
+            assert child_sequence == _sequence_key(child)
+
+
+def test_best_play_sampled():
+
+    pone = [Card(*c) for c in ("5H", "TD", "2C", "7S")]
+    dealer = [Card(*c) for c in ("5S", "KD", "3C", "8S")]
+
+    state = start_play(pone, dealer)
+    unseen = [c for c in make_deck() if c not in pone]
+
+    result = best_play(state, unseen, samples=20, seed=3)
+
+    assert result.samples == 20
+    assert set(result.values) == set(pone)
+    assert result == best_play(state, unseen, samples=20, seed=3)
+
+    assert best_play(state, unseen, samples=20, time_limit=0).samples == 1
+
+    # the dealer said go, the sampled hands can't hold a card that can be
+    # laid
+    state = start_play(
+        [Card(*c) for c in ("KH", "QH", "AC", "5D")],
+        [Card(*c) for c in ("KS", "JS", "9D", "2D")],
+    )
+    state, _ = play(state, Card("K", "H"))
+    state, _ = play(state, Card("K", "S"))
+    state, _ = play(state, Card("Q", "H"))
+
+    assert state.go == 1 << DEALER
+
+    seen = [Card(*c) for c in ("KH", "QH", "AC", "5D", "KS")]
+    unseen = [c for c in make_deck() if c not in seen]
+
+    result = best_play(state, unseen, samples=20, seed=5)
+
+    # the pone plays on alone, the ace makes 31
+    assert result.card == Card("A", "C")
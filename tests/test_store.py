@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+Test module for the persistent cache of expected averages.
+"""
+
+# ------------
+# System Modules - Included with Python
+
+import time
+
+# ------------
+# 3rd Party - From pip
+
+import pytest
+
+# ------------
+# Custom Modules
+
+from cribbage.cards import Card
+
+from cribbage.analytics import (
+    expected_average,
+    discard_consider_all_combos,
+)
+
+from cribbage.memo import (
+    get_cache,
+    cache_stats,
+    enable_caches,
+    disable_caches,
+)
+
+from cribbage.tables import default_table_folder
+
+from cribbage.store import (
+    STORE_NAME,
+    ResultStore,
+    default_store_path,
+    stored_results,
+    average_keys,
+    discard_keys,
+)
+
+# -------------
+
+
+def test_result_store(tmp_path):
+
+    path = tmp_path / "results.sqlite"
+
+    keys = [((1, 2, 3, 4), (), ((0, 0, 13),)), ((5,), (6,), ())]
+
+    with ResultStore(path) as store:
+        assert store.lookup("expected_average", keys) == {}
+
+        store.save({"expected_average": {keys[0]: 1.5, keys[1]: 2.5}})
+
+        assert store.lookup("expected_average", keys) == {keys[0]: 1.5, keys[1]: 2.5}
+        assert store.lookup("expected_average_crib", keys) == {}
+
+    # another process shares the database, entries of another version
+    # are ignored
+    with ResultStore(path) as store, ResultStore(path, version=2) as other:
+        assert other.lookup("expected_average", keys) == {}
+
+        other.save({"expected_average": {keys[0]: 3.0}})
+
+        assert store.stats() == [("expected_average", 1, 2), ("expected_average", 2, 1)]
+
+        # prune removes the other versions
+        assert store.prune() == 1
+        assert store.stats() == [("expected_average", 1, 2)]
+
+        time.sleep(0.01)
+        store.save({}, used={"expected_average": [keys[1]]})
+
+        # keep the most recently used entry
+        assert store.prune(max_entries=1) == 1
+        assert store.lookup("expected_average", keys) == {keys[1]: 2.5}
+
+        assert store.prune(max_age=0) == 1
+        assert store.stats() == []
+
+        store.save({"expected_average": {keys[0]: 1.5}})
+        assert store.clear() == 1
+
+
+def test_stored_results(tmp_path):
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+
+    expected = discard_consider_all_combos(hand)
+
+    with ResultStore(tmp_path / "results.sqlite") as store:
+
+        with stored_results(store, discard_keys(hand)):
+            assert discard_consider_all_combos(hand) == expected
+
+        # the caches are disabled again
+        assert get_cache("expected_average") is None
+
+        # the second run is served from the store
+        with stored_results(store, discard_keys(hand)):
+            assert discard_consider_all_combos(hand) == expected
+
+            stats = cache_stats()
+            assert stats["expected_average"].misses == 0
+            assert stats["expected_average_crib"].misses == 0
+
+        average = expected_average(hand[:4], hand[4:])
+
+        with stored_results(store, average_keys(hand[:4], hand[4:])):
+            assert expected_average(hand[:4], hand[4:]) == average
+            assert cache_stats()["expected_average"].hits == 1
+
+        # nothing is saved if the block fails
+        with pytest.raises(ValueError):
+            with stored_results(store, average_keys(hand[1:5])):
+                expected_average(hand[1:5])
+                raise ValueError()
+
+        keys = average_keys(hand[1:5])["expected_average"]
+        assert store.lookup("expected_average", keys) == {}
+
+
+def test_stored_results_new_entries(tmp_path):
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+    other = [Card(*c) for c in ("AH", "7D", "8C", "KS")]
+
+    enable_caches(names=["expected_average"])
+
+    try:
+        # an entry from before the block
+        expected_average(other)
+
+        with ResultStore(tmp_path / "results.sqlite") as store:
+            with stored_results(store, average_keys(hand[:4], hand[4:])):
+                expected_average(hand[:4], hand[4:])
+
+            # only the result of the block is saved
+            assert store.stats() == [("expected_average", 1, 1)]
+
+            keys = average_keys(other)["expected_average"]
+            assert store.lookup("expected_average", keys) == {}
+
+    finally:
+        disable_caches(["expected_average"])
+
+
+def test_default_store_path(tmp_path, monkeypatch):
+
+    monkeypatch.setenv("CRIBBAGE_TABLES", str(tmp_path))
+
+    assert default_table_folder() == tmp_path
+    assert default_store_path() == tmp_path / STORE_NAME
@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+# -*- coding:utf-8 -*-
+
+# -----------
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2021 Troy Williams
+
+# uuid:
+# author: Troy Williams
+# email:  troy.williams@bluebill.net
+# date:
+# -----------
+
+"""
+Test module for the precomputed tables.
+"""
+
+# ------------
+# System Modules - Included with Python
+
+from itertools import combinations, permutations
+from math import comb
+
+# ------------
+# 3rd Party - From pip
+
+import numpy as np
+import pytest
+
+# ------------
+# Custom Modules
+
+from cribbage.cards import (
+    SUITS,
+    Card,
+    make_deck,
+    score_hand,
+    set_score_table,
+)
+
+from cribbage.tables import (
+    TableError,
+    SCORE_TABLE_NAME,
+    SCORE_TABLE_VERSION,
+    SCORE_TABLE_ROWS,
+    combination_index,
+    write_table,
+    load_table,
+    score_table_row,
+    score_table_rows,
+    load_score_table,
+    CRIB_TABLE_PATH,
+    crib_table_rows,
+    load_crib_table,
+    DISCARD_CLASSES,
+    DISCARD_KEYS_NAME,
+    DISCARD_TABLE_NAME,
+    DISCARD_TABLE_VERSION,
+    canonical_hand_key,
+    key_hand,
+    discard_keys_path,
+    discard_table_keys,
+    discard_table_rows,
+    load_discard_table,
+    HandTable,
+    hand_table_rows,
+    build_hand_table,
+    load_hand_table,
+    PEGGING_TABLE_ROWS,
+    PEGGING_COLUMNS,
+    pegging_row,
+    _pegging_hand,
+    pegging_table_rows,
+    build_pegging_table,
+    load_pegging_table,
+)
+
+from cribbage.analytics import (
+    crib_rank_points,
+    crib_suit_points,
+    expected_average_crib,
+    discard_consider_all_combos,
+    expected_average,
+    set_crib_table,
+    set_discard_table,
+    set_hand_table,
+    set_pegging_table,
+)
+
+from cribbage.pegging import (
+    greedy_policy,
+    play_hands,
+)
+
+# -------------
+
+
+# -------------
+# Test combination_index
+
+
+@pytest.mark.parametrize("k", [1, 2, 3, 5])
+def test_combination_index(k):
+
+    # every combination of the first 12 cards maps to a unique index in
+    # 0 to C(12, k) - 1
+    indices = sorted(combination_index(c) for c in combinations(range(12), k))
+
+    assert indices == list(range(comb(12, k)))
+
+
+# -------------
+# Test write_table/load_table
+
+
+def test_table_round_trip(tmp_path):
+
+    path = tmp_path / "test.tbl"
+    data = np.arange(30, dtype=np.int16).reshape(10, 3)
+
+    write_table(path, "test", 3, data)
+
+    table = load_table(path, "test", 3, shape=(10, 3))
+
+    assert table.dtype == np.int16
+    assert np.array_equal(table, data)
+
+
+data = [
+    ("other", 3, None),
+    ("test", 4, None),
+    ("test", 3, (10, 4)),
+]
+
+
+@pytest.mark.parametrize("data", data)
+def test_table_stale(data, tmp_path):
+
+    name, version, shape = data
+
+    path = tmp_path / "test.tbl"
+    write_table(path, "test", 3, np.zeros((10, 3), dtype=np.uint8))
+
+    with pytest.raises(TableError):
+        load_table(path, name, version, shape=shape)
+
+
+def test_table_checksum(tmp_path):
+
+    path = tmp_path / "test.tbl"
+    write_table(path, "test", 3, np.zeros((10, 3), dtype=np.uint8))
+
+    # corrupt the last byte of the data
+    with path.open("r+b") as fo:
+        fo.seek(-1, 2)
+        fo.write(b"\x01")
+
+    with pytest.raises(TableError):
+        load_table(path, "test", 3)
+
+    assert load_table(path, "test", 3, verify=False)[-1, -1] == 1
+
+
+def test_table_missing(tmp_path):
+
+    with pytest.raises(TableError):
+        load_table(tmp_path / "missing.tbl", "test", 3)
+
+
+# -------------
+# Test the score table
+
+
+def test_score_table_rows():
+
+    deck = make_deck()
+
+    # The first C(9, 5) five card sets use the first 9 cards of the deck
+    rows = score_table_rows(0, comb(9, 5))
+
+    for cards in combinations(deck[:9], 5):
+        for cut in cards:
+            hand = [c for c in cards if c is not cut]
+            row = rows[score_table_row(hand, cut)]
+
+            assert row[0] == score_hand(hand, cut)
+            assert row[1] == score_hand(hand, cut, include_nibs=True)
+            assert row[2] == score_hand(hand, cut, five_card_flush=True)
+
+
+def test_score_table_lookup(tmp_path):
+
+    deck = make_deck()
+
+    # a table with only the sets that use the last 6 cards (the kings
+    # and queens) scored. The hands contain flushes, nobs and nibs.
+    data = np.zeros((SCORE_TABLE_ROWS, 3), dtype=np.uint8)
+
+    for cards in combinations(deck[-6:], 5):
+        i = combination_index([c.index for c in cards])
+        data[i * 5: i * 5 + 5] = score_table_rows(i, i + 1)
+
+    path = tmp_path / "score.tbl"
+    write_table(path, SCORE_TABLE_NAME, SCORE_TABLE_VERSION, data)
+
+    table = load_score_table(path, activate=False)
+
+    hands = []
+    for cards in combinations(deck[-6:], 5):
+        for cut in cards:
+            hands.append(([c for c in cards if c is not cut], cut))
+
+    for hand, cut in hands:
+        for nibs in (False, True):
+            for crib in (False, True):
+                assert table.score(hand, cut, nibs, crib) == score_hand(hand, cut, nibs, crib)
+
+    # activate the table, score_hand uses the lookup
+    expected = [score_hand(hand, cut) for hand, cut in hands]
+
+    try:
+        set_score_table(table)
+        assert [score_hand(hand, cut) for hand, cut in hands] == expected
+
+    finally:
+        set_score_table(None)
+
+
+# -------------
+# Test the crib table
+
+
+def test_crib_table_shipped():
+
+    # the shipped table is current
+    table = load_crib_table(CRIB_TABLE_PATH, activate=False)
+
+    assert np.array_equal(table.data, crib_table_rows())
+
+
+data = [
+    (("3H", "4D", "5D", "5S"), ("JS", "2C")),
+    (("5C", "5D", "5H", "JS"), ("5S", "JD")),
+    (("AH", "2H", "3H", "4H"), ("JH", "5H")),
+    (("AC", "2D", "JS", "4H"), ("JD", "QD")),
+    (("KC", "KD", "QS", "QH"), ("KS", "QD")),
+]
+
+
+@pytest.mark.parametrize("data", data)
+def test_crib_table(data):
+
+    hand = [Card(*c) for c in data[0]]
+    discard = [Card(*c) for c in data[1]]
+
+    table = load_crib_table(CRIB_TABLE_PATH, activate=False)
+
+    assert table.rank_points(hand, discard) == crib_rank_points(hand, discard)
+    assert table.rank_points([], discard) == crib_rank_points([], discard)
+
+    expected = expected_average_crib(hand, discard)
+
+    assert table.expected_average_crib(hand, discard) == expected
+
+    # nothing known about the deck, 50 cards left
+    total = crib_rank_points([], discard) + crib_suit_points([], discard)
+    assert table.average(discard) == total / (comb(50, 2) * 48)
+
+    # activate the table, expected_average_crib uses the lookup
+    try:
+        set_crib_table(table)
+        assert expected_average_crib(hand, discard) == expected
+
+    finally:
+        set_crib_table(None)
+
+
+# -------------
+# Test the discard table
+
+
+def test_discard_table_keys():
+
+    keys = discard_table_keys()
+
+    assert len(keys) == DISCARD_CLASSES
+    assert (np.diff(keys) > 0).all()
+
+
+hands = [
+    ("3H", "4D", "5D", "5S", "JS", "2C"),
+    ("3C", "4H", "5H", "5S", "JS", "2D"),
+    ("5C", "5D", "5H", "JS", "5S", "JD"),
+    ("AH", "2H", "3H", "4H", "JH", "5H"),
+    ("KH", "7D", "9D", "AD", "8C", "JD"),
+]
+
+
+@pytest.mark.parametrize("hand", hands)
+def test_canonical_hand_key(hand):
+
+    hand = [Card(*c) for c in hand]
+    key, _ = canonical_hand_key(hand)
+
+    # every renaming of the suits is in the same class
+    for suits in permutations(SUITS):
+        renamed = [Card(c.rank, suits[c.suit_ordinal]) for c in hand]
+
+        assert canonical_hand_key(renamed)[0] == key
+
+    assert canonical_hand_key(key_hand(key))[0] == key
+
+
+def test_discard_table(tmp_path):
+
+    hand_cards = [[Card(*c) for c in hand] for hand in hands]
+
+    keys = np.array(sorted({canonical_hand_key(h)[0] for h in hand_cards}), dtype=np.int64)
+
+    path = tmp_path / "discard.tbl"
+    write_table(discard_keys_path(path), DISCARD_KEYS_NAME, DISCARD_TABLE_VERSION, keys)
+    write_table(path, DISCARD_TABLE_NAME, DISCARD_TABLE_VERSION, discard_table_rows(keys))
+
+    table = load_discard_table(path, activate=False)
+
+    for hand in hand_cards:
+        expected = discard_consider_all_combos(hand)
+
+        for result, other in zip(table.lookup(hand), expected):
+            assert result["hand"] == other["hand"]
+            assert result["discard"] == other["discard"]
+            assert result["value"] == other["value"]
+            assert result["expected_average"] == other["expected_average"]
+
+            assert pytest.approx(result["expected_average_crib"], rel=1e-12) == (
+                other["expected_average_crib"]
+            )
+
+    with pytest.raises(TableError):
+        table.lookup([Card(*c) for c in ("AH", "2H", "3H", "4H", "6H", "7H")])
+
+    # activate the table, discard_consider_all_combos uses the lookup
+    try:
+        set_discard_table(table)
+        assert discard_consider_all_combos(hand_cards[0]) == table.lookup(hand_cards[0])
+
+    finally:
+        set_discard_table(None)
+
+
+# -------------
+# Test the hand table
+
+
+@pytest.fixture(scope="module")
+def hand_table():
+    return HandTable(hand_table_rows())
+
+
+def test_hand_table_rows(hand_table):
+
+    deck = make_deck()
+
+    rows = hand_table_rows(1000, 1100)
+    assert np.array_equal(rows, hand_table.data[1000:1100])
+
+    rng = np.random.default_rng(18)
+
+    for _ in range(200):
+        cards = [deck[i] for i in rng.choice(52, 5, replace=False)]
+        hand, cut = cards[:4], cards[4]
+
+        base, *deltas, flush, flush_points, nobs = hand_table.row(hand)
+
+        points = base + deltas[cut.rank_ordinal]
+
+        if flush >> cut.suit_ordinal & 1:
+            points += flush_points
+
+        if nobs >> cut.suit_ordinal & 1:
+            points += 1
+
+        assert points == score_hand(hand, cut)
+
+
+@pytest.mark.parametrize("data", data)
+def test_hand_table(hand_table, data):
+
+    hand = [Card(*c) for c in data[0]]
+    discard = [Card(*c) for c in data[1]]
+
+    for known in (None, discard):
+        assert hand_table.expected_average(hand, known) == expected_average(hand, known)
+
+
+def test_hand_table_load(hand_table, tmp_path):
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S")]
+    discard = [Card(*c) for c in ("JS", "2C")]
+
+    path = build_hand_table(tmp_path / "hand.tbl")
+    table = load_hand_table(path, activate=False)
+
+    assert np.array_equal(table.data, hand_table.data)
+
+    # activate the table, expected_average uses the lookup
+    try:
+        set_hand_table(table)
+        assert expected_average(hand, discard) == hand_table.expected_average(
+            hand, discard
+        )
+
+    finally:
+        set_hand_table(None)
+
+
+def test_pegging_rows():
+
+    for row in range(PEGGING_TABLE_ROWS):
+        hand = _pegging_hand(row)
+
+        assert len(set(hand)) == 4
+        assert pegging_row(hand) == row
+
+    # the suits don't matter
+    assert pegging_row([Card(*c) for c in ("5H", "5D", "JC", "QS")]) == pegging_row(
+        [Card(*c) for c in ("5S", "5C", "JH", "QH")]
+    )
+
+
+def test_pegging_table_rows():
+
+    data = pegging_table_rows(100, 103, samples=20)
+
+    assert data.shape == (3, len(PEGGING_COLUMNS))
+
+    # the rows don't depend on the shards
+    assert np.array_equal(data[1:], pegging_table_rows(101, 103, samples=20))
+
+    # a deal worked out by hand, the greedy players lay the highest card
+    # when nothing scores:
+    # KH, 5S 15 for 2, QH, 5C, go - AS 31 for 2, JH, 5D 15 for 2, TH last
+    # card for 1
+    pone = [Card(*c) for c in ("KH", "QH", "JH", "TH")]
+    dealer = [Card(*c) for c in ("5S", "5D", "5C", "AS")]
+
+    assert play_hands(pone, dealer, greedy_policy) == [1, 6]
+
+    # the table that ships with the package, the dealer has the edge in
+    # the play
+    table = load_pegging_table(activate=False).data
+
+    assert np.all(np.abs(table) < 10)
+    pone = table[:, PEGGING_COLUMNS["pone"]]
+    dealer = table[:, PEGGING_COLUMNS["dealer"]]
+
+    assert pone.mean() < 0 < dealer.mean()
+    assert np.mean(dealer > pone) > 0.99
+
+
+def test_pegging_table(tmp_path):
+
+    hand = [Card(*c) for c in ("3H", "4D", "5D", "5S", "JS", "2C")]
+
+    # the table that ships with the package
+    table = load_pegging_table(activate=False)
+
+    assert table.data.shape == (PEGGING_TABLE_ROWS, len(PEGGING_COLUMNS))
+
+    path = build_pegging_table(tmp_path / "pegging.tbl", samples=2)
+    assert load_pegging_table(path, activate=False).data.shape == table.data.shape
+
+    expected = discard_consider_all_combos(hand)
+
+    try:
+        set_pegging_table(table)
+        results = discard_consider_all_combos(hand)
+
+    finally:
+        set_pegging_table(None)
+
+    for result, other in zip(results, expected):
+        pone, dealer = table.expected_pegging(result["hand"])
+
+        assert result["delta_pone"] == other["delta_pone"]
+        assert result["expected_pegging_pone"] == pone
+        assert result["expected_pegging_dealer"] == dealer
+        assert result["combined_delta_pone"] == result["delta_pone"] + pone
+        assert result["combined_delta_dealer"] == result["delta_dealer"] + dealer
+
+    assert "expected_pegging_pone" not in discard_consider_all_combos(hand)[0]